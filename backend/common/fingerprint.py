@@ -0,0 +1,168 @@
+"""Source fingerprints and run manifests for skipping runs when a source is unchanged.
+
+A scraper computes a fingerprint of the bronze artifact it just fetched and
+compares it with the fingerprint recorded by the last successful run. When
+they match, the silver stage and uploads can be skipped and a no-op run is
+recorded instead.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+# Number of recent runs kept in the manifest history
+MAX_RUN_HISTORY = 50
+
+STATUS_UPDATED = "updated"
+STATUS_UNCHANGED = "unchanged"
+
+
+def fingerprint_bytes(data: bytes) -> str:
+    """Fingerprint raw bytes with SHA-256."""
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+def fingerprint_file(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """Fingerprint a file's contents with SHA-256, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return "sha256:" + digest.hexdigest()
+
+
+def fingerprint_records(records: Iterable[Any]) -> str:
+    """
+    Fingerprint parsed records independently of key order, record order and formatting.
+
+    Each record is serialized as canonical JSON and the serialized records are
+    hashed in sorted order, so the same data scraped twice gives the same
+    fingerprint even if pages or dict keys come back in a different order.
+    """
+    lines = sorted(
+        json.dumps(record, sort_keys=True, ensure_ascii=False, default=str)
+        for record in records
+    )
+    digest = hashlib.sha256()
+    for line in lines:
+        digest.update(line.encode("utf-8"))
+        digest.update(b"\n")
+    return "sha256:" + digest.hexdigest()
+
+
+def fingerprint_headers(headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Fingerprint an HTTP response from its validators, without reading the body.
+
+    Returns:
+        The ETag, or Last-Modified plus Content-Length, or None when the
+        server sends neither and the content has to be hashed instead.
+    """
+    etag = headers.get("ETag")
+    if etag:
+        return f"etag:{etag}"
+    last_modified = headers.get("Last-Modified")
+    if last_modified:
+        return f"last-modified:{last_modified};length={headers.get('Content-Length', '')}"
+    return None
+
+
+class RunManifest:
+    """
+    The run manifest of one pipeline, stored in GCS or on local disk.
+
+    The manifest records the fingerprint of the last successful run and a
+    short history of recent runs, including no-op runs.
+
+    Args:
+        pipeline_name: Name used in the manifest path.
+        bucket_name: GCS bucket to store the manifest in; local storage if None.
+        local_dir: Base directory for the local manifest.
+        prefix: Path prefix of the manifest in the bucket or local directory.
+    """
+
+    def __init__(
+        self,
+        pipeline_name: str,
+        bucket_name: Optional[str] = None,
+        local_dir: str = ".",
+        prefix: str = "manifests",
+    ):
+        self.pipeline_name = pipeline_name
+        self.bucket_name = bucket_name
+        self.path = f"{prefix}/{pipeline_name}/manifest.json"
+        self.local_path = os.path.join(local_dir, self.path)
+        self._manifest: Optional[Dict[str, Any]] = None
+
+    def _blob(self):
+        from google.cloud import storage
+
+        return storage.Client().bucket(self.bucket_name).blob(self.path)
+
+    def load(self) -> Dict[str, Any]:
+        """Load the manifest, or an empty one if none exists or it cannot be read."""
+        if self._manifest is not None:
+            return self._manifest
+        manifest = None
+        try:
+            if self.bucket_name:
+                blob = self._blob()
+                if blob.exists():
+                    manifest = json.loads(blob.download_as_text())
+            elif os.path.exists(self.local_path):
+                with open(self.local_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+        except Exception as e:
+            # A missing manifest only costs one full run, so this is not fatal
+            logger.warning(f"Could not load run manifest {self.path}: {e}")
+        self._manifest = manifest or {"pipeline": self.pipeline_name, "last_success": None, "runs": []}
+        return self._manifest
+
+    def save(self) -> None:
+        """Write the manifest back to storage."""
+        content = json.dumps(self.load(), indent=2, ensure_ascii=False)
+        if self.bucket_name:
+            self._blob().upload_from_string(content, content_type="application/json")
+        else:
+            os.makedirs(os.path.dirname(self.local_path), exist_ok=True)
+            with open(self.local_path, "w", encoding="utf-8") as f:
+                f.write(content)
+        logger.debug(f"Saved run manifest {self.path}")
+
+    @property
+    def last_fingerprint(self) -> Optional[str]:
+        """Fingerprint of the last successful run, if any."""
+        last_success = self.load().get("last_success")
+        return last_success.get("fingerprint") if last_success else None
+
+    def is_unchanged(self, fingerprint: Optional[str]) -> bool:
+        """Whether the source matches the last successful run."""
+        return fingerprint is not None and fingerprint == self.last_fingerprint
+
+    def _record(self, status: str, fingerprint: str, details: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {
+            "status": status,
+            "fingerprint": fingerprint,
+            "run_timestamp": datetime.now(timezone.utc).isoformat(),
+            **details,
+        }
+        manifest = self.load()
+        manifest["runs"] = (manifest.get("runs", []) + [entry])[-MAX_RUN_HISTORY:]
+        return entry
+
+    def record_success(self, fingerprint: str, **details: Any) -> None:
+        """Record a run that processed new source data."""
+        self.load()["last_success"] = self._record(STATUS_UPDATED, fingerprint, details)
+        self.save()
+
+    def record_noop(self, fingerprint: str, **details: Any) -> None:
+        """Record a run that stopped because the source was unchanged."""
+        self._record(STATUS_UNCHANGED, fingerprint, details)
+        self.save()
+        logger.info(f"[{self.pipeline_name}] Source unchanged since last successful run, recorded no-op run")
@@ -0,0 +1,166 @@
+"""Persistent on-disk HTTP cache with conditional revalidation for scrapers.
+
+Responses are stored per URL. When a page is requested again, a cached
+response with an ETag or Last-Modified validator is revalidated with a
+conditional request, so unchanged pages cost a 304 without a body. For servers
+that send neither, a cached response is reused without a request until its
+TTL expires, after which the page is downloaded again and its content hash
+tells whether it changed.
+
+A request may also pass a ``source_key``: a JSON-serializable description of
+whatever the page was linked from, such as a table row. When the key matches
+the one stored with the cached response, the response is reused without any
+request, which lets a scraper skip the sub-pages of rows that did not change.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from common.fingerprint import fingerprint_bytes, fingerprint_records
+
+logger = logging.getLogger(__name__)
+
+# Reuse period for responses without validators
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+
+def url_key(url: str) -> str:
+    """Cache key of a URL."""
+    return fingerprint_bytes(url.encode("utf-8")).split(":", 1)[1]
+
+
+class HttpCache:
+    """
+    A local HTTP response cache keyed by URL.
+
+    Each entry is a body file plus a small JSON metadata file holding the
+    validators, content hash and timestamps, sharded by key prefix under
+    ``cache_dir``.
+
+    Args:
+        cache_dir: Directory holding the cache.
+        ttl: Seconds a response without validators is reused without a request.
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.stats = {"fetched": 0, "not_modified": 0, "reused": 0, "changed": 0}
+
+    def _path(self, url: str, suffix: str) -> str:
+        key = url_key(url)
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{suffix}")
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Write to a temporary file first, so an interrupted run never leaves a torn entry
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the metadata of the cached response for a URL, if any."""
+        try:
+            with open(self._path(url, "json"), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._path(url, "body")):
+            return None
+        return entry
+
+    def read_body(self, url: str) -> bytes:
+        """Return the cached body for a URL."""
+        with open(self._path(url, "body"), "rb") as f:
+            return f.read()
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        headers: Dict[str, str],
+        source_key: Optional[str] = None,
+        charset: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Store a response and return its metadata."""
+        now = time.time()
+        entry = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_hash": fingerprint_bytes(body),
+            "charset": charset,
+            "source_key": source_key,
+            "fetched_at": now,
+            "validated_at": now,
+        }
+        self._write(self._path(url, "body"), body)
+        self._write_entry(url, entry)
+        return entry
+
+    def _write_entry(self, url: str, entry: Dict[str, Any]) -> None:
+        self._write(self._path(url, "json"), json.dumps(entry).encode("utf-8"))
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Whether a response without validators is still within its TTL."""
+        return time.time() - entry["validated_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Request headers that revalidate a cached response."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _cached_text(self, url: str, entry: Dict[str, Any]) -> str:
+        return self.read_body(url).decode(entry.get("charset") or "utf-8", errors="replace")
+
+    async def fetch(self, session, url: str, source_key: Any = None) -> str:
+        """
+        GET a page through the cache and return its text.
+
+        Args:
+            session: aiohttp client session.
+            url: URL of the page.
+            source_key: Description of what the page was linked from; a cached
+                response stored with the same key is reused without a request.
+
+        Returns:
+            The page text, from the cache or the server.
+        """
+        source = fingerprint_records([source_key]) if source_key is not None else None
+        entry = self.get(url)
+        headers = {}
+        if entry is not None:
+            if source is not None and entry.get("source_key") == source:
+                self.stats["reused"] += 1
+                return self._cached_text(url, entry)
+            headers = self.conditional_headers(entry)
+            if not headers and self.is_fresh(entry):
+                self.stats["reused"] += 1
+                return self._cached_text(url, entry)
+
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and entry is not None:
+                self.stats["not_modified"] += 1
+                entry["validated_at"] = time.time()
+                entry["source_key"] = source
+                self._write_entry(url, entry)
+                return self._cached_text(url, entry)
+            response.raise_for_status()
+            body = await response.read()
+            charset = response.charset
+
+        self.stats["fetched"] += 1
+        new_entry = self.put(url, body, response.headers, source_key=source, charset=charset)
+        if entry is not None and entry["content_hash"] != new_entry["content_hash"]:
+            self.stats["changed"] += 1
+        return body.decode(charset or "utf-8", errors="replace")
@@ -1,5 +1,6 @@
 import os
 import json
+import shutil
 from google.cloud import storage
 import pandas as pd
 from io import BytesIO
@@ -16,6 +17,10 @@ class StorageInterface:
     def read_json(self, src_path):
         """Load JSON data from the storage backend."""
         raise NotImplementedError("read_json must be implemented by subclasses")
+
+    def save_file(self, src_path, dst_path):
+        """Copy a local file, e.g. a Parquet file written by DuckDB, to the storage backend."""
+        raise NotImplementedError("save_file must be implemented by subclasses")
     
 
 class LocalStorage(StorageInterface):
@@ -41,6 +46,11 @@ class LocalStorage(StorageInterface):
         with open(full_path, 'r', encoding='utf-8') as f:
             return json.load(f)
 
+    def save_file(self, src_path, dst_path):
+        full_path = os.path.join(self.base_dir, dst_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        shutil.copyfile(src_path, full_path)
+
 class GCSStorage(StorageInterface):
     """Save JSON files to a Google Cloud Storage bucket."""
     def __init__(self, bucket_name):
@@ -64,3 +74,7 @@ class GCSStorage(StorageInterface):
         blob = self.bucket.blob(src_path)
         content = blob.download_as_string()
         return json.loads(content)
+
+    def save_file(self, src_path, dst_path):
+        blob = self.bucket.blob(dst_path)
+        blob.upload_from_filename(src_path, content_type="application/octet-stream")
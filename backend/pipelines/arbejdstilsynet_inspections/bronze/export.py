@@ -1,18 +1,94 @@
 import asyncio
 import datetime
+import io
 import json
 import logging
 import os
-import tempfile
+import sys
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from dotenv import load_dotenv
 from google.cloud import storage
-from playwright.async_api import async_playwright
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    FrameLocator,
+    Page,
+    Response,
+    async_playwright,
+)
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+ROOT = os.path.abspath(os.path.join(__file__, "..", "..", "..", ".."))
+sys.path.insert(0, ROOT)
+
+from bronze.querydata import fetch_query_data, filters_on_value
+from common.fingerprint import RunManifest, fingerprint_file
 
 # Load environment variables from .env file
 load_dotenv()
 
+DEFAULT_FILTERS = [
+    {"name": "Anlægsarbejde", "search_term": "Anlægs"},
+    {"name": "Landbrug, skovbrug og fiskeri", "search_term": "Landbrug"},
+    {"name": "Slagterier", "search_term": "Slagter"},
+]
+
+# Bounded retries: applying a filter within a page, and a whole export in a fresh context
+MAX_FILTER_ATTEMPTS = 3
+MAX_EXPORT_ATTEMPTS = 2
+QUERY_TIMEOUT = 30000
+DOWNLOAD_TIMEOUT = 30000
+
+REPORT_IFRAME = 'iframe[title="Power BI Report Viewer"]'
+REPORT_PAGE_XPATH = '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container[2]/transform/div/div[2]/div/div/visual-modern/div/div'
+TABLE_VISUAL_XPATH = '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container-group[2]/transform/div/div[2]/visual-container[1]/transform/div/div[2]/div/div/visual-modern/div'
+FILTER_SELECTOR_XPATH = '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container-group[1]/transform/div/div[2]/visual-container[3]/transform/div/div[2]/div/div/visual-modern/div/div/div[2]/div'
+HOVER_TARGET_XPATH = '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container[3]/transform/div/div[2]/div/div/visual-modern/div/div/div[2]/div[1]/div[1]/div/div/div/div[8]'
+OPTIONS_BUTTON_XPATH = '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container[3]/transform/div/visual-container-header/div/div/div/visual-container-options-menu/visual-header-item-container/div/button'
+
+
+def is_filter_response(filter_name: str):
+    """Returns a predicate for the data query response of the report filtered on ``filter_name``.
+
+    The slicer's own search also sends a data query, so the request body must
+    select the filter value for the response to match.
+    """
+
+    def predicate(response: Response) -> bool:
+        if "querydata" not in response.url.lower():
+            return False
+        try:
+            body = response.request.post_data_json
+        except Exception:
+            return False
+        return filters_on_value(body, filter_name)
+
+    return predicate
+
+
+def browser_launch_args() -> list[str]:
+    """Chromium flags needed to run inside Docker."""
+    is_docker = os.environ.get("DOCKER_ENV") or os.path.exists("/.dockerenv")
+    if not is_docker:
+        return []
+    return [
+        "--disable-dev-shm-usage",
+        "--no-sandbox",
+        "--disable-setuid-sandbox",
+        "--disable-gpu",
+        "--disable-software-rasterizer",
+    ]
+
+
+def table_to_csv(table: pa.Table) -> bytes:
+    """Serializes an Arrow table to CSV bytes in the layout of the report's CSV export."""
+    buffer = io.BytesIO()
+    pa_csv.write_csv(table, buffer)
+    return buffer.getvalue()
+
 
 class GCSStorage:
     """Google Cloud Storage backend for arbejdstilsynet_inspections files."""
@@ -65,9 +141,18 @@ class BronzePipeline:
         source_url: str | None,
         gcs_bucket: str | None = None,
         log_level: str = "INFO",
+        manifest: RunManifest | None = None,
+        force: bool = False,
+        parallel_export: bool = True,
+        extraction_mode: str = "query",
     ):
         self.pipeline_name = pipeline_name
         self.source_url = source_url
+        self.manifest = manifest
+        self.force = force
+        self.parallel_export = parallel_export
+        self.extraction_mode = extraction_mode
+        self.fingerprint = None
         self.pipeline_root_dir = Path(__file__).resolve().parent.parent
         self.bronze_data_dir = self.pipeline_root_dir / "bronze" / "data"
         self.gcs_bucket = gcs_bucket
@@ -94,166 +179,248 @@ class BronzePipeline:
             )
             logging.info(f"GCS storage initialized with bucket: {self.gcs_bucket}")
 
-    async def fetch_data_with_playwright(
-        self, filters_to_apply=None
-    ) -> list[tuple[str, bytes]]:
-        """Fetches data using Playwright automation. Returns list of (filter_name, csv_bytes)."""
-        if filters_to_apply is None:
-            filters_to_apply = [
-                {"name": "Anlægsarbejde", "search_term": "Anlægs"},
-                {"name": "Landbrug, skovbrug og fiskeri", "search_term": "Landbrug"},
-                {"name": "Slagterier", "search_term": "Slagter"},
-            ]
-        results = []
-        async with async_playwright() as playwright:
-            is_docker = os.environ.get("DOCKER_ENV") or os.path.exists("/.dockerenv")
-            browser_args = []
-            if is_docker:
-                browser_args = [
-                    "--disable-dev-shm-usage",
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-gpu",
-                    "--disable-software-rasterizer",
-                ]
-            browser_options = {"args": browser_args, "headless": False}
-            browser = await playwright.chromium.launch(**browser_options)
-            context = await browser.new_context(
-                accept_downloads=True, viewport={"width": 1920, "height": 1080}
-            )
-            page = await context.new_page()
+    async def _open_report(self, context: BrowserContext) -> tuple[Page, FrameLocator]:
+        """Opens the report in a new page of ``context`` and navigates to the table visual."""
+        page = await context.new_page()
+
+        page.on("crash", lambda: logging.error("Browser page crashed"))
+        page.on("pageerror", lambda error: logging.error(f"Page error: {error}"))
 
-            page.on("crash", lambda: logging.error("Browser page crashed"))
-            page.on("pageerror", lambda error: logging.error(f"Page error: {error}"))
+        await page.goto(self.source_url, wait_until="networkidle", timeout=120000)
+        await page.wait_for_selector(REPORT_IFRAME, state="visible", timeout=30000)
+        powerbi_frame = page.frame_locator(REPORT_IFRAME)
 
-            await page.goto(self.source_url, wait_until="networkidle", timeout=120000)
-            await page.wait_for_timeout(5000)
+        # Each click waits for its target to render instead of sleeping
+        await powerbi_frame.locator(REPORT_PAGE_XPATH).click(timeout=120000)
+        await powerbi_frame.locator(TABLE_VISUAL_XPATH).click(timeout=30000)
+        await powerbi_frame.locator(FILTER_SELECTOR_XPATH).wait_for(
+            state="visible", timeout=30000
+        )
+        return page, powerbi_frame
 
+    async def _apply_filter(
+        self, page: Page, powerbi_frame: FrameLocator, filter_info: dict
+    ) -> None:
+        """Selects an industry in the report's filter, retrying up to MAX_FILTER_ATTEMPTS times."""
+        filter_name = filter_info["name"]
+        for attempt in range(1, MAX_FILTER_ATTEMPTS + 1):
+            clicked = False
             try:
-                await page.wait_for_selector(
-                    'iframe[title="Power BI Report Viewer"]',
-                    state="visible",
-                    timeout=30000,
+                await powerbi_frame.locator(FILTER_SELECTOR_XPATH).click(timeout=10000)
+                await page.keyboard.press("ControlOrMeta+A")
+                await page.keyboard.press("Backspace")
+                await page.keyboard.type(filter_info["search_term"], delay=100)
+                # The report is done filtering once its data query returns
+                async with page.expect_response(
+                    is_filter_response(filter_name), timeout=QUERY_TIMEOUT
+                ):
+                    await powerbi_frame.locator(
+                        "span:text-is('%s')" % filter_name
+                    ).click(timeout=5000)
+                    clicked = True
+                return
+            except PlaywrightTimeoutError as e:
+                if clicked:
+                    logging.warning(
+                        "[Playwright] No data query seen after filtering on '%s', continuing",
+                        filter_name,
+                    )
+                    return
+                logging.warning(
+                    "[Playwright] Could not apply filter '%s' (attempt %d/%d): %s",
+                    filter_name,
+                    attempt,
+                    MAX_FILTER_ATTEMPTS,
+                    e,
                 )
-                powerbi_frame = page.frame_locator(
-                    'iframe[title="Power BI Report Viewer"]'
+        raise RuntimeError(
+            "Could not apply filter '%s' after %d attempts"
+            % (filter_name, MAX_FILTER_ATTEMPTS)
+        )
+
+    async def _export_csv(self, page: Page, powerbi_frame: FrameLocator) -> bytes:
+        """Exports the table visual as CSV through its options menu and returns the file contents."""
+        await powerbi_frame.locator(HOVER_TARGET_XPATH).hover()
+        await powerbi_frame.locator(OPTIONS_BUTTON_XPATH).click()
+        try:
+            await powerbi_frame.locator('//*[@id="0"]').click(timeout=3000)
+        except Exception:
+            try:
+                await powerbi_frame.locator("span:text-is('Export data')").click(
+                    timeout=3000
                 )
-                await page.wait_for_timeout(5000)
+            except Exception:
                 await powerbi_frame.locator(
-                    '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container[2]/transform/div/div[2]/div/div/visual-modern/div/div'
-                ).click(timeout=120000)
-                await page.wait_for_timeout(3000)
+                    "span:text-matches('Export', 'i')"
+                ).first.click(timeout=3000)
+
+        try:
+            await powerbi_frame.locator(
+                '//div[contains(@class, "export-data-dialog")]//*[contains(text(), "File format") or contains(@aria-label, "format")]//button'
+            ).click(timeout=5000)
+        except Exception:
+            await powerbi_frame.locator(
+                "mat-dialog-content pbi-dropdown button"
+            ).click(timeout=5000)
+
+        try:
+            await powerbi_frame.locator(
+                "div.pbi-dropdown-item:has-text('CSV')"
+            ).click(timeout=5000)
+        except Exception:
+            await powerbi_frame.locator("pbi-dropdown-item").nth(1).click(
+                timeout=5000
+            )
+
+        async with page.expect_download(timeout=DOWNLOAD_TIMEOUT) as download_info:
+            try:
                 await powerbi_frame.locator(
-                    '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container-group[2]/transform/div/div[2]/visual-container[1]/transform/div/div[2]/div/div/visual-modern/div'
-                ).click(timeout=10000)
-                await page.wait_for_timeout(3000)
-
-                filter_selector_xpath = '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container-group[1]/transform/div/div[2]/visual-container[3]/transform/div/div[2]/div/div/visual-modern/div/div/div[2]/div'
-                hover_target_xpath = '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container[3]/transform/div/div[2]/div/div/visual-modern/div/div/div[2]/div[1]/div[1]/div/div/div/div[8]'
-                options_button_xpath = '//*[@id="pvExplorationHost"]/div/div/exploration/div/explore-canvas/div/div[2]/div/div[2]/div[2]/visual-container-repeat/visual-container[3]/transform/div/visual-container-header/div/div/div/visual-container-options-menu/visual-header-item-container/div/button'
-
-                for filter_info in filters_to_apply:
-                    filter_name = filter_info["name"]
-                    search_term = filter_info["search_term"]
-                    while True:
+                    "mat-dialog-actions button:has-text('Export')"
+                ).click(timeout=5000)
+            except Exception:
+                await powerbi_frame.locator("mat-dialog-actions button").first.click(
+                    timeout=5000
+                )
+
+        download = await download_info.value
+        # Resolves once the download has finished
+        download_path = await download.path()
+        with open(download_path, "rb") as f:
+            return f.read()
+
+    async def _export_filter(
+        self, browser: Browser, filter_info: dict
+    ) -> tuple[str, bytes] | None:
+        """Exports one filter in its own browser context, retrying up to MAX_EXPORT_ATTEMPTS times."""
+        filter_name = filter_info["name"]
+        for attempt in range(1, MAX_EXPORT_ATTEMPTS + 1):
+            context = await browser.new_context(
+                accept_downloads=True, viewport={"width": 1920, "height": 1080}
+            )
+            try:
+                page, powerbi_frame = await self._open_report(context)
+                await self._apply_filter(page, powerbi_frame, filter_info)
+                csv_bytes = await self._export_csv(page, powerbi_frame)
+                logging.info(
+                    "[Playwright] Successfully downloaded CSV for '%s'", filter_name
+                )
+                return filter_name, csv_bytes
+            except Exception as e:
+                logging.error(
+                    "[Playwright] Export failed for '%s' (attempt %d/%d): %s",
+                    filter_name,
+                    attempt,
+                    MAX_EXPORT_ATTEMPTS,
+                    e,
+                )
+            finally:
+                await context.close()
+        return None
+
+    async def fetch_data_with_playwright(
+        self, filters_to_apply=None, parallel: bool | None = None
+    ) -> list[tuple[str, bytes]]:
+        """Fetches data using Playwright automation. Returns list of (filter_name, csv_bytes).
+
+        In parallel mode every filter is exported concurrently in its own
+        browser context, so the run takes about as long as the slowest
+        export. Otherwise the filters are applied one after another in a
+        single page. Results are in the order of ``filters_to_apply``.
+
+        Raises:
+            RuntimeError: If any filter could not be exported, so a run never
+                continues with only part of the data.
+        """
+        if filters_to_apply is None:
+            filters_to_apply = DEFAULT_FILTERS
+        if parallel is None:
+            parallel = self.parallel_export
+        results = []
+        failed = []
+        async with async_playwright() as playwright:
+            browser_options = {"args": browser_launch_args(), "headless": False}
+            browser = await playwright.chromium.launch(**browser_options)
+
+            try:
+                if parallel:
+                    exports = await asyncio.gather(
+                        *(
+                            self._export_filter(browser, filter_info)
+                            for filter_info in filters_to_apply
+                        )
+                    )
+                    results = [export for export in exports if export is not None]
+                    failed = [
+                        filter_info["name"]
+                        for filter_info, export in zip(filters_to_apply, exports)
+                        if export is None
+                    ]
+                else:
+                    context = await browser.new_context(
+                        accept_downloads=True, viewport={"width": 1920, "height": 1080}
+                    )
+                    page, powerbi_frame = await self._open_report(context)
+                    for filter_info in filters_to_apply:
+                        filter_name = filter_info["name"]
                         try:
-                            await powerbi_frame.locator(filter_selector_xpath).click(
-                                timeout=10000
+                            await self._apply_filter(page, powerbi_frame, filter_info)
+                            csv_bytes = await self._export_csv(page, powerbi_frame)
+                            results.append((filter_name, csv_bytes))
+                            logging.info(
+                                "[Playwright] Successfully downloaded CSV for '%s'",
+                                filter_name,
                             )
-                            await asyncio.sleep(0.2)
-                            await page.keyboard.press("ControlOrMeta+A")
-                            await asyncio.sleep(0.2)
-                            await page.keyboard.press("Backspace")
-                            await page.keyboard.type(search_term, delay=100)
-                            await powerbi_frame.locator(
-                                "span:text-is('%s')" % filter_name
-                            ).click(timeout=5000)
-                            break
                         except Exception as e:
                             logging.error(
-                                "[Playwright] Could not apply filter '%s': %s",
+                                "[Playwright] Export failed for '%s': %s",
                                 filter_name,
                                 e,
                             )
-                            continue
-
-                    await page.wait_for_timeout(3000)
-
-                    try:
-                        await powerbi_frame.locator(hover_target_xpath).hover()
-                        await powerbi_frame.locator(options_button_xpath).click()
-                        try:
-                            await powerbi_frame.locator('//*[@id="0"]').click(
-                                timeout=3000
-                            )
-                        except:
-                            try:
-                                await powerbi_frame.locator(
-                                    "span:text-is('Export data')"
-                                ).click(timeout=3000)
-                            except:
-                                await powerbi_frame.locator(
-                                    "span:text-matches('Export', 'i')"
-                                ).first.click(timeout=3000)
-
-                        await page.wait_for_timeout(1000)
-
-                        try:
-                            await powerbi_frame.locator(
-                                '//div[contains(@class, "export-data-dialog")]//*[contains(text(), "File format") or contains(@aria-label, "format")]//button'
-                            ).click(timeout=5000)
-                        except:
-                            await powerbi_frame.locator(
-                                "mat-dialog-content pbi-dropdown button"
-                            ).click(timeout=5000)
-
-                        await page.wait_for_timeout(500)
-                        try:
-                            await powerbi_frame.locator(
-                                "div.pbi-dropdown-item:has-text('CSV')"
-                            ).click(timeout=5000)
-                        except:
-                            await (
-                                powerbi_frame.locator("pbi-dropdown-item")
-                                .nth(1)
-                                .click(timeout=5000)
-                            )
-
-                        async with page.expect_download(timeout=30000) as download_info:
-                            try:
-                                await powerbi_frame.locator(
-                                    "mat-dialog-actions button:has-text('Export')"
-                                ).click(timeout=5000)
-                            except:
-                                await powerbi_frame.locator(
-                                    "mat-dialog-actions button"
-                                ).first.click(timeout=5000)
-
-                        download = await download_info.value
-                        # Save download to a temp file and return bytes
-                        with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                            await download.save_as(tmp_file.name)
-                            with open(tmp_file.name, "rb") as f:
-                                csv_bytes = f.read()
-                        results.append((filter_name, csv_bytes))
-                        logging.info(
-                            "[Playwright] Successfully downloaded CSV for '%s'",
-                            filter_name,
-                        )
-                        # wait for the download to complete
-                        await page.wait_for_timeout(5000)
-
-                    except Exception as e:
-                        logging.error(
-                            "[Playwright] Export failed for '%s': %s", filter_name, e
-                        )
-                        continue
+                            failed.append(filter_name)
 
             finally:
                 await browser.close()
 
+        if failed:
+            raise RuntimeError(
+                "Export failed for %d of %d filters: %s"
+                % (len(failed), len(filters_to_apply), ", ".join(failed))
+            )
         return results
 
+    async def fetch_data(self, filters_to_apply=None) -> list[tuple[str, bytes]]:
+        """Fetches CSV data per filter. Returns list of (filter_name, csv_bytes).
+
+        In ``query`` mode the report's querydata requests are replayed
+        headless; if that fails or misses a filter, the UI export is used
+        instead. ``export`` mode always uses the UI export.
+        """
+        if filters_to_apply is None:
+            filters_to_apply = DEFAULT_FILTERS
+        if self.extraction_mode == "query":
+            try:
+                tables = await fetch_query_data(
+                    self.source_url, filters_to_apply, browser_launch_args()
+                )
+                results = [
+                    (filter_name, table_to_csv(table))
+                    for filter_name, table in tables
+                    if table.num_rows
+                ]
+                if len(results) == len(filters_to_apply):
+                    return results
+                logging.warning(
+                    "[QueryData] Got rows for %d of %d filters, falling back to UI export",
+                    len(results),
+                    len(filters_to_apply),
+                )
+            except Exception as e:
+                logging.warning(
+                    "[QueryData] Query extraction failed, falling back to UI export: %s",
+                    e,
+                )
+        return await self.fetch_data_with_playwright(filters_to_apply)
+
     def save_raw_data(
         self, data: bytes, filter_name: str = None
     ) -> tuple[Path | None, str | None]:
@@ -375,20 +542,18 @@ class BronzePipeline:
                 e,
             )
 
-    async def run(self) -> None:
-        """Executes the bronze layer pipeline steps using Playwright only."""
+    async def run(self) -> bool:
+        """Executes the bronze layer pipeline steps.
+
+        Returns:
+            False if the merged data matches the last successful run, in which
+            case nothing is kept or uploaded and a no-op run is recorded.
+        """
         logging.info(
             "Starting bronze layer processing for pipeline: %s", self.pipeline_name
         )
-        filters = [
-            {"name": "Anlægsarbejde", "search_term": "Anlægs"},
-            {"name": "Landbrug, skovbrug og fiskeri", "search_term": "Landbrug"},
-            {"name": "Slagterier", "search_term": "Slagter"},
-        ]
-        results = await self.fetch_data_with_playwright(filters)
-        logging.info(
-            f"Bronze pipeline: fetch_data_with_playwright returned {len(results)} results."
-        )
+        results = await self.fetch_data(DEFAULT_FILTERS)
+        logging.info(f"Bronze pipeline: fetch_data returned {len(results)} results.")
         if results:
             for i, (name, data_sample) in enumerate(results):
                 logging.info(
@@ -442,6 +607,26 @@ class BronzePipeline:
             "[%s] Merged data saved to: %s", self.pipeline_name, merged_file_path
         )
 
+        # Delete the temp directory and all its contents
+        import shutil
+
+        try:
+            shutil.rmtree(temp_dir)
+            logging.info("Temporary folder '%s' deleted after merging.", temp_dir)
+        except Exception as e:
+            logging.warning("Could not delete temp folder '%s': %s", temp_dir, e)
+
+        self.fingerprint = fingerprint_file(str(merged_file_path))
+        if self.manifest and not self.force and self.manifest.is_unchanged(self.fingerprint):
+            logging.info(
+                "[%s] Source unchanged since last successful run, discarding %s",
+                self.pipeline_name,
+                storage_dir,
+            )
+            shutil.rmtree(storage_dir, ignore_errors=True)
+            self.manifest.record_noop(self.fingerprint)
+            return False
+
         # Create metadata
         self.create_metadata_file(timestamp_str, merged_file_path)
 
@@ -453,22 +638,27 @@ class BronzePipeline:
                     f"Bronze pipeline: Failed to upload {merged_file_path} to GCS."
                 )
 
-        # Delete the temp directory and all its contents
-        import shutil
-
-        try:
-            shutil.rmtree(temp_dir)
-            logging.info("Temporary folder '%s' deleted after merging.", temp_dir)
-        except Exception as e:
-            logging.warning("Could not delete temp folder '%s': %s", temp_dir, e)
-
         logging.info(
             "[%s] Bronze layer processing completed for merged data.",
             self.pipeline_name,
         )
-
-
-def main(log_level: str = "INFO", gcs_bucket: str | None = None) -> None:
+        return True
+
+
+def main(
+    log_level: str = "INFO",
+    gcs_bucket: str | None = None,
+    manifest: RunManifest | None = None,
+    force: bool = False,
+    parallel_export: bool = True,
+    extraction_mode: str = "query",
+) -> tuple[bool, str | None]:
+    """Run the bronze pipeline.
+
+    Returns:
+        (changed, fingerprint) where changed is False when the source matched
+        the last successful run recorded in the manifest.
+    """
     # Environment variable loading is done at the top of the script
     # load_dotenv()
 
@@ -480,12 +670,17 @@ def main(log_level: str = "INFO", gcs_bucket: str | None = None) -> None:
         source_url=source_url,
         gcs_bucket=gcs_bucket,
         log_level=log_level,
+        manifest=manifest,
+        force=force,
+        parallel_export=parallel_export,
+        extraction_mode=extraction_mode,
     )
     try:
-        asyncio.run(pipeline.run())
+        changed = asyncio.run(pipeline.run())
         logging.info(
             f"Bronze pipeline ({pipeline_name}) completed successfully through main."
         )
+        return changed, pipeline.fingerprint
     except RuntimeError as e:
         logging.error(f"Bronze pipeline ({pipeline_name}) failed: {e}")
         raise
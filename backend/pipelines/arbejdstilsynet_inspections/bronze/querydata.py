@@ -0,0 +1,352 @@
+"""Headless extraction of the Power BI report through its querydata API.
+
+Instead of clicking through the report and exporting CSVs, the report is
+loaded headless once while its ``querydata`` requests are intercepted. The
+request behind the inspections table is then replayed directly, once per
+industry filter and page by page, and the semantic-model rows in the
+responses are decoded into Arrow tables.
+"""
+
+import asyncio
+import copy
+import datetime
+import json
+import logging
+from dataclasses import dataclass, field
+
+import pyarrow as pa
+from playwright.async_api import APIRequestContext, Page, Request, Route, async_playwright
+
+QUERYDATA_MARKER = "querydata"
+PAGE_SIZE = 5000
+MAX_PAGES = 1000
+CAPTURE_TIMEOUT = 120000
+
+# Data shape value types in query responses that hold dates as epoch milliseconds
+DATETIME_TYPES = {7}
+
+# Request headers that belong to the original connection and must not be replayed
+DROPPED_HEADERS = {"content-length", "host", "connection", "accept-encoding", "cookie"}
+
+
+@dataclass
+class CapturedQuery:
+    """A querydata request sent by the report, with the response it got."""
+
+    url: str
+    headers: dict
+    body: dict
+    response: dict | None = None
+
+    @property
+    def command(self) -> dict:
+        return self.body["queries"][0]["Query"]["Commands"][0][
+            "SemanticQueryDataShapeCommand"
+        ]
+
+    @property
+    def select(self) -> list[dict]:
+        return self.command["Query"].get("Select", [])
+
+
+@dataclass
+class FilterColumn:
+    """The model column the industry filter of the report selects on."""
+
+    entity: str
+    property: str
+    values: list = field(default_factory=list)
+
+
+async def capture_queries(page: Page, source_url: str) -> list[CapturedQuery]:
+    """Loads the report in ``page`` and returns the querydata requests it sends, with their responses."""
+    captured: list[CapturedQuery] = []
+
+    def is_querydata(url: str) -> bool:
+        return QUERYDATA_MARKER in url.lower()
+
+    async def intercept(route: Route, request: Request) -> None:
+        if request.method != "POST":
+            await route.continue_()
+            return
+        response = await route.fetch()
+        query = CapturedQuery(
+            url=request.url,
+            headers={
+                name: value
+                for name, value in request.headers.items()
+                if name.lower() not in DROPPED_HEADERS and not name.startswith(":")
+            },
+            body=request.post_data_json,
+        )
+        try:
+            query.response = await response.json()
+        except Exception as e:
+            logging.warning("[QueryData] Could not decode captured response: %s", e)
+        captured.append(query)
+        await route.fulfill(response=response)
+
+    await page.route(is_querydata, intercept)
+    await page.goto(source_url, wait_until="networkidle", timeout=CAPTURE_TIMEOUT)
+    await page.unroute(is_querydata, intercept)
+    logging.info("[QueryData] Captured %d querydata requests", len(captured))
+    return captured
+
+
+def _dataset(response: dict) -> dict:
+    return response["results"][0]["result"]["data"]["dsr"]["DS"][0]
+
+
+def _column_names(query: CapturedQuery, response: dict) -> dict[str, str]:
+    """Maps the value keys of a response (``G0``, ``M0``, ...) to column names."""
+    names = {}
+    for item in query.select:
+        names[item["Name"]] = item.get("NativeReferenceName") or item["Name"].split(".")[-1]
+    descriptor = response["results"][0]["result"]["data"]["descriptor"]
+    return {
+        selected["Value"]: names.get(selected.get("Name"), selected.get("Name", selected["Value"]))
+        for selected in descriptor["Select"]
+    }
+
+
+def decode_rows(query: CapturedQuery, response: dict) -> tuple[list[str], list[list], list | None]:
+    """Decodes a querydata response into column names, rows and the restart tokens of the next page.
+
+    Rows in the response are compressed: ``R`` is a bitmask of columns
+    repeated from the previous row, ``Ø`` a bitmask of null columns, ``C``
+    holds the remaining values, and columns with a ``DN`` store indexes
+    into the dataset's ``ValueDicts``.
+    """
+    dataset = _dataset(response)
+    names = _column_names(query, response)
+    value_dicts = dataset.get("ValueDicts", {})
+    schema: list[dict] = []
+    columns: list[str] = []
+    rows: list[list] = []
+    previous: list = []
+
+    for row in dataset["PH"][0].get("DM0", []):
+        if "S" in row:
+            schema = row["S"]
+            columns = [names.get(column["N"], column["N"]) for column in schema]
+            previous = [None] * len(schema)
+        repeated = row.get("R", 0)
+        nulls = row.get("Ø", 0)
+        values = iter(row.get("C", []))
+        decoded = []
+        for i, column in enumerate(schema):
+            bit = 1 << i
+            if repeated & bit:
+                value = previous[i]
+            elif nulls & bit:
+                value = None
+            else:
+                value = next(values, None)
+                if column.get("DN") and isinstance(value, int):
+                    value = value_dicts[column["DN"]][value]
+                elif column.get("T") in DATETIME_TYPES and isinstance(value, (int, float)):
+                    value = datetime.datetime.fromtimestamp(value / 1000, datetime.timezone.utc)
+            decoded.append(value)
+        rows.append(decoded)
+        previous = decoded
+
+    # ``IC`` marks a complete result; otherwise ``RT`` resumes after the last row
+    restart_tokens = None if dataset.get("IC") else dataset.get("RT")
+    return columns, rows, restart_tokens
+
+
+def _column_array(values: list) -> pa.Array:
+    """Builds the Arrow array of one column.
+
+    Date and datetime columns share one type in the data shape, and dates
+    arrive as midnight timestamps. A column only becomes a date column when
+    all its values are midnight, so it never mixes dates and timestamps.
+    """
+    present = [value for value in values if value is not None]
+    if present and all(
+        isinstance(value, datetime.datetime) and value.time() == datetime.time(0)
+        for value in present
+    ):
+        values = [value.date() if value is not None else None for value in values]
+    return pa.array(values)
+
+
+def rows_to_arrow(columns: list[str], rows: list[list]) -> pa.Table:
+    """Builds an Arrow table from decoded rows, deciding the type of each column over all its values."""
+    return pa.table({name: _column_array([row[i] for row in rows]) for i, name in enumerate(columns)})
+
+
+def find_filter_column(captured: list[CapturedQuery], filter_values: list[str]) -> FilterColumn:
+    """Finds the slicer column holding the industry names among the captured single-column queries."""
+    for query in captured:
+        if query.response is None or len(query.select) != 1 or "Column" not in query.select[0]:
+            continue
+        try:
+            _, rows, _ = decode_rows(query, query.response)
+        except (KeyError, IndexError, TypeError):
+            continue
+        values = [row[0] for row in rows]
+        if any(value in values for value in filter_values):
+            column = query.select[0]["Column"]
+            source = column["Expression"]["SourceRef"]["Source"]
+            entity = next(
+                item["Entity"] for item in query.command["Query"]["From"] if item["Name"] == source
+            )
+            return FilterColumn(entity=entity, property=column["Property"], values=values)
+    raise ValueError("No captured query lists the industry filter values")
+
+
+def find_table_query(captured: list[CapturedQuery]) -> CapturedQuery:
+    """The captured query selecting the most columns, which is the inspections table."""
+    candidates = [query for query in captured if query.select]
+    if not candidates:
+        raise ValueError("No querydata requests were captured")
+    return max(candidates, key=lambda query: len(query.select))
+
+
+def filter_literal(value: str) -> dict:
+    """The query literal of a text value, as used in filter conditions."""
+    return {"Literal": {"Value": "'%s'" % value.replace("'", "''")}}
+
+
+def filters_on_value(body: dict | None, value: str) -> bool:
+    """Whether a querydata request body has an ``In`` condition selecting ``value``.
+
+    Slicer searches send ``Contains`` conditions on the search term instead,
+    so their requests do not match.
+    """
+    literal = filter_literal(value)
+
+    def visit(node) -> bool:
+        if isinstance(node, dict):
+            condition = node.get("In")
+            if isinstance(condition, dict) and any(
+                literal in values for values in condition.get("Values", [])
+            ):
+                return True
+            return any(visit(child) for child in node.values())
+        if isinstance(node, list):
+            return any(visit(child) for child in node)
+        return False
+
+    return visit(body)
+
+
+def build_query(
+    template: CapturedQuery,
+    column: FilterColumn,
+    value: str,
+    restart_tokens: list | None = None,
+    page_size: int = PAGE_SIZE,
+) -> dict:
+    """Returns a copy of the table query filtered on ``value`` and windowed to one page."""
+    body = copy.deepcopy(template.body)
+    command = body["queries"][0]["Query"]["Commands"][0]["SemanticQueryDataShapeCommand"]
+    query = command["Query"]
+
+    sources = query.setdefault("From", [])
+    alias = next((item["Name"] for item in sources if item["Entity"] == column.entity), None)
+    if alias is None:
+        alias = "filter%d" % len(sources)
+        sources.append({"Name": alias, "Entity": column.entity, "Type": 0})
+
+    def on_filter_column(condition: dict) -> bool:
+        return column.property in json.dumps(condition)
+
+    query["Where"] = [
+        condition for condition in query.get("Where", []) if not on_filter_column(condition)
+    ]
+    query["Where"].append(
+        {
+            "Condition": {
+                "In": {
+                    "Expressions": [
+                        {
+                            "Column": {
+                                "Expression": {"SourceRef": {"Source": alias}},
+                                "Property": column.property,
+                            }
+                        }
+                    ],
+                    "Values": [[filter_literal(value)]],
+                }
+            }
+        }
+    )
+
+    window = {"Count": page_size}
+    if restart_tokens:
+        window["RestartTokens"] = restart_tokens
+    primary = command.setdefault("Binding", {}).setdefault("DataReduction", {}).setdefault("Primary", {})
+    primary.pop("Top", None)
+    primary["Window"] = window
+    return body
+
+
+async def replay_filter(
+    request_context: APIRequestContext,
+    template: CapturedQuery,
+    column: FilterColumn,
+    value: str,
+    page_size: int = PAGE_SIZE,
+) -> pa.Table:
+    """Replays the table query for one filter value, following restart tokens across pages."""
+    columns: list[str] = []
+    rows: list[list] = []
+    restart_tokens = None
+    for page_number in range(1, MAX_PAGES + 1):
+        body = build_query(template, column, value, restart_tokens, page_size)
+        response = await request_context.post(
+            template.url, headers=template.headers, data=json.dumps(body)
+        )
+        if not response.ok:
+            raise RuntimeError(
+                "querydata request for '%s' failed with status %d" % (value, response.status)
+            )
+        page_columns, page_rows, restart_tokens = decode_rows(template, await response.json())
+        columns = columns or page_columns
+        rows.extend(page_rows)
+        logging.debug("[QueryData] '%s' page %d: %d rows", value, page_number, len(page_rows))
+        if not restart_tokens:
+            break
+    else:
+        logging.warning("[QueryData] Stopped '%s' after %d pages", value, MAX_PAGES)
+    logging.info("[QueryData] Fetched %d rows for '%s'", len(rows), value)
+    return rows_to_arrow(columns, rows)
+
+
+async def replay_filters(
+    request_context: APIRequestContext,
+    template: CapturedQuery,
+    column: FilterColumn,
+    filters: list[dict],
+    page_size: int = PAGE_SIZE,
+) -> list[tuple[str, pa.Table]]:
+    """Replays the table query for every filter concurrently. Returns (filter_name, table) pairs in order."""
+    tables = await asyncio.gather(
+        *(
+            replay_filter(request_context, template, column, filter_info["name"], page_size)
+            for filter_info in filters
+        )
+    )
+    return [(filter_info["name"], table) for filter_info, table in zip(filters, tables)]
+
+
+async def fetch_query_data(
+    source_url: str, filters: list[dict], browser_args: list[str] | None = None
+) -> list[tuple[str, pa.Table]]:
+    """Captures the report's querydata requests headless and replays them per filter."""
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(args=browser_args or [], headless=True)
+        try:
+            context = await browser.new_context()
+            page = await context.new_page()
+            captured = await capture_queries(page, source_url)
+            template = find_table_query(captured)
+            column = find_filter_column(captured, [filter_info["name"] for filter_info in filters])
+            logging.info(
+                "[QueryData] Filtering table query on %s.%s", column.entity, column.property
+            )
+            return await replay_filters(context.request, template, column, filters)
+        finally:
+            await browser.close()
@@ -3,8 +3,13 @@ import logging
 import os
 import sys
 
+# backend/ holds the shared ``common`` package; in the Docker image it is copied to /app/common
+ROOT = os.path.abspath(os.path.join(__file__, "..", "..", ".."))
+sys.path.insert(0, ROOT)
+
 import bronze.export
 import silver.transform
+from common.fingerprint import RunManifest
 from dotenv import load_dotenv
 
 PIPELINE_ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -52,6 +57,25 @@ def parse_args():
     parser.add_argument(
         "--stage", type=str, choices=["all", "bronze", "silver"], default="all"
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run the silver stage even if the source is unchanged since the last run",
+    )
+    parser.add_argument(
+        "--export-mode",
+        type=str,
+        choices=["parallel", "sequential"],
+        default="parallel",
+        help="Export the industry filters concurrently in separate browser contexts, or one after another",
+    )
+    parser.add_argument(
+        "--extraction-mode",
+        type=str,
+        choices=["query", "export"],
+        default="query",
+        help="Replay the report's data queries headless (falls back to export), or export CSVs through the UI",
+    )
 
     return parser.parse_args()
 
@@ -84,12 +108,26 @@ if __name__ == "__main__":
 
     bronze_success = True
     silver_success = True
+    source_changed = True
+    fingerprint = None
+    manifest = RunManifest(
+        "arbejdstilsynet_inspections",
+        bucket_name=actual_gcs_bucket,
+        local_dir=PIPELINE_ROOT,
+    )
 
     try:
         # Run Bronze Layer
         if args.stage in ["all", "bronze"]:
             print("[main.py] Running Bronze Layer: export.py ...")
-            bronze.export.main(log_level=args.log_level, gcs_bucket=actual_gcs_bucket)
+            source_changed, fingerprint = bronze.export.main(
+                log_level=args.log_level,
+                gcs_bucket=actual_gcs_bucket,
+                manifest=manifest,
+                force=args.force,
+                parallel_export=args.export_mode == "parallel",
+                extraction_mode=args.extraction_mode,
+            )
             print("[main.py] Bronze Layer complete.")
         else:
             logger.info("Skipping Bronze Layer due to --stage setting.")
@@ -102,7 +140,9 @@ if __name__ == "__main__":
         # but the overall pipeline will fail.
 
     if args.stage in ["all", "silver"]:
-        if not bronze_success and args.stage == "all":
+        if not source_changed:
+            logger.info("Skipping Silver Layer because the source is unchanged.")
+        elif not bronze_success and args.stage == "all":
             logger.warning("Skipping Silver Layer because Bronze Layer failed.")
             silver_success = (
                 False  # Ensure silver is also marked as failed if bronze did
@@ -118,6 +158,8 @@ if __name__ == "__main__":
                     log_level=args.log_level,
                 )
                 print("[main.py] Silver Layer complete.")
+                if fingerprint:
+                    manifest.record_success(fingerprint)
             except (
                 RuntimeError
             ) as e:  # Catching the specific exception from silver.transform.main
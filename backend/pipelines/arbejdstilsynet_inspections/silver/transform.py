@@ -1,15 +1,36 @@
+import hashlib
+import json
 import logging
 import os
-import re
 import shutil
 import sys
 import tempfile
-import uuid
 from datetime import datetime
 
 import ibis
 from google.cloud import storage
 
+# Ten-digit numbers such as CPR numbers
+PII_PATTERN = r"\b\d{10}\b"
+# Environment variable holding the HMAC key used to pseudonymize PII
+PII_SECRET_ENV = "PII_HASH_SECRET"
+HMAC_BLOCK_SIZE = 64
+
+
+@ibis.udf.scalar.builtin
+def pii_pseudonymize(value: str) -> str:
+    """Value with each ``PII_PATTERN`` match replaced by its hex HMAC-SHA256; a DuckDB macro created by
+    ``SilverPipeline.register_pseudonym_macro``."""
+
+
+def hmac_pads(secret: str) -> tuple[bytes, bytes]:
+    """Inner and outer HMAC-SHA256 key pads for ``secret``."""
+    key = secret.encode("utf-8")
+    if len(key) > HMAC_BLOCK_SIZE:
+        key = hashlib.sha256(key).digest()
+    key = key.ljust(HMAC_BLOCK_SIZE, b"\0")
+    return bytes(b ^ 0x36 for b in key), bytes(b ^ 0x5C for b in key)
+
 
 class GCSStorage:
     """Google Cloud Storage backend for arbejdstilsynet_inspections files."""
@@ -61,7 +82,12 @@ class SilverPipeline:
     """
 
     def __init__(
-        self, start_date=None, end_date=None, gcs_bucket=None, log_level="INFO"
+        self,
+        start_date=None,
+        end_date=None,
+        gcs_bucket=None,
+        log_level="INFO",
+        pii_secret=None,
     ):
         """Initialize the Silver Pipeline with paths, constants, and logging setup."""
         # Setup logging
@@ -75,6 +101,7 @@ class SilverPipeline:
         self.start_date = start_date
         self.end_date = end_date
         self.gcs_bucket = gcs_bucket
+        self.pii_secret = pii_secret or os.getenv(PII_SECRET_ENV)
 
         # Constants and paths
         self.now = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -103,8 +130,10 @@ class SilverPipeline:
         # DuckDB connection via Ibis
         self.con = None
         self.raw = None
-        self.df = None
         self.input_csv = None
+        # Approximate input rows from the bronze metadata, and the exact rows written
+        self.input_row_count = None
+        self.row_count = None
 
     def setup_output_directories(self):
         """Create output directories if they don't exist."""
@@ -160,11 +189,39 @@ class SilverPipeline:
             self.logger.error(f"Error connecting to DuckDB: {str(e)}")
             return False
 
+    def read_bronze_record_count(self):
+        """Record count of the input CSV from the bronze metadata.json, or None if not recorded.
+
+        The bronze layer counts lines rather than parsing the CSV, and records
+        0 when it could not read the file, so the count is approximate and
+        only a positive one is returned.
+        """
+        metadata_path = os.path.join(os.path.dirname(self.input_csv), "metadata.json")
+        try:
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return None
+        for entry in reversed(entries if isinstance(entries, list) else []):
+            if entry.get("data_filename") == os.path.basename(self.input_csv):
+                record_count = entry.get("record_count")
+                if isinstance(record_count, int) and record_count > 0:
+                    return record_count
+                return None
+        return None
+
     def load_data(self):
-        """Load CSV data using Ibis."""
+        """Load CSV data lazily using Ibis; nothing is read until the output is written."""
         try:
             self.raw = self.con.read_csv(self.input_csv)
-            self.logger.info(f"Loaded data with {len(self.raw.columns)} columns")
+            self.input_row_count = self.read_bronze_record_count()
+            self.row_count = None
+            rows = (
+                f"about {self.input_row_count} rows (bronze record count)"
+                if self.input_row_count is not None
+                else self.describe_row_count()
+            )
+            self.logger.info(f"Loaded data with {len(self.raw.columns)} columns and {rows}")
             return True
         except Exception as e:
             self.logger.error(f"Error loading data from CSV: {str(e)}")
@@ -205,15 +262,10 @@ class SilverPipeline:
     def deduplicate(self):
         """Remove duplicate rows."""
         try:
-            original_rows = self.raw.count().execute()
             self.raw = self.raw.distinct()
-            new_rows = self.raw.count().execute()
-
-            if original_rows > new_rows:
-                self.logger.info(f"Removed {original_rows - new_rows} duplicate rows")
-            else:
-                self.logger.info("No duplicate rows found")
-
+            # Removed duplicates are counted when the output is written
+            self.row_count = None
+            self.logger.info("Added deduplication to the query")
             return True
         except Exception as e:
             self.logger.error(f"Error removing duplicates: {str(e)}")
@@ -349,9 +401,8 @@ class SilverPipeline:
 
             # Apply the filter if we have any date constraints
             if filter_expr is not None:
-                original_count = self.raw.count().execute()
                 self.raw = self.raw.filter(filter_expr)
-                filtered_count = self.raw.count().execute()
+                self.row_count = None
 
                 # Log the date range used for filtering
                 date_range_msg = ""
@@ -363,9 +414,6 @@ class SilverPipeline:
                 self.logger.info(
                     f"Filtered data by date range: {date_range_msg.strip()}"
                 )
-                self.logger.info(
-                    f"Rows before filtering: {original_count}, rows after: {filtered_count}"
-                )
 
             return True
 
@@ -373,45 +421,107 @@ class SilverPipeline:
             self.logger.error(f"Error filtering by date: {str(e)}")
             return False
 
+    def register_pseudonym_macro(self):
+        """Create the ``pii_pseudonym`` macro, an HMAC-SHA256 keyed with the configured secret,
+        and the ``pii_pseudonymize`` macro applying it to each ``PII_PATTERN`` match of a value.
+
+        The key pads are bound as parameters into session variables, so the
+        key never appears in SQL text or query logs. Without a secret,
+        ``pii_pseudonymize`` raises an error, so a query that finds PII fails
+        instead of writing it in clear.
+        """
+        if not self.pii_secret:
+            self.con.raw_sql(
+                "CREATE OR REPLACE TEMP MACRO pii_pseudonymize(value) AS "
+                f"error('PII found but {PII_SECRET_ENV} is not set, cannot pseudonymize it')"
+            )
+            return
+        inner_pad, outer_pad = hmac_pads(self.pii_secret)
+        self.con.raw_sql("SET VARIABLE pii_inner_pad = ?", parameters=[inner_pad])
+        self.con.raw_sql("SET VARIABLE pii_outer_pad = ?", parameters=[outer_pad])
+        self.con.raw_sql(
+            "CREATE OR REPLACE TEMP MACRO pii_pseudonym(value) AS "
+            "sha256(getvariable('pii_outer_pad') || unhex(sha256(getvariable('pii_inner_pad') || encode(value))))"
+        )
+        # Splitting on the pattern leaves one more part than there are matches; the
+        # text between matches is kept and each match replaced by its pseudonym
+        self.con.raw_sql(
+            "CREATE OR REPLACE TEMP MACRO pii_pseudonymize_parts(parts, matches) AS "
+            "parts[1] || array_to_string(list_transform(matches, (m, i) -> pii_pseudonym(m) || parts[i + 1]), '')"
+        )
+        self.con.raw_sql(
+            "CREATE OR REPLACE TEMP MACRO pii_pseudonymize(value) AS pii_pseudonymize_parts("
+            f"regexp_split_to_array(value, '{PII_PATTERN}'), regexp_extract_all(value, '{PII_PATTERN}'))"
+        )
+
     def check_for_pii(self):
-        """Check for potential PII data (like CPR numbers) and replace if found."""
+        """Pseudonymize potential PII data (like CPR numbers) in every string column.
+
+        Each ``PII_PATTERN`` match is replaced by its HMAC-SHA256, keyed with
+        ``PII_HASH_SECRET``, so the same number gets the same pseudonym in
+        every run. The rest of the value, such as surrounding free text, is
+        kept. Detection and replacement are part of the composed expression,
+        so they run inside the single ``COPY`` of ``save_output``; that write
+        fails if PII is found and no secret is set.
+        """
         try:
-            # Execute Ibis expression to get a pandas DataFrame
-            self.df = self.raw.execute()
-
-            pii_found = False
-            for col in self.df.columns:
-                if self.df[col].dtype == object:  # Check string columns
-                    if self.df[col].astype(str).str.contains(r"\b\d{10}\b").any():
-                        self.logger.warning(
-                            f"⚠️ Potential PII detected in column: {col}"
-                        )
-                        pii_found = True
-                        # Replace with UUIDv4 if found
-                        self.df[col] = (
-                            self.df[col]
-                            .astype(str)
-                            .apply(
-                                lambda v: str(uuid.uuid4())
-                                if re.match(r"\b\d{10}\b", str(v))
-                                else v
-                            )
-                        )
-
-            if not pii_found:
-                self.logger.info("No potential PII detected")
+            string_columns = [
+                name for name, dtype in self.raw.schema().items() if dtype.is_string()
+            ]
+            if not string_columns:
+                self.logger.info("No string columns to check for PII")
+                return True
 
+            if not self.pii_secret:
+                self.logger.warning(
+                    f"{PII_SECRET_ENV} is not set, the output fails to write if PII is found"
+                )
+            self.register_pseudonym_macro()
+            self.raw = self.raw.mutate(
+                **{
+                    name: ibis.cases(
+                        (
+                            self.raw[name].re_search(PII_PATTERN),
+                            pii_pseudonymize(self.raw[name]),
+                        ),
+                        else_=self.raw[name],
+                    )
+                    for name in string_columns
+                }
+            )
+            self.logger.info(f"Pseudonymizing potential PII in {len(string_columns)} string columns")
             return True
         except Exception as e:
             self.logger.error(f"Error checking for PII: {str(e)}")
             return False
 
+    def describe_row_count(self):
+        if self.row_count is None:
+            return "row count known after write"
+        return f"{self.row_count} rows"
+
     def save_output(self):
-        """Save the transformed data to parquet."""
+        """Save the transformed data to parquet.
+
+        The composed Ibis expression is compiled to SQL and written by a
+        single DuckDB ``COPY``, whose result is the number of rows written.
+        """
         try:
             # Save to temp location first
             temp_output = os.path.join(self.temp_dir, "processed_data.parquet")
-            self.df.to_parquet(temp_output, index=False)
+            query = self.con.compile(self.raw)
+            target = temp_output.replace("'", "''")
+            self.row_count = self.con.raw_sql(
+                f"COPY ({query}) TO '{target}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+            ).fetchone()[0]
+            if self.input_row_count:
+                self.logger.info(
+                    f"Wrote {self.row_count} rows from about {self.input_row_count} bronze records; "
+                    f"roughly {self.input_row_count - self.row_count} removed by deduplication "
+                    "and date filtering"
+                )
+            else:
+                self.logger.info(f"Wrote {self.row_count} rows")
 
             # Move to final location
             os.makedirs(os.path.dirname(self.output_parquet), exist_ok=True)
@@ -485,6 +595,10 @@ class SilverPipeline:
                 if not step():
                     self.logger.error(f"Pipeline failed at step: {step_name}")
                     return False
+                if self.raw is not None:
+                    self.logger.info(
+                        f"Finished step: {step_name} ({self.describe_row_count()})"
+                    )
 
             self.logger.info("Silver pipeline completed successfully")
             return True
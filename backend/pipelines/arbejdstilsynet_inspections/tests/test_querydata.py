@@ -0,0 +1,171 @@
+"""
+Tests for the headless Power BI querydata extraction.
+
+Recorded querydata requests and responses are decoded directly, and the
+replay is run against a local stub server that serves the recorded pages.
+"""
+
+import asyncio
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from playwright.async_api import async_playwright
+
+from bronze.querydata import (
+    CapturedQuery,
+    FilterColumn,
+    build_query,
+    decode_rows,
+    find_filter_column,
+    filters_on_value,
+    find_table_query,
+    replay_filter,
+    rows_to_arrow,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "querydata"
+URL = "https://wabi-north-europe-api.analysis.windows.net/public/reports/querydata?synchronous=true"
+COLUMN = FilterColumn(entity="Tilsyn", property="Branche")
+
+
+def read_fixture(name: str) -> Dict[str, Any]:
+    """Return a recorded querydata request or response."""
+    return json.loads((FIXTURES / f"{name}.json").read_text(encoding="utf-8"))
+
+
+@pytest.fixture
+def table_query() -> CapturedQuery:
+    """Return the captured request of the inspections table."""
+    return CapturedQuery(url=URL, headers={}, body=read_fixture("table_query"))
+
+
+@pytest.fixture
+def captured(table_query: CapturedQuery) -> List[CapturedQuery]:
+    """Return the requests captured while loading the report."""
+    slicer = CapturedQuery(
+        url=URL, headers={}, body=read_fixture("slicer_query"), response=read_fixture("slicer_response")
+    )
+    return [slicer, table_query]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the recorded table pages, the second one when the request carries restart tokens."""
+
+    requests: List[Dict[str, Any]] = []
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(body)
+        window = body["queries"][0]["Query"]["Commands"][0]["SemanticQueryDataShapeCommand"]["Binding"][
+            "DataReduction"
+        ]["Primary"]["Window"]
+        page = "table_page_2" if "RestartTokens" in window else "table_page_1"
+        payload = (FIXTURES / f"{page}.json").read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_url() -> Iterator[str]:
+    """Run the stub server and return its querydata URL."""
+    StubHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/public/reports/querydata?synchronous=true"
+    finally:
+        server.shutdown()
+
+
+def test_decode_rows(table_query: CapturedQuery) -> None:
+    """Test that repeated, null, dictionary and date values are decoded."""
+    columns, rows, restart_tokens = decode_rows(table_query, read_fixture("table_page_1"))
+
+    assert columns == ["Dato", "Branche", "Produktionsenhed", "Antal"]
+    assert rows == [
+        [datetime.datetime(2025, 5, 2, tzinfo=datetime.timezone.utc), "Anlægsarbejde", "Firma A", 1],
+        [datetime.datetime(2025, 5, 2, tzinfo=datetime.timezone.utc), "Anlægsarbejde", "Firma B", 2],
+        [datetime.datetime(2025, 4, 11, tzinfo=datetime.timezone.utc), "Anlægsarbejde", "Firma B", None],
+    ]
+    assert restart_tokens == [["1744329600000L", "'Firma B'"]]
+
+    _, _, restart_tokens = decode_rows(table_query, read_fixture("table_page_2"))
+    assert restart_tokens is None
+
+
+def test_rows_to_arrow_types_whole_columns() -> None:
+    """Test that a column is only typed as dates when every value is midnight, in any order."""
+    midnight = datetime.datetime(2025, 5, 2, tzinfo=datetime.timezone.utc)
+    afternoon = datetime.datetime(2025, 5, 2, 14, 30, tzinfo=datetime.timezone.utc)
+
+    table = rows_to_arrow(
+        ["Dato", "Tidspunkt", "Omvendt"],
+        [[midnight, midnight, afternoon], [None, afternoon, midnight]],
+    )
+
+    assert table.column("Dato").to_pylist() == [datetime.date(2025, 5, 2), None]
+    assert table.column("Tidspunkt").to_pylist() == [midnight, afternoon]
+    assert table.column("Omvendt").to_pylist() == [afternoon, midnight]
+
+
+def test_find_queries(captured: List[CapturedQuery], table_query: CapturedQuery) -> None:
+    """Test that the table query and the slicer column are found among the captured requests."""
+    assert find_table_query(captured) is table_query
+
+    column = find_filter_column(captured, ["Slagterier"])
+    assert (column.entity, column.property) == ("Tilsyn", "Branche")
+
+    with pytest.raises(ValueError):
+        find_filter_column(captured, ["Fiskeri"])
+
+
+def test_build_query(table_query: CapturedQuery) -> None:
+    """Test that the filter replaces the captured one and the query is windowed from the restart tokens."""
+    body = build_query(table_query, COLUMN, "Landbrug, skovbrug og fiskeri", [["token"]], page_size=100)
+    command = body["queries"][0]["Query"]["Commands"][0]["SemanticQueryDataShapeCommand"]
+
+    (condition,) = command["Query"]["Where"]
+    assert condition["Condition"]["In"]["Values"] == [[{"Literal": {"Value": "'Landbrug, skovbrug og fiskeri'"}}]]
+    assert command["Binding"]["DataReduction"]["Primary"] == {"Window": {"Count": 100, "RestartTokens": [["token"]]}}
+    assert table_query.body == read_fixture("table_query")
+
+
+def test_filters_on_value(table_query: CapturedQuery) -> None:
+    """Test that only requests selecting the filter value match, not the slicer's search."""
+    body = build_query(table_query, COLUMN, "Landbrug, skovbrug og fiskeri")
+
+    assert filters_on_value(body, "Landbrug, skovbrug og fiskeri")
+    assert not filters_on_value(body, "Landbrug")
+    assert not filters_on_value(read_fixture("slicer_query"), "Slagterier")
+
+
+def test_replay_follows_pages(table_query: CapturedQuery, stub_url: str) -> None:
+    """Test that the replay pages through the stub and returns all rows as one Arrow table."""
+    template = CapturedQuery(url=stub_url, headers={"Content-Type": "application/json"}, body=table_query.body)
+
+    async def replay():
+        async with async_playwright() as playwright:
+            request_context = await playwright.request.new_context()
+            try:
+                return await replay_filter(request_context, template, COLUMN, "Anlægsarbejde")
+            finally:
+                await request_context.dispose()
+
+    table = asyncio.run(replay())
+
+    assert table.column_names == ["Dato", "Branche", "Produktionsenhed", "Antal"]
+    assert table.num_rows == 4
+    assert table.column("Produktionsenhed").to_pylist() == ["Firma A", "Firma B", "Firma B", "Firma C"]
+    assert len(StubHandler.requests) == 2
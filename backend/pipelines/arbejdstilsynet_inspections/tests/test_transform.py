@@ -0,0 +1,104 @@
+"""
+Tests for PII pseudonymization and output writing in the silver layer.
+"""
+
+import hashlib
+import hmac
+import json
+from pathlib import Path
+
+import ibis
+import pytest
+
+from silver.transform import SilverPipeline
+
+SECRET = "test-secret"
+
+
+def pseudonym(value: str) -> str:
+    """Return the expected HMAC-SHA256 pseudonym of a value."""
+    return hmac.new(SECRET.encode(), value.encode(), hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def pipeline(tmp_path: Path) -> SilverPipeline:
+    """Return a pipeline with a small table loaded."""
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text(
+        "company_name,work_env_issue,case_count\n"
+        "Firma A,0101011234,1\n"
+        "Firma B,asbest,2\n"
+        "0101011234,stoej,3\n"
+        "Firma C,\"Vej 1, 0101011234 og 1111111111\",4\n",
+        encoding="utf-8",
+    )
+    pipeline = SilverPipeline(pii_secret=SECRET)
+    pipeline.con = ibis.duckdb.connect()
+    pipeline.raw = pipeline.con.read_csv(str(csv_path))
+    return pipeline
+
+
+def test_pii_is_replaced_by_keyed_hash(pipeline: SilverPipeline) -> None:
+    """Test that matching numbers get the HMAC pseudonym and other text is untouched."""
+    assert pipeline.check_for_pii()
+    rows = pipeline.raw.order_by("case_count").to_pyarrow().to_pylist()
+
+    assert [row["work_env_issue"] for row in rows] == [
+        pseudonym("0101011234"),
+        "asbest",
+        "stoej",
+        f"Vej 1, {pseudonym('0101011234')} og {pseudonym('1111111111')}",
+    ]
+    assert [row["company_name"] for row in rows] == ["Firma A", "Firma B", pseudonym("0101011234"), "Firma C"]
+    assert [row["case_count"] for row in rows] == [1, 2, 3, 4]
+
+
+def test_pii_without_secret_fails(pipeline: SilverPipeline, tmp_path: Path) -> None:
+    """Test that PII is not written in clear when no secret is configured."""
+    pipeline.temp_dir = str(tmp_path)
+    pipeline.output_parquet = str(tmp_path / "silver" / "processed_data.parquet")
+    pipeline.pii_secret = None
+
+    assert pipeline.check_for_pii()
+    assert not pipeline.save_output()
+    assert not Path(pipeline.output_parquet).exists()
+
+
+def test_no_pii_without_secret_is_written(pipeline: SilverPipeline, tmp_path: Path) -> None:
+    """Test that data without PII is written unchanged when no secret is configured."""
+    pipeline.temp_dir = str(tmp_path)
+    pipeline.output_parquet = str(tmp_path / "silver" / "processed_data.parquet")
+    pipeline.pii_secret = None
+    pipeline.raw = pipeline.raw.filter(pipeline.raw.case_count == 2)
+
+    assert pipeline.check_for_pii()
+    assert pipeline.save_output()
+
+    written = pipeline.con.read_parquet(pipeline.output_parquet).to_pyarrow()
+    assert written.column("work_env_issue").to_pylist() == ["asbest"]
+
+
+def test_save_output_writes_expression(pipeline: SilverPipeline, tmp_path: Path) -> None:
+    """Test that the composed expression is written with COPY and its row count recorded."""
+    pipeline.temp_dir = str(tmp_path)
+    pipeline.output_parquet = str(tmp_path / "silver" / "processed_data.parquet")
+    pipeline.input_row_count = 3
+    pipeline.raw = pipeline.raw.filter(pipeline.raw.case_count > 1)
+
+    assert pipeline.check_for_pii()
+    assert pipeline.save_output()
+
+    assert pipeline.row_count == 3
+    written = pipeline.con.read_parquet(pipeline.output_parquet).order_by("case_count").to_pyarrow()
+    assert written.column("company_name").to_pylist() == ["Firma B", pseudonym("0101011234"), "Firma C"]
+
+
+@pytest.mark.parametrize("record_count, expected", [(20, 20), (0, None)])
+def test_bronze_record_count(pipeline: SilverPipeline, tmp_path: Path, record_count: int, expected) -> None:
+    """Test that only a positive bronze record count is used as the input row count."""
+    pipeline.input_csv = str(tmp_path / "data_merged.csv")
+    (tmp_path / "metadata.json").write_text(
+        json.dumps([{"data_filename": "data_merged.csv", "record_count": record_count}]), encoding="utf-8"
+    )
+
+    assert pipeline.read_bronze_record_count() == expected
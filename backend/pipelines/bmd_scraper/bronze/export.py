@@ -9,6 +9,8 @@ import logging
 from pathlib import Path
 import urllib.parse
 
+import duckdb
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class BMDScraper:
@@ -231,6 +233,28 @@ class GCSStorage:
             logging.error(f"Failed to upload to GCS: {e}")
             return False
 
+def fingerprint_excel(file_path):
+    """
+    Fingerprint the data rows of a downloaded BMD Excel file.
+    
+    The generated workbook embeds its creation time, so hashing the file bytes
+    would change on every download. Instead every row of the data range is
+    hashed, and the row hashes are combined in sorted order so the fingerprint
+    only changes when the register content does.
+    """
+    conn = duckdb.connect(database=':memory:')
+    try:
+        digest = conn.execute(f"""
+            SELECT md5(coalesce(string_agg(row_hash, '' ORDER BY row_hash), ''))
+            FROM (
+                SELECT md5(CAST(t AS VARCHAR)) AS row_hash
+                FROM read_xlsx('{file_path}', range = 'A4:AR', stop_at_empty = true, header=true) AS t
+            )
+        """).fetchone()[0]
+    finally:
+        conn.close()
+    return f"md5:{digest}"
+
 def main():
     # Example usage for local development
     scraper = BMDScraper(output_dir="bronze/bmd")
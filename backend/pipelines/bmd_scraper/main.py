@@ -7,16 +7,22 @@ This script orchestrates the Bronze and Silver stage processing for BMD data.
 import argparse
 import logging
 import os
+import shutil
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import NamedTuple, Optional, Tuple
 
 import dotenv
 from bronze import BMDScraper
-from bronze.export import GCSStorage
+from bronze.export import GCSStorage, fingerprint_excel
 from silver import BMDTransformer, upload_to_gcs
 
+ROOT = os.path.abspath(os.path.join(__file__, "..", "..", ".."))
+sys.path.insert(0, ROOT)
+
+from common.fingerprint import RunManifest
+
 # Load environment variables
 dotenv.load_dotenv()
 
@@ -31,6 +37,14 @@ logging.basicConfig(
 logger = logging.getLogger("bmd_pipeline")
 
 
+class BronzeResult(NamedTuple):
+    """Outcome of a Bronze stage run."""
+
+    excel_file: Path
+    fingerprint: str
+    changed: bool
+
+
 def setup_directories() -> Tuple[Path, Path]:
     """Set up output directories and return their paths."""
     bronze_dir = Path(os.getenv("BRONZE_OUTPUT_DIR", "bronze/bmd/data"))
@@ -45,18 +59,30 @@ def setup_directories() -> Tuple[Path, Path]:
     return bronze_dir, silver_dir
 
 
-def run_bronze_stage(bronze_dir: Path) -> Optional[Path]:
+def get_run_manifest(bronze_dir: Path) -> RunManifest:
+    """Get the run manifest, in GCS for production runs and next to the bronze data otherwise."""
+    bucket_name = os.getenv("GCS_BUCKET") if os.getenv("ENVIRONMENT") == "production" else None
+    return RunManifest("bmd", bucket_name=bucket_name, local_dir=str(bronze_dir.parent))
+
+
+def run_bronze_stage(
+    bronze_dir: Path, manifest: RunManifest, force: bool = False
+) -> Optional[BronzeResult]:
     """
     Run the Bronze stage of the BMD pipeline.
 
     This stage extracts raw data from the BMD portal and saves it to the bronze directory
-    with proper timestamp subdirectory and metadata.
+    with proper timestamp subdirectory and metadata. If the register content matches the
+    last successful run, the download is discarded, nothing is uploaded and a no-op run
+    is recorded in the manifest.
 
     Args:
         bronze_dir: Directory to store bronze stage output
+        manifest: Run manifest holding the last successful fingerprint
+        force: Process the download even if it is unchanged
 
     Returns:
-        Path to the downloaded Excel file if successful, None otherwise
+        BronzeResult if successful, None otherwise
     """
     logger.info("Starting Bronze stage processing")
 
@@ -76,6 +102,13 @@ def run_bronze_stage(bronze_dir: Path) -> Optional[Path]:
 
         logger.info(f"Bronze stage: Raw data downloaded to {excel_file_path}")
 
+        fingerprint = fingerprint_excel(excel_file_path)
+        if not force and manifest.is_unchanged(fingerprint):
+            logger.info("BMD register unchanged since last successful run, skipping")
+            shutil.rmtree(os.path.dirname(excel_file_path), ignore_errors=True)
+            manifest.record_noop(fingerprint)
+            return BronzeResult(Path(excel_file_path), fingerprint, changed=False)
+
         # If in production environment, upload to GCS
         if os.getenv("ENVIRONMENT") == "production":
             bucket_name = os.getenv("GCS_BUCKET")
@@ -103,7 +136,7 @@ def run_bronze_stage(bronze_dir: Path) -> Optional[Path]:
         logger.info(
             f"Bronze stage completed successfully. File saved to {excel_file_path}"
         )
-        return Path(excel_file_path)
+        return BronzeResult(Path(excel_file_path), fingerprint, changed=True)
 
     except Exception as e:
         logger.exception(f"Error in Bronze stage: {e}")
@@ -142,7 +175,7 @@ def find_latest_bronze_file(bronze_dir: Path) -> Optional[Tuple[Path, Path]]:
         return None
 
 
-def run_silver_stage(bronze_file: Path, silver_dir: Path) -> Optional[Path]:
+def run_silver_stage(bronze_file: Path, silver_dir: Path, export_xlsx: bool = False) -> Optional[Path]:
     """
     Run the Silver stage of the BMD pipeline.
 
@@ -151,6 +184,7 @@ def run_silver_stage(bronze_file: Path, silver_dir: Path) -> Optional[Path]:
     Args:
         bronze_file: Path to the input file from bronze stage
         silver_dir: Directory to store silver stage output
+        export_xlsx: Also write an Excel copy of the processed data
 
     Returns:
         Path to the processed file if successful, None otherwise
@@ -171,7 +205,9 @@ def run_silver_stage(bronze_file: Path, silver_dir: Path) -> Optional[Path]:
 
         # Initialize and run the transformer
         transformer = BMDTransformer(
-            input_file=bronze_file, output_dir=silver_timestamp_dir
+            input_file=bronze_file,
+            output_dir=silver_timestamp_dir,
+            export_xlsx=export_xlsx,
         )
         parquet_file = transformer.transform()
 
@@ -211,6 +247,16 @@ def parse_args():
         default="all",
         help="Pipeline stage to run (default: all)",
     )
+    parser.add_argument(
+        "--export-xlsx",
+        action="store_true",
+        help="Also write the silver data as an Excel file (slow, off by default)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run the silver stage even if the source is unchanged since the last run",
+    )
     return parser.parse_args()
 
 
@@ -225,15 +271,24 @@ def main():
     # Track pipeline start time
     start_time = datetime.now()
 
+    manifest = get_run_manifest(bronze_dir)
+
     # Run selected stages
     bronze_file = None
     silver_file = None
+    fingerprint = None
 
     if args.stage in ["bronze", "all"]:
-        bronze_file = run_bronze_stage(bronze_dir)
-        if not bronze_file and args.stage == "all":
+        bronze_result = run_bronze_stage(bronze_dir, manifest, force=args.force)
+        if not bronze_result and args.stage == "all":
             logger.error("Bronze stage failed, cannot proceed to Silver stage")
             sys.exit(1)
+        if bronze_result and not bronze_result.changed:
+            logger.info("Source unchanged, nothing to do")
+            sys.exit(0)
+        if bronze_result:
+            bronze_file = bronze_result.excel_file
+            fingerprint = bronze_result.fingerprint
 
     if args.stage in ["silver", "all"] and (bronze_file or args.stage == "silver"):
         # If we're only running silver stage, we need to find the latest bronze file
@@ -246,7 +301,11 @@ def main():
                 logger.error("No bronze files found to process in silver stage")
                 sys.exit(1)
 
-        silver_file = run_silver_stage(bronze_file, silver_dir)
+        silver_file = run_silver_stage(bronze_file, silver_dir, args.export_xlsx)
+
+    # Record the fingerprint once the download has made it through the silver stage
+    if fingerprint and silver_file:
+        manifest.record_success(fingerprint, bronze_timestamp=bronze_file.parent.name)
 
     # Calculate and log execution time
     execution_time = datetime.now() - start_time
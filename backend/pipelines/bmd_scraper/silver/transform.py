@@ -29,18 +29,24 @@ class BMDTransformer:
     - Type casting with SQL
     - Data validation
     - Saving to Parquet format
+    
+    Only the raw sheet is materialized. Every later step is a SQL view on the
+    previous one, so DuckDB optimizes the whole chain and runs it once when
+    the output is written.
     """
     
-    def __init__(self, input_file: Path, output_dir: Path):
+    def __init__(self, input_file: Path, output_dir: Path, export_xlsx: bool = False):
         """
         Initialize the transformer.
         
         Args:
             input_file: Path to raw Excel file from Bronze stage
             output_dir: Directory to save processed Parquet file
+            export_xlsx: Also write the processed data as an Excel file (slow)
         """
         self.input_file = input_file
         self.output_dir = output_dir
+        self.export_xlsx = export_xlsx
         self.timestamp = input_file.parent.name
         self.metadata = {}
         self.conn = None
@@ -73,6 +79,19 @@ class BMDTransformer:
             except:
                 pass
     
+    def describe_table(self, table_name: str) -> List[Tuple[str, str]]:
+        """
+        Get column names and types with a single DESCRIBE query.
+        
+        Args:
+            table_name: Name of the DuckDB table
+            
+        Returns:
+            List of (column_name, column_type) tuples in table order
+        """
+        result = self.conn.execute(f"DESCRIBE {table_name}").fetchall()
+        return [(row[0], row[1]) for row in result]
+    
     def read_excel(self) -> str:
         """
         Read the raw Excel file into a DuckDB table.
@@ -82,7 +101,8 @@ class BMDTransformer:
         """
         logger.info(f"Reading Excel file from {self.input_file}")
         try:
-            # Read Excel file directly into DuckDB table
+            # Read Excel file directly into DuckDB table; this is the only
+            # materialized copy, all later steps are views on it
             self.conn.execute(f"""
                 CREATE OR REPLACE TABLE raw_data AS
                 SELECT * FROM read_xlsx('{self.input_file}', range = 'A4:AR', stop_at_empty = true, header=true);
@@ -92,8 +112,7 @@ class BMDTransformer:
             result = self.conn.execute("SELECT COUNT(*) as row_count FROM raw_data").fetchone()
             row_count = result[0]
             
-            result = self.conn.execute("SELECT * FROM raw_data LIMIT 1").description
-            columns = [desc[0] for desc in result]
+            columns = [col for col, _ in self.describe_table("raw_data")]
             
             logger.info(f"Read {row_count} rows and {len(columns)} columns")
             
@@ -150,9 +169,9 @@ class BMDTransformer:
             for original, clean in column_mapping.items():
                 column_selects.append(f'"{original}" AS {clean}')
             
-            # Create a new table with cleaned column names
+            # Create a view with cleaned column names
             self.conn.execute(f"""
-                CREATE OR REPLACE TABLE cleaned_columns AS
+                CREATE OR REPLACE VIEW cleaned_columns AS
                 SELECT {', '.join(column_selects)}
                 FROM {table_name};
             """)
@@ -180,12 +199,12 @@ class BMDTransformer:
         logger.info("Converting semicolon-separated lists to arrays")
         
         try:
-            # Get column names
-            result = self.conn.execute(f"SELECT * FROM {table_name} LIMIT 1").description
-            columns = [desc[0] for desc in result]
+            # Get column names and the first row in one query
+            cursor = self.conn.execute(f"SELECT * FROM {table_name} LIMIT 1")
+            columns = [desc[0] for desc in cursor.description]
+            first_row = cursor.fetchone() or [None] * len(columns)
             
             # Identify potential list columns
-            list_columns = []
             potential_list_columns = [
                 'bruger_pesticid', 
                 'bruger_biocid', 
@@ -194,18 +213,21 @@ class BMDTransformer:
             ]
             
             # Check if cleaned column names match any potential list columns
-            for col in columns:
+            candidates = []
+            for col, first_value in zip(columns, first_row):
                 clean_col = col.lower().replace(' ', '_').replace('-', '_')
-                if clean_col in potential_list_columns or ';' in str(self.conn.execute(f"SELECT {col} FROM {table_name} LIMIT 1").fetchone()[0]):
-                    # Sample a few rows to confirm semicolon presence
-                    sample = self.conn.execute(f"""
-                        SELECT COUNT(*) 
-                        FROM {table_name} 
-                        WHERE {col} LIKE '%;%' 
-                        LIMIT 10
-                    """).fetchone()[0]
-                    
-                    if sample > 0:
+                if clean_col in potential_list_columns or ';' in str(first_value):
+                    candidates.append(col)
+            
+            # Confirm semicolon presence for all candidates in a single scan
+            list_columns = []
+            if candidates:
+                counts = self.conn.execute(f"""
+                    SELECT {', '.join(f"count(*) FILTER (WHERE {col} LIKE '%;%')" for col in candidates)}
+                    FROM {table_name}
+                """).fetchone()
+                for col, count in zip(candidates, counts):
+                    if count > 0:
                         list_columns.append(col)
                         logger.info(f"Detected semicolon-separated list in column: {col}")
             
@@ -228,9 +250,9 @@ class BMDTransformer:
                 else:
                     array_conversions.append(col)
             
-            # Create a table with array conversions
+            # Create a view with array conversions
             self.conn.execute(f"""
-                CREATE OR REPLACE TABLE array_converted AS
+                CREATE OR REPLACE VIEW array_converted AS
                 SELECT {', '.join(array_conversions)}
                 FROM {table_name};
             """)
@@ -260,16 +282,12 @@ class BMDTransformer:
         logger.info("Cleaning and normalizing data")
         
         try:
-            # Get column names
-            result = self.conn.execute(f"SELECT * FROM {table_name} LIMIT 1").description
-            columns = [desc[0] for desc in result]
+            # Get column names and types in one query
+            schema = self.describe_table(table_name)
+            columns = [col for col, _ in schema]
             
             # Identify text columns for trimming
-            text_columns = []
-            for col in columns:
-                col_type = self.conn.execute(f"SELECT typeof({col}) FROM {table_name} LIMIT 1").fetchone()[0]
-                if col_type.lower() in ['varchar', 'string', 'text']:
-                    text_columns.append(col)
+            text_columns = [col for col, col_type in schema if col_type.upper() == 'VARCHAR']
             
             # Create SQL for trimming text columns
             trims = []
@@ -279,9 +297,9 @@ class BMDTransformer:
                 else:
                     trims.append(col)
             logger.info(f"Trims {len(trims)}")
-            # Create a table with trimmed text
+            # Create a view with trimmed text
             self.conn.execute(f"""
-                CREATE OR REPLACE TABLE trimmed_data AS
+                CREATE OR REPLACE VIEW trimmed_data AS
                 SELECT {', '.join(trims)}
                 FROM {table_name};
             """)
@@ -291,19 +309,13 @@ class BMDTransformer:
             # Handle semicolon-separated lists in a separate function
             list_processed_table = self.handle_semicolon_lists(normalized_table)
             
-            # Drop duplicates
+            # Drop duplicates; the number removed is logged once the output is written
             self.conn.execute(f"""
-                CREATE OR REPLACE TABLE cleaned_data AS
+                CREATE OR REPLACE VIEW cleaned_data AS
                 SELECT DISTINCT *
                 FROM {list_processed_table};
             """)
             
-            # Check for dropped duplicates
-            orig_count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
-            new_count = self.conn.execute("SELECT COUNT(*) FROM cleaned_data").fetchone()[0]
-            if orig_count > new_count:
-                logger.warning(f"Removed {orig_count - new_count} duplicate rows")
-            
             return "cleaned_data"
         
         except Exception as e:
@@ -345,9 +357,9 @@ class BMDTransformer:
                     else:
                         date_casts.append(col)
                 
-                # Create a table with parsed dates
+                # Create a view with parsed dates
                 self.conn.execute(f"""
-                    CREATE OR REPLACE TABLE date_parsed AS
+                    CREATE OR REPLACE VIEW date_parsed AS
                     SELECT {', '.join(date_casts)}
                     FROM {table_name};
                 """)
@@ -379,21 +391,28 @@ class BMDTransformer:
         validation_issues = {}
         
         try:
-            # Get column names
-            result = self.conn.execute(f"SELECT * FROM {table_name} LIMIT 1").description
-            columns = [desc[0] for desc in result]
-            
-            # Get row count
-            row_count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+            schema = self.describe_table(table_name)
+            
+            # Row count, null counts and distinct estimates for every column in a single scan
+            aggregates = ["count(*)"]
+            for col, _ in schema:
+                aggregates.append(f'count(*) - count("{col}")')
+                aggregates.append(f'approx_count_distinct("{col}")')
+            result = self.conn.execute(f"""
+                SELECT {', '.join(aggregates)}
+                FROM {table_name}
+            """).fetchone()
+            row_count = result[0]
             
-            # Check for missing values
+            column_profile = {}
             missing_values = []
-            for col in columns:
-                null_count = self.conn.execute(f"""
-                    SELECT COUNT(*) 
-                    FROM {table_name} 
-                    WHERE {col} IS NULL
-                """).fetchone()[0]
+            for i, (col, col_type) in enumerate(schema):
+                null_count = result[1 + 2 * i]
+                column_profile[col] = {
+                    "type": col_type,
+                    "null_count": null_count,
+                    "approx_distinct": result[2 + 2 * i],
+                }
                 
                 if null_count > 0:
                     missing_values.append(f"{col}: {null_count} missing values ({null_count/row_count:.1%})")
@@ -408,7 +427,9 @@ class BMDTransformer:
             # Store validation results in metadata
             self.silver_metadata["validation"] = {
                 "has_issues": bool(validation_issues),
-                "issues": validation_issues
+                "issues": validation_issues,
+                "row_count": row_count,
+                "columns": column_profile
             }
             
             return table_name, validation_issues
@@ -421,8 +442,10 @@ class BMDTransformer:
         """
         Save the processed data as a Parquet file.
         
+        This is where the view chain is executed, in a single pass.
+        
         Args:
-            table_name: Name of the DuckDB table
+            table_name: Name of the DuckDB table or view
             
         Returns:
             Path to the saved Parquet file
@@ -434,25 +457,25 @@ class BMDTransformer:
         logger.info(f"Saving Parquet file to {output_path}")
         
         try:
-            # Export directly from DuckDB to Parquet
-            self.conn.execute(f"""
+            # Export directly from DuckDB to Parquet; COPY returns the rows written
+            new_count = self.conn.execute(f"""
                 COPY (SELECT * FROM {table_name}) 
                 TO '{output_path}' (FORMAT 'parquet')
-            """)
+            """).fetchone()[0]
             
-            self.conn.execute(f"""
-                COPY (SELECT * FROM {table_name}) 
-                TO '{self.output_dir/f"bmd_data_{self.timestamp}.xlsx"}' (FORMAT 'xlsx')
-            """)            
-            # Save metadata file
-            metadata_path = self.output_dir / "metadata.json"
-            self.silver_metadata["output_file"] = str(output_path)
-            self.silver_metadata["output_size_bytes"] = os.path.getsize(output_path)
-            
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(self.silver_metadata, f, indent=2, ensure_ascii=False)
+            # Check for dropped duplicates
+            orig_count = self.silver_metadata["row_count"]
+            if orig_count > new_count:
+                logger.warning(f"Removed {orig_count - new_count} duplicate rows")
             
-            logger.info(f"Saved metadata to {metadata_path}")
+            if self.export_xlsx:
+                # Read back the Parquet file rather than re-running the transform
+                xlsx_path = self.output_dir / f"bmd_data_{self.timestamp}.xlsx"
+                self.conn.execute(f"""
+                    COPY (SELECT * FROM read_parquet('{output_path}')) 
+                    TO '{xlsx_path}' (FORMAT 'xlsx')
+                """)
+                logger.info(f"Saved Excel copy to {xlsx_path}")
             
             return output_path
         
@@ -460,6 +483,26 @@ class BMDTransformer:
             logger.exception(f"Error saving parquet: {e}")
             raise
     
+    def save_metadata(self, output_path: Path) -> Path:
+        """
+        Save the silver metadata next to the Parquet file.
+        
+        Args:
+            output_path: Path to the saved Parquet file
+            
+        Returns:
+            Path to the metadata file
+        """
+        metadata_path = self.output_dir / "metadata.json"
+        self.silver_metadata["output_file"] = str(output_path)
+        self.silver_metadata["output_size_bytes"] = os.path.getsize(output_path)
+        
+        with open(metadata_path, 'w', encoding='utf-8') as f:
+            json.dump(self.silver_metadata, f, indent=2, ensure_ascii=False)
+        
+        logger.info(f"Saved metadata to {metadata_path}")
+        return metadata_path
+    
     def transform(self) -> Path:
         """
         Execute the full transformation process.
@@ -482,12 +525,19 @@ class BMDTransformer:
             # 4. Parse dates
             table_name = self.parse_dates(table_name)
             
-            # 5. Validate data
-            table_name, validation_issues = self.validate_data(table_name)
-            
-            # 6. Save to Parquet
+            # 5. Save to Parquet, running the view chain once
             output_path = self.save_parquet(table_name)
             
+            # 6. Validate the written data, a cheap columnar scan
+            self.conn.execute(f"""
+                CREATE OR REPLACE VIEW output_data AS
+                SELECT * FROM read_parquet('{output_path}');
+            """)
+            _, validation_issues = self.validate_data("output_data")
+            
+            # 7. Save metadata
+            self.save_metadata(output_path)
+            
             logger.info(f"Transformation completed successfully: {output_path}")
             return output_path
             
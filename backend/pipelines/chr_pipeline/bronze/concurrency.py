@@ -0,0 +1,265 @@
+"""Adaptive concurrency control for the FVST SOAP endpoints - Bronze Layer."""
+
+import logging
+import threading
+import time
+import concurrent.futures
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from zeep.exceptions import Fault, TransportError
+from tqdm.contrib.logging import logging_redirect_tqdm
+from tqdm.auto import tqdm
+
+# Set up logging
+logger = logging.getLogger('backend.pipelines.chr_pipeline.bronze.concurrency')
+
+# --- Constants ---
+
+# HTTP status codes that indicate an overloaded or unavailable service
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Default controller settings
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 32
+DEFAULT_LATENCY_TARGET = 10.0  # seconds per request considered healthy
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_FAILURE_THRESHOLD = 5  # consecutive failures that open the circuit
+DEFAULT_COOLDOWN = 30.0  # seconds the circuit stays open
+MAX_COOLDOWN = 300.0
+DEFAULT_RETRY_ROUNDS = 3
+
+# --- Error Classification ---
+
+class TransientFetchError(Exception):
+    """Raised by loaders when a request failed in a way that is worth retrying."""
+
+def is_transient_error(error: BaseException) -> bool:
+    """Return True for timeouts, connection errors, 5xx/429 responses and SOAP server faults."""
+    if isinstance(error, TransientFetchError):
+        return True
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    if isinstance(error, TransportError):
+        return error.status_code in TRANSIENT_STATUS_CODES or (error.status_code or 0) >= 500
+    if isinstance(error, Fault):
+        # SOAP 1.1 distinguishes client faults (bad request, unknown herd) from server faults
+        return 'server' in str(error.code or '').lower()
+    return False
+
+# --- Controller ---
+
+class AdaptiveConcurrencyController:
+    """AIMD concurrency limiter with a circuit breaker for a single endpoint.
+
+    The limit grows by roughly one slot per window of healthy responses and is
+    multiplied by ``backoff_factor`` on faults, timeouts, 5xx or slow responses.
+    After ``failure_threshold`` consecutive failures the circuit opens and no new
+    requests are admitted until ``cooldown`` has passed; a single probe request is
+    then let through to decide whether to close the circuit again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = DEFAULT_MIN_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        latency_target: float = DEFAULT_LATENCY_TARGET,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_target = latency_target
+        self.backoff_factor = backoff_factor
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._consecutive_failures = 0
+        self._last_backoff = 0.0
+        self._latency_ewma = 0.0
+        self._circuit_open_until = 0.0
+        self._cooldown = cooldown
+        self._probe_in_flight = False
+        self._condition = threading.Condition()
+
+        self.stats = {'success': 0, 'failure': 0, 'slow': 0, 'backoffs': 0, 'circuit_opens': 0}
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    def _circuit_state(self, now: float) -> str:
+        if self._circuit_open_until == 0.0:
+            return 'closed'
+        return 'open' if now < self._circuit_open_until else 'half_open'
+
+    def acquire(self) -> None:
+        """Block until a request slot is available and the circuit admits traffic."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                state = self._circuit_state(now)
+                if state == 'open':
+                    self._condition.wait(timeout=self._circuit_open_until - now)
+                    continue
+                if state == 'half_open':
+                    if not self._probe_in_flight and self._in_flight == 0:
+                        self._probe_in_flight = True
+                        self._in_flight += 1
+                        logger.info(f"[{self.name}] Circuit half-open, sending probe request")
+                        return
+                elif self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return
+                self._condition.wait(timeout=1.0)
+
+    def release(self, latency: float, success: bool) -> None:
+        """Record the outcome of a request and adjust the limit accordingly."""
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            probe = self._probe_in_flight
+            self._probe_in_flight = False
+            slow = success and latency > self.latency_target
+            self._latency_ewma = latency if self._latency_ewma == 0.0 else 0.8 * self._latency_ewma + 0.2 * latency
+
+            if success:
+                self.stats['success'] += 1
+                self._consecutive_failures = 0
+                if probe:
+                    logger.info(f"[{self.name}] Probe succeeded, closing circuit")
+                    self._circuit_open_until = 0.0
+                    self._cooldown = self.base_cooldown
+            else:
+                self.stats['failure'] += 1
+                self._consecutive_failures += 1
+
+            if slow:
+                self.stats['slow'] += 1
+
+            if success and not slow:
+                # Additive increase: about one extra slot per limit's worth of healthy responses
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / max(self._limit, 1.0))
+            elif now - self._last_backoff >= min(self._latency_ewma, self.latency_target):
+                # Multiplicative decrease, at most once per request round-trip
+                self._limit = max(float(self.min_limit), self._limit * self.backoff_factor)
+                self._last_backoff = now
+                self.stats['backoffs'] += 1
+                logger.debug(f"[{self.name}] Backing off to {self.limit} in-flight requests")
+
+            if not success and (probe or self._consecutive_failures >= self.failure_threshold):
+                if probe:
+                    self._cooldown = min(self._cooldown * 2, MAX_COOLDOWN)
+                self._circuit_open_until = now + self._cooldown
+                self._consecutive_failures = 0
+                self.stats['circuit_opens'] += 1
+                logger.warning(f"[{self.name}] Circuit open for {self._cooldown:.0f}s after repeated failures")
+
+            self._condition.notify_all()
+
+    def summary(self) -> str:
+        """Return a one-line description of the controller state for logging."""
+        return (f"{self.name}: limit={self.limit}, success={self.stats['success']}, "
+                f"failure={self.stats['failure']}, slow={self.stats['slow']}, "
+                f"backoffs={self.stats['backoffs']}, circuit_opens={self.stats['circuit_opens']}")
+
+def create_controllers(endpoints: Sequence[str], max_limit: int = DEFAULT_MAX_LIMIT) -> Dict[str, AdaptiveConcurrencyController]:
+    """Create one controller per endpoint name."""
+    return {
+        endpoint: AdaptiveConcurrencyController(
+            endpoint,
+            initial_limit=min(DEFAULT_INITIAL_LIMIT, max_limit),
+            max_limit=max_limit,
+        )
+        for endpoint in endpoints
+    }
+
+# --- Execution ---
+
+def _run_task(func: Callable, task: Tuple, controller: AdaptiveConcurrencyController) -> Tuple[bool, Any]:
+    """Run a single task and report its outcome to the controller.
+
+    Returns a (retry, result) tuple where retry is True for transient failures.
+    """
+    start = time.monotonic()
+    try:
+        result = func(*task)
+    except Exception as e:
+        transient = is_transient_error(e)
+        controller.release(time.monotonic() - start, success=not transient)
+        if transient:
+            logger.debug(f"[{controller.name}] Transient failure, queued for retry: {e}")
+            return True, None
+        logger.error(f"Task failed: {e}")
+        return False, None
+    controller.release(time.monotonic() - start, success=True)
+    return False, result
+
+def process_adaptive(
+    func: Callable,
+    tasks: List[Tuple],
+    controller: AdaptiveConcurrencyController,
+    desc: Optional[str] = None,
+    retry_rounds: int = DEFAULT_RETRY_ROUNDS,
+) -> List[Any]:
+    """Execute tasks under an adaptive concurrency limit, retrying transient failures.
+
+    Results are returned in task order. Tasks that fail transiently are put on a
+    retry queue that is drained after the main pass, up to ``retry_rounds`` times.
+    Tasks that still fail, or that raise a non-transient error, yield None.
+    """
+    results: List[Any] = [None] * len(tasks)
+    pending = deque(range(len(tasks)))
+    desc = desc or func.__name__
+
+    with logging_redirect_tqdm():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=controller.max_limit) as executor:
+            for round_number in range(retry_rounds + 1):
+                if not pending:
+                    break
+                if round_number > 0:
+                    logger.warning(f"{desc}: retrying {len(pending)} failed tasks (round {round_number}/{retry_rounds})")
+
+                retry_queue = deque()
+                futures = {}
+                with tqdm(
+                    total=len(pending),
+                    desc=desc if round_number == 0 else f"{desc} (retry {round_number})",
+                    unit='tasks',
+                    mininterval=1.0,  # Update at most once per second
+                    bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]'
+                ) as progress:
+                    def collect(done_futures):
+                        for future in done_futures:
+                            index = futures.pop(future)
+                            retry, result = future.result()
+                            if retry:
+                                retry_queue.append(index)
+                            else:
+                                results[index] = result
+                            progress.update(1)
+
+                    while pending:
+                        index = pending.popleft()
+                        # Blocks while the endpoint is at its limit or the circuit is open
+                        controller.acquire()
+                        futures[executor.submit(_run_task, func, tasks[index], controller)] = index
+                        collect([f for f in list(futures) if f.done()])
+
+                    collect(concurrent.futures.as_completed(list(futures)))
+
+                pending = retry_queue
+
+    if pending:
+        logger.error(f"{desc}: {len(pending)} tasks still failing after {retry_rounds} retry rounds")
+    logger.info(f"{desc}: {controller.summary()}")
+    return results
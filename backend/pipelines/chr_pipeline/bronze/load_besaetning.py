@@ -17,6 +17,7 @@ from zeep.exceptions import Fault
 
 # Import the exporter function
 from .export import save_raw_data
+from .concurrency import is_transient_error
 
 # Set up logging
 logger = logging.getLogger('backend.pipelines.chr_pipeline.bronze.load_besaetning')
@@ -278,6 +279,9 @@ def load_herd_details(client: Client, username: str, herd_number: int, species_c
 
     except Fault as f:
         logger.error(f"Fault occurred in load_herd_details: {f}", exc_info=True)
+        if is_transient_error(f):
+            # Server-side faults are retried by the concurrency controller
+            raise
         return None
 
 # --- Test Execution ---
@@ -16,6 +16,7 @@ from zeep.helpers import serialize_object
 
 # Import the exporter function
 from .export import save_raw_data
+from .concurrency import is_transient_error
 
 # Set up logging
 logger = logging.getLogger('backend.pipelines.chr_pipeline.bronze.load_diko')
@@ -101,6 +102,9 @@ def fetch_raw_soap_response(client: Client, operation_name: str, request_data: D
         logger.error(f"Operation '{operation_name}' not found on client for {client.wsdl.location}")
     except Exception as e:
         logger.error(f"Error calling {operation_name} on {client.wsdl.location}: {e}")
+        if is_transient_error(e):
+            # Let the concurrency controller back off and retry the request
+            raise
     return None
 
 # --- DIKO Loading Functions ---
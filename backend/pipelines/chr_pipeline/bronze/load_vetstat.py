@@ -22,6 +22,7 @@ from cryptography.hazmat.primitives.serialization.pkcs12 import load_key_and_cer
 
 # Import the exporter function
 from .export import save_raw_data
+from .concurrency import TransientFetchError, TRANSIENT_STATUS_CODES
 
 # Set up logging
 logger = logging.getLogger('backend.pipelines.chr_pipeline.bronze.load_vetstat')
@@ -43,6 +44,7 @@ VETSTAT_CERTIFICATE_PASSWORD_SECRET_ID = 'vetstat-certificate-password'
 # API Endpoints
 VETSTAT_ENDPOINT = "https://vetstat.fvst.dk/vetstat/services/external/CHRWS"
 SOAP_ACTION = "http://vetstat.fvst.dk/chr/hentAntibiotikaforbrug"
+REQUEST_TIMEOUT = 120  # seconds; a hung request counts as a transient failure
 
 # Default Client ID
 DEFAULT_CLIENT_ID = 'LandbrugsData'
@@ -451,11 +453,15 @@ def load_vetstat_antibiotics(chr_number: int, species_code: int, period_from: da
             "SOAPAction": SOAP_ACTION
         }
         logger.debug(f"Sending request to {VETSTAT_ENDPOINT}")
-        response = requests.post(
-            VETSTAT_ENDPOINT,
-            data=signed_xml_string,
-            headers=headers
-        )
+        try:
+            response = requests.post(
+                VETSTAT_ENDPOINT,
+                data=signed_xml_string,
+                headers=headers,
+                timeout=REQUEST_TIMEOUT
+            )
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            raise TransientFetchError(f"VetStat request for CHR {chr_number} failed: {e}") from e
 
         # 8. Handle Response
         if response.status_code == 200:
@@ -541,11 +547,15 @@ def load_vetstat_antibiotics(chr_number: int, species_code: int, period_from: da
             # This is a normal response when there's no data
             logger.error(f"VetStat request failed for CHR {chr_number}: HTTP 500")
             return None
+        elif response.status_code in TRANSIENT_STATUS_CODES:
+            raise TransientFetchError(f"VetStat returned HTTP {response.status_code} for CHR {chr_number}")
         else:
             logger.error(f"Unexpected response from VetStat API for CHR {chr_number}: {response.status_code}")
             logger.error(f"Response content:\n{response.text}")
             return None
 
+    except TransientFetchError:
+        raise
     except Exception as e:
         logger.error(f"Failed to execute VetStat request for CHR {chr_number}: {e}")
         return None
@@ -3,12 +3,9 @@
 
 import argparse
 import logging
-import concurrent.futures
 from pathlib import Path
 from datetime import datetime, date, timedelta
 from typing import List, Optional, Dict, Any, Set
-from tqdm.contrib.logging import logging_redirect_tqdm
-from tqdm.auto import tqdm
 import ibis
 import pandas as pd
 
@@ -36,6 +33,7 @@ from bronze.load_diko import (
     ENDPOINTS as DIKO_ENDPOINTS
 )
 from bronze.load_vetstat import load_vetstat_antibiotics
+from bronze.concurrency import create_controllers, process_adaptive
 from bronze.export import finalize_export, get_data_buffer, EXPORT_TIMESTAMP
 
 # Import silver processing orchestrator
@@ -102,7 +100,9 @@ def parse_args() -> Dict[str, Any]:
     parser.add_argument('--end-date', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
                       default=end_date_def, help='End date (YYYY-MM-DD)')
     parser.add_argument('--workers', type=int, default=10,
-                      help='Number of parallel workers')
+                      help='Maximum concurrent requests per endpoint (actual concurrency adapts to endpoint health)')
+    parser.add_argument('--retry-rounds', type=int, default=3,
+                      help='Number of times failed requests are retried at the end of each step')
     parser.add_argument('--test-species-codes', type=str,
                       help='Comma-separated species codes (e.g., "12,13,14,15")')
     parser.add_argument('--limit-total-herds', type=int,
@@ -229,31 +229,6 @@ def fetch_herds(client: Any, username: str, combinations: List[Dict], limit_tota
          logger.info(f"  Species {species}: {count} herds")
     return herd_to_species
 
-def process_parallel(func, tasks: List, workers: int, desc: str = None) -> List:
-    """Execute tasks in parallel using a thread pool with progress tracking."""
-    results = []
-    with logging_redirect_tqdm():
-        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-            futures = [executor.submit(func, *task) for task in tasks]
-
-            # Create progress bar that works in both CI and interactive environments
-            for future in tqdm(
-                concurrent.futures.as_completed(futures),
-                total=len(futures),
-                desc=desc or func.__name__,
-                unit='tasks',
-                mininterval=1.0,  # Update at most once per second
-                bar_format='{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]'
-            ):
-                try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    logger.error(f"Task failed: {e}")
-                    results.append(None)
-
-    return results
-
 def get_required_steps(target_step: str) -> List[str]:
     """Get the list of bronze steps required to run before the target step."""
     # Only return bronze dependencies
@@ -326,7 +301,7 @@ def run_bronze_step(step: str, context: Dict[str, Any]) -> Dict[str, Any]:
         if context['args']['progress']:
             logging.info(f"Processing {len(herd_tasks)} herd detail tasks")
 
-        results = process_parallel(load_herd_details, herd_tasks, context['args']['workers'], "Processing herd details")
+        results = process_adaptive(load_herd_details, herd_tasks, context['controllers']['besaetning'], "Processing herd details", context['args']['retry_rounds'])
 
         # Process results to build chr_to_species mapping
         for result, task in zip(results, herd_tasks):
@@ -357,7 +332,7 @@ def run_bronze_step(step: str, context: Dict[str, Any]) -> Dict[str, Any]:
         if context['args']['progress']:
             logging.info(f"Processing {len(diko_tasks)} DIKO tasks")
 
-        results = process_parallel(load_diko_flytninger, diko_tasks, context['args']['workers'], "Processing DIKO tasks")
+        results = process_adaptive(load_diko_flytninger, diko_tasks, context['controllers']['diko'], "Processing DIKO tasks", context['args']['retry_rounds'])
         context['diko_results'] = results # Keep results in context for potential future use or export
 
         if context['args']['progress']:
@@ -375,8 +350,8 @@ def run_bronze_step(step: str, context: Dict[str, Any]) -> Dict[str, Any]:
             logging.info(f"Processing {len(ejendom_tasks)} ejendom tasks")
 
         # Run both ejendom operations
-        oplysninger_results = process_parallel(load_ejendom_oplysninger, ejendom_tasks, context['args']['workers'], "Processing Ejendom Oplysninger")
-        vet_events_results = process_parallel(load_ejendom_vet_events, ejendom_tasks, context['args']['workers'], "Processing Ejendom Vet Events")
+        oplysninger_results = process_adaptive(load_ejendom_oplysninger, ejendom_tasks, context['controllers']['ejendom'], "Processing Ejendom Oplysninger", context['args']['retry_rounds'])
+        vet_events_results = process_adaptive(load_ejendom_vet_events, ejendom_tasks, context['controllers']['ejendom'], "Processing Ejendom Vet Events", context['args']['retry_rounds'])
         # Results are stored in the buffer by the load functions
 
         if context['args']['progress']:
@@ -400,7 +375,7 @@ def run_bronze_step(step: str, context: Dict[str, Any]) -> Dict[str, Any]:
             logging.info(f"Processing {len(vetstat_tasks)} VetStat tasks")
 
         try:
-            results = process_parallel(load_vetstat_antibiotics, vetstat_tasks, context['args']['workers'], "Processing VetStat tasks")
+            results = process_adaptive(load_vetstat_antibiotics, vetstat_tasks, context['controllers']['vetstat'], "Processing VetStat tasks", context['args']['retry_rounds'])
             # Results are stored in the buffer by the load function
             if context['args']['progress']:
                 successful = sum(1 for r in results if r) # Check if results were returned (even if empty)
@@ -429,7 +404,12 @@ def main():
                 'besaetning': create_bes_client(BES_ENDPOINTS['besaetning'], username, password),
                 'ejendom': create_ejd_client(EJD_ENDPOINTS['ejendom'], username, password),
                 'diko': create_diko_client(DIKO_ENDPOINTS['diko'], username, password)
-            }
+            },
+            # One adaptive concurrency controller per FVST endpoint, shared across steps
+            'controllers': create_controllers(
+                ['besaetning', 'ejendom', 'diko', 'vetstat'],
+                max_limit=args['workers']
+            )
         }
 
         # Determine steps to run
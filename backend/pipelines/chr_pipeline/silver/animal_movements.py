@@ -100,8 +100,8 @@ def create_animal_movements_table(
 
         # Generate UUID and clean/cast
         movements = movements.mutate(
-            # Replace ibis.sql('uuid()') with ibis.uuid()
-            movement_id=ibis.uuid(),  # Generate UUID
+            # Generate the UUID as a 32-char hex string in DuckDB
+            movement_id=ibis.uuid().cast(dt.string).replace("-", ""),
             reporting_herd_number=ibis.coalesce(
                 movements.reporting_herd_number.cast(dt.string)
                 .strip()
@@ -159,7 +159,7 @@ def create_animal_movements_table(
 
         logging.info(f"Saving animal_movements table with {rows} rows.")
         saved_path = export.save_table(
-            output_path, movements_final.execute(), is_geo=False
+            output_path, movements_final.to_pyarrow(), is_geo=False
         )
         if saved_path is None:
             logging.error("Failed to save animal_movements table - no path returned")
@@ -152,8 +152,8 @@ def create_antibiotic_usage_table(
         # Generate UUID and clean/cast
         # Use ibis.coalesce for safe casting, especially for numerics
         usage_cleaned = usage_base.mutate(
-            # Replace ibis.sql('uuid()') with ibis.uuid()
-            usage_id=ibis.uuid(),
+            # Generate the UUID as a 32-char hex string in DuckDB
+            usage_id=ibis.uuid().cast(dt.string).replace("-", ""),
             cvr_number=usage_base.cvr_number_raw.cast(dt.string)
             .strip()
             .nullif(""),  # Keep as string FK for now
@@ -334,7 +334,7 @@ def create_antibiotic_usage_table(
             return None
 
         logging.info(f"Saving antibiotic_usage table with {rows} rows.")
-        saved_path = export.save_table(output_path, usage_final.execute(), is_geo=False)
+        saved_path = export.save_table(output_path, usage_final.to_pyarrow(), is_geo=False)
         if saved_path is None:
             logging.error("Failed to save antibiotic_usage table - no path returned")
             return None
@@ -1,13 +1,13 @@
 import logging
 import os
-import shutil
-import tempfile
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
 import gcsfs
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
 from google.cloud import storage
 
@@ -28,6 +28,15 @@ USE_GCS = bool(GCS_BUCKET and GOOGLE_CLOUD_PROJECT)
 # DEBUG: Log USE_GCS decision
 logging.info(f"USE_GCS determined as: {USE_GCS}")
 
+# Parquet writer settings: zstd gives much smaller files than snappy at similar
+# speed, and bounded row groups keep writer memory flat for the large tables
+PARQUET_COMPRESSION = "zstd"
+PARQUET_ROW_GROUP_SIZE = 256 * 1024
+# Size of each chunk streamed to GCS (must be a multiple of 256 KiB)
+GCS_BLOCK_SIZE = 16 * 1024 * 1024
+
+TableLike = Union[pd.DataFrame, pa.Table]
+
 # Get timestamp for this export run
 EXPORT_TIMESTAMP = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
 
@@ -59,110 +68,103 @@ if not USE_GCS:
     logging.info("Using local storage in /data/silver/")
 
 
-def _convert_uuid_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Convert UUID columns to strings for parquet compatibility."""
-    df = df.copy()  # Create a copy to avoid modifying the original
-    for col in df.columns:
-        if df[col].dtype == "object":  # Check if column might contain UUIDs
-            # Get first non-null value
-            first_value = df[col].dropna().iloc[0] if not df[col].isna().all() else None
-            if first_value is not None and hasattr(
-                first_value, "hex"
-            ):  # UUID objects have hex attribute
-                # Convert UUIDs to hex strings
-                df[col] = df[col].apply(
-                    lambda x: x.hex if x is not None and hasattr(x, "hex") else x
-                )
-    return df
+def _convert_uuid_columns(table: pa.Table) -> pa.Table:
+    """Store UUID columns as fixed-size binary so parquet writers accept them.
+
+    UUID extension columns share their fixed_size_binary(16) storage, so this only
+    swaps column metadata and never touches individual values.
+    """
+    for i, field in enumerate(table.schema):
+        if isinstance(field.type, pa.ExtensionType) and field.type.storage_type == pa.binary(16):
+            storage = pa.chunked_array(
+                [chunk.storage for chunk in table.column(i).chunks], type=pa.binary(16)
+            )
+            table = table.set_column(i, field.name, storage)
+    return table
+
+
+def _to_arrow(data: TableLike) -> pa.Table:
+    """Convert a DataFrame or Arrow table into an Arrow table ready for parquet."""
+    if isinstance(data, pd.DataFrame):
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    return _convert_uuid_columns(data)
+
+
+def _write_parquet(sink, data: TableLike, is_geo: bool = False) -> None:
+    """Write data as zstd-compressed parquet to a path or an open binary file."""
+    if is_geo and isinstance(data, pd.DataFrame):
+        # GeoDataFrame.to_parquet adds the GeoParquet metadata and forwards
+        # the writer options to pyarrow
+        data.to_parquet(
+            sink,
+            index=False,
+            compression=PARQUET_COMPRESSION,
+            row_group_size=PARQUET_ROW_GROUP_SIZE,
+        )
+        return
+
+    pq.write_table(
+        _to_arrow(data),
+        sink,
+        compression=PARQUET_COMPRESSION,
+        row_group_size=PARQUET_ROW_GROUP_SIZE,
+    )
 
 
 def _save_to_gcs(
-    filepath: Path, df: pd.DataFrame, is_geo: bool = False
+    filepath: Path, data: TableLike, is_geo: bool = False
 ) -> Optional[Path]:
-    """Save DataFrame to GCS."""
+    """Stream parquet straight into GCS without local staging."""
     if not USE_GCS or not GCS_BUCKET:
         logging.warning("GCS not configured, cannot save to GCS")
         return None
 
-    try:
-        # Convert UUIDs to strings
-        df = _convert_uuid_columns(df)
-
-        # Create a temporary directory for local staging
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir) / filepath.name
-
-            # Save to temporary file
-            if is_geo:
-                df.to_parquet(temp_path, index=False, engine="pyarrow")
-            else:
-                df.to_parquet(temp_path, index=False, engine="pyarrow")
-
-            # Define GCS path with timestamp
-            gcs_path = (
-                f"gs://{GCS_BUCKET}/silver/chr/{EXPORT_TIMESTAMP}/{filepath.name}"
-            )
-
-            try:
-                # Upload to GCS using gcsfs
-                with open(temp_path, "rb") as local_file:
-                    with gcs_fs.open(gcs_path, "wb") as gcs_file:
-                        gcs_file.write(local_file.read())
-                logging.info(
-                    f"Successfully uploaded {filepath.name} to GCS at {gcs_path}"
-                )
-                return filepath
-            except Exception as gcs_err:
-                logging.error(f"Failed to upload to GCS: {gcs_err}")
-                return None
+    # Define GCS path with timestamp
+    gcs_path = f"gs://{GCS_BUCKET}/silver/chr/{EXPORT_TIMESTAMP}/{filepath.name}"
 
+    try:
+        gcs_file = gcs_fs.open(gcs_path, "wb", block_size=GCS_BLOCK_SIZE)
+        try:
+            _write_parquet(gcs_file, data, is_geo)
+        except Exception:
+            # Abort the resumable upload so no partial object is left behind
+            gcs_file.discard()
+            raise
+        gcs_file.close()
+        logging.info(f"Successfully uploaded {filepath.name} to GCS at {gcs_path}")
+        return filepath
     except Exception as e:
-        logging.error(f"Error in GCS save process: {e}")
+        logging.error(f"Failed to upload to GCS: {e}")
         return None
 
 
 def _save_locally(
-    filepath: Path, df: pd.DataFrame, is_geo: bool = False
+    filepath: Path, data: TableLike, is_geo: bool = False
 ) -> Optional[Path]:
-    """Save DataFrame locally."""
+    """Save data locally as parquet."""
     try:
-        # Convert UUIDs to strings
-        df = _convert_uuid_columns(df)
-
-        # Create a temporary directory
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = Path(temp_dir) / filepath.name
-
-            # Save to temporary file
-            if is_geo:
-                df.to_parquet(temp_path, index=False, engine="pyarrow")
-            else:
-                df.to_parquet(temp_path, index=False, engine="pyarrow")
-
-            # Ensure the parent directory exists
-            os.makedirs(filepath.parent, exist_ok=True)
-            # Copy directly to the target path without adding timestamp again
-            shutil.copy2(temp_path, filepath)
-
-            return filepath
+        # Ensure the parent directory exists
+        os.makedirs(filepath.parent, exist_ok=True)
+        _write_parquet(filepath, data, is_geo)
+        return filepath
     except Exception as e:
         logging.error(f"Error saving locally: {e}")
         return None
 
 
 def save_table(
-    filepath: Path, df: pd.DataFrame, is_geo: bool = False
+    filepath: Path, data: TableLike, is_geo: bool = False
 ) -> Optional[Path]:
-    """Save a DataFrame to parquet, first attempting GCS then falling back to local storage."""
+    """Save a DataFrame or Arrow table to parquet, first attempting GCS then falling back to local storage."""
     try:
         # Try saving to GCS first
-        saved_path = _save_to_gcs(filepath, df, is_geo)
+        saved_path = _save_to_gcs(filepath, data, is_geo)
         if saved_path is not None:
             return saved_path
 
         # If GCS fails, fall back to local storage
         logging.warning("Falling back to local storage")
-        return _save_locally(filepath, df, is_geo)
+        return _save_locally(filepath, data, is_geo)
 
     except Exception as e:
         logging.error(f"Failed to save table: {e}")
@@ -131,7 +131,7 @@ def create_herds_table(
             return None  # Return None if no rows
 
         logging.info(f"Saving herds table with {rows} rows.")
-        saved_path = export.save_table(output_path, herds_final.execute(), is_geo=False)
+        saved_path = export.save_table(output_path, herds_final.to_pyarrow(), is_geo=False)
         if saved_path is None:
             logging.error("Failed to save herds table - no path returned")
             return None
@@ -287,7 +287,7 @@ def create_herd_owners_table(
 
         logging.info(f"Saving herd_owners table with attributes ({rows} rows).")
         saved_path = export.save_table(
-            output_path, herd_owners_final.execute(), is_geo=False
+            output_path, herd_owners_final.to_pyarrow(), is_geo=False
         )
         if saved_path is None:
             logging.error("Failed to save herd_owners table - no path returned")
@@ -438,7 +438,7 @@ def create_herd_users_table(
 
         logging.info(f"Saving herd_users table with attributes ({rows} rows).")
         saved_path = export.save_table(
-            output_path, herd_users_final.execute(), is_geo=False
+            output_path, herd_users_final.to_pyarrow(), is_geo=False
         )
         if saved_path is None:
             logging.error("Failed to save herd_users table - no path returned")
@@ -502,7 +502,7 @@ def create_herd_sizes_table(
 
         # Clean and cast columns
         herd_sizes = herd_sizes.mutate(
-            size_id=ibis.uuid(),
+            size_id=ibis.uuid().cast(dt.string).replace("-", ""),
             herd_number=ibis.coalesce(
                 herd_sizes.herd_number_raw.cast(dt.string)
                 .strip()
@@ -566,7 +566,7 @@ def create_herd_sizes_table(
 
         logging.info(f"Saving herd_sizes table with {rows} rows.")
         saved_path = export.save_table(
-            output_path, herd_sizes_final.execute(), is_geo=False
+            output_path, herd_sizes_final.to_pyarrow(), is_geo=False
         )
         if saved_path is None:
             logging.error("Failed to save herd_sizes table - no path returned")
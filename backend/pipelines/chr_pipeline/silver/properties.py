@@ -412,7 +412,7 @@ def create_property_owners_table(
 
         logging.info(f"Saving property_owners table with attributes ({rows} rows).")
         saved_path = export.save_table(
-            output_path, prop_owners_final.execute(), is_geo=False
+            output_path, prop_owners_final.to_pyarrow(), is_geo=False
         )
         if saved_path is None:
             logging.error("Failed to save property_owners table - no path returned")
@@ -559,7 +559,7 @@ def create_property_users_table(
 
         logging.info(f"Saving property_users table with attributes ({rows} rows).")
         saved_path = export.save_table(
-            output_path, prop_users_final.execute(), is_geo=False
+            output_path, prop_users_final.to_pyarrow(), is_geo=False
         )
         if saved_path is None:
             logging.error("Failed to save property_users table - no path returned")
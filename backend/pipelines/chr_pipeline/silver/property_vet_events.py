@@ -73,7 +73,7 @@ def create_property_vet_events_table(
 
         # Generate UUID and clean/cast
         vet_events = vet_events.mutate(
-            event_id=ibis.uuid(),
+            event_id=ibis.uuid().cast(dt.string).replace("-", ""),
             chr_number=ibis.coalesce(
                 vet_events.chr_number_raw.cast(dt.string)
                 .strip()
@@ -164,7 +164,7 @@ def create_property_vet_events_table(
 
         logging.info(f"Saving property_vet_events table with {rows} rows.")
         saved_path = export.save_table(
-            output_path, vet_events_final.execute(), is_geo=False
+            output_path, vet_events_final.to_pyarrow(), is_geo=False
         )
         if saved_path is None:
             logging.error("Failed to save property_vet_events table - no path returned")
@@ -86,7 +86,7 @@ def create_vet_practices_table(con, bes_details_raw, silver_dir):
 
     logging.info(f"Saving vet_practices table with {rows} rows.")
     saved_path = export.save_table(
-        output_path, vet_practices_final.execute(), is_geo=False
+        output_path, vet_practices_final.to_pyarrow(), is_geo=False
     )
     if saved_path is None:
         logging.error("Failed to save vet_practices table - no path returned")
@@ -1,17 +1,34 @@
+import asyncio
+import logging
 import requests
 import time
 import pandas as pd
 import json
 
+from bronze.fetch_company_detail import fetch_with_retry
 
-class DMAScraper:
-    def __init__(self):
-        pass
+logger = logging.getLogger(__name__)
 
-    def fetch_data(self, page=1):
-        url = "https://dma.mst.dk/soeg/page"
+LISTING_URL = "https://dma.mst.dk/soeg/page"
+# Listing pages in flight at once, on top of the request limit shared with the detail scrape
+DEFAULT_MAX_CONCURRENT_PAGES = 4
+
+
+def form_fields(payload):
+    """Expand list values into repeated form fields, the way requests encodes them."""
+    return [
+        (key, item)
+        for key, value in payload.items()
+        for item in (value if isinstance(value, list) else [value])
+    ]
 
-        payload = {
+
+class DMAScraper:
+    def __init__(self, max_concurrent_pages=DEFAULT_MAX_CONCURRENT_PAGES):
+        self.max_concurrent_pages = max_concurrent_pages
+
+    def build_payload(self, page=1):
+        return {
             "page": str(page),
             "timestamp": str(int(time.time() * 1000)),
             "searched": "true",
@@ -48,9 +65,51 @@ class DMAScraper:
             "visOffentliggoerelser": "false",
             "empty": "false"
         }
-        response = requests.post(url, data=payload)
+
+    def fetch_data(self, page=1):
+        response = requests.post(LISTING_URL, data=self.build_payload(page))
         return response.json()
 
+    async def fetch_page(self, session, page, limit):
+        """Fetch one listing page on a shared session, under the shared request limit."""
+        text = await fetch_with_retry(
+            session, LISTING_URL, limit, method='POST', data=form_fields(self.build_payload(page))
+        )
+        return json.loads(text)
+
+    async def iter_pages(self, session, limit, total_pages=None):
+        """
+        Yield ``(page, results)`` for every listing page as the pages arrive.
+
+        Page 1 is fetched first to learn the number of pages from
+        ``pagination.antalSider``; the remaining pages are then fetched
+        concurrently, at most ``max_concurrent_pages`` at a time, and yielded
+        in completion order.
+        """
+        if total_pages is not None and total_pages < 1:
+            return
+        first = await self.fetch_page(session, 1, limit)
+        if total_pages is None:
+            total_pages = first['pagination']['antalSider']
+        logger.info(f"Total pages: {total_pages}")
+        yield 1, self.extract_info(first)
+
+        page_limit = asyncio.Semaphore(self.max_concurrent_pages)
+
+        async def fetch(page):
+            async with page_limit:
+                return page, await self.fetch_page(session, page, limit)
+
+        tasks = [asyncio.create_task(fetch(page)) for page in range(2, total_pages + 1)]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                page, data = await next_page
+                logger.info(f"Fetched listing page {page}/{total_pages}")
+                yield page, self.extract_info(data)
+        finally:
+            for task in tasks:
+                task.cancel()
+
     def extract_info(self, data):
         results = []
         for item in data['resultater']:
@@ -8,11 +8,15 @@ from importlib.machinery import SourceFileLoader
 
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
 import json
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 import traceback
 import logging
 
+from bronze.parsers import DEFAULT_PARSER, TABLE_SECTIONS, parse_company_page, parse_sub_page
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,88 +26,94 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def fetch(session, url):
-    async with session.get(url) as response:
+# Total requests in flight against dma.mst.dk, shared by company pages and sub-pages
+DEFAULT_MAX_CONCURRENT_REQUESTS = 20
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0  # seconds, doubled on every attempt
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = 60
+KEEPALIVE_TIMEOUT = 60
+# Sub-page fields of a table row whose sub-page could not be fetched or parsed
+EMPTY_SUB_PAGE = {"pdf_url": None, "cvr": None, "chr": None}
+
+
+async def fetch(session, url, method='GET', data=None):
+    async with session.request(method, url, data=data) as response:
         response.raise_for_status()
         return await response.text()
+
+
+async def fetch_with_retry(session, url, limit, method='GET', data=None, cache=None, source_key=None,
+                           max_retries=MAX_RETRIES, backoff=RETRY_BACKOFF):
+    """
+    Fetch a page under the shared request limit, retrying transient failures with backoff.
     
-def fetch_text(soup, selector):
-    if soup.select_one(selector) is None:
-        return None
-    return soup.select_one(selector).text.strip()
-    
+    GET requests go through ``cache`` (a ``common.http_cache.HttpCache``) when given.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            # The slot is only held for the request itself, not while backing off
+            async with limit:
+                if cache is not None and method == 'GET':
+                    return await cache.fetch(session, url, source_key=source_key)
+                return await fetch(session, url, method, data)
+        except aiohttp.ClientResponseError as e:
+            if e.status not in RETRY_STATUS_CODES or attempt == max_retries:
+                raise
+            error = e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == max_retries:
+                raise
+            error = e
+        delay = backoff * 2 ** attempt * (0.5 + random.random())
+        logger.warning(f"Retrying {url} in {delay:.1f}s after error: {error}")
+        await asyncio.sleep(delay)
+
+
 class DMACompanyDetailScraper:
     
-    def __init__(self, data):
+    def __init__(self, data, max_concurrent_requests=DEFAULT_MAX_CONCURRENT_REQUESTS,
+                 parser=DEFAULT_PARSER, parse_workers=None, cache=None, skip_unchanged_rows=False):
         self.data = data
+        self.max_concurrent_requests = max_concurrent_requests
+        self.request_limit = asyncio.Semaphore(max_concurrent_requests)
+        self.parser = parser
+        # None uses one worker per CPU, 0 parses on the event loop thread
+        self.parse_workers = parse_workers
+        self.parse_pool = None
+        self.cache = cache
+        # Reuse cached sub-pages of table rows that are identical to the last run
+        self.skip_unchanged_rows = skip_unchanged_rows and cache is not None
 
-    async def scrape_details(self, session, url):
-        try:
-            html = await fetch(session, url)
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            data = {
-                'title': soup.find('div', class_='dma-content-header').find('span').text.strip()
-            }
-            
-            for section in ['Grunddata', 'Adresse', 'Aktiviteter/anlæg og miljøkategorier', 'Myndighed', 'IED-oplysninger (Direktivet om industrielle emissioner)']:
-                section_div = soup.find('div', string=section)
-                if section_div:
-                    section_body = section_div.find_next('div', class_='card-body')
-                    for dt, dd in zip(section_body.find_all('dt'), section_body.find_all('dd')):
-                        key = dt.text.strip(':')
-                        value = dd.text.strip()
-                        data[key] = value
-            
-                return data
-        except Exception as e:
-            logger.error(f"Error scraping {url}: {str(e)}")
-            logger.error(traceback.format_exc())
-            return {}
+    async def parse(self, func, html, url):
+        """Parse a page in the process pool so the event loop keeps fetching meanwhile."""
+        if self.parse_pool is None:
+            return func(html, url, self.parser)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.parse_pool, func, html, url, self.parser)
         
-    async def scrape_table_url(self, session, url):
+    async def scrape_table_url(self, session, url, row=None):
+        source_key = row if self.skip_unchanged_rows else None
         try:
-            html = await fetch(session, url)
-            soup = BeautifulSoup(html, 'html.parser')
-            cvr_selector = "div:nth-child(2) > div.card-body > dl > dd:nth-child(4)"
-            chr_selector = "div:nth-child(2) > div.card-body > dl > dd:nth-child(8)"
-            cvr = fetch_text(soup, cvr_selector)
-            chr = fetch_text(soup, chr_selector)
-            pdf_url_selector = "#hent-0"
-            if(soup.select_one(pdf_url_selector)!= None):
-                pdf_url = 'https://dma.mst.dk' + soup.select_one(pdf_url_selector).get('href')
-            else:
-                pdf_url = None
-            return {"pdf_url":pdf_url, "cvr":cvr, "chr":chr}
+            html = await fetch_with_retry(
+                session, url, self.request_limit, cache=self.cache, source_key=source_key
+            )
         except Exception as e:
             logger.error(f"Error scraping PDF URL from {url}: {str(e)}")
             logger.error(traceback.format_exc())
             return None
+        return await self.parse(parse_sub_page, html, url)
 
-    async def scrape_table(self, session, url, table_id):
+    async def scrape_table(self, session, rows, url):
+        """Fetch the sub-pages of a table's rows concurrently and merge them into the rows."""
         try:
-            html = await fetch(session, url)
-            soup = BeautifulSoup(html, 'html.parser')
-            table = soup.find('table', id=table_id)
-        
-            if not table:
-                return []
-        
-            headers = [th.text.strip() for th in table.find_all('th')]
-            rows = []
-        
-            for row in table.find_all('tr')[1:]:  # Skip header row
-                cols = row.find_all('td')
-                if len(cols) == len(headers):
-                    row_data = {}
-                    for i, col in enumerate(cols):
-                        row_data[headers[i]] = col.text.strip()
-                        if col.find('a'):
-                            row_data[f"{headers[i]}_url"] = 'https://dma.mst.dk' + col.find('a')['href']
-                    rows.append(row_data)
-                    
-            for row in rows:
-                row.update(await self.scrape_table_url(session, row['_url']))
+            # Bounded by the shared request limit, not by this table's size
+            sub_pages = await asyncio.gather(
+                *(self.scrape_table_url(session, row['_url'], row) for row in rows)
+            )
+            for row, sub_page in zip(rows, sub_pages):
+                # A sub-page that failed keeps its row, with the sub-page fields empty
+                row.update(sub_page if sub_page is not None else EMPTY_SUB_PAGE)
                 
             return rows
         except Exception as e:
@@ -112,30 +122,122 @@ class DMACompanyDetailScraper:
         return []
 
     async def process_miljoeaktoer(self, session, url):
+        """Fetch and parse a company page once, then extract the details and all three tables from it."""
         logger.info(f"Processing {url}")
         try:
-            data = await self.scrape_details(session, url)
+            try:
+                html = await fetch_with_retry(session, url, self.request_limit, cache=self.cache)
+            except Exception as e:
+                logger.error(f"Error scraping {url}: {str(e)}")
+                data = {'miljoeaktoerUrl': url}
+                data.update({section: [] for section, _ in TABLE_SECTIONS})
+                return data
+            data, tables = await self.parse(parse_company_page, html, url)
             data['miljoeaktoerUrl'] = url
             
-            # Scrape Tilsyn, Håndhævelser, and Afgørelser
-            for section, table_id in [('Tilsyn', 'tilsyn-tabel'), 
-                                    ('Håndhævelser', 'haandhaevelse-tabel'), 
-                                    ('Afgørelser', 'afgoerelser-tabel')]:
-                data[section] = await self.scrape_table(session, url, table_id)
+            # Scrape the sub-pages of Tilsyn, Håndhævelser, and Afgørelser
+            for section, _ in TABLE_SECTIONS:
+                data[section] = await self.scrape_table(session, tables[section], url)
             
             return data
         except Exception as e:
             logger.error(f"Error processing {url}: {str(e)}")
             return None
         
+    @asynccontextmanager
+    async def open_session(self):
+        """
+        Open the session shared by every request of a scrape, and the parse pool.
+        
+        All requests go through one keep-alive connection pool and the shared
+        ``max_concurrent_requests`` limit. Pages are parsed in a pool of
+        ``parse_workers`` processes.
+        """
+        if self.parse_workers != 0:
+            self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrent_requests,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        try:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                yield session
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown()
+                self.parse_pool = None
+
+    async def scrape_companies(self, session, batches, max_concurrent=20):
+        """
+        Scrape companies from an async iterator of batches as the batches arrive.
+        
+        ``max_concurrent`` workers take companies off a queue, so the first
+        companies are scraped while later batches are still being fetched.
+        Results are returned in the order the companies were queued.
+        """
+        queue = asyncio.Queue()
+        results = {}
+
+        async def worker():
+            while True:
+                entry = await queue.get()
+                if entry is None:
+                    return
+                index, item = entry
+                results[index] = await self.process_miljoeaktoer(session, item['miljoeaktoerUrl'])
+
+        workers = [asyncio.create_task(worker()) for _ in range(max_concurrent)]
+        queued = 0
+        try:
+            async for batch in batches:
+                for item in batch:
+                    queue.put_nowait((queued, item))
+                    queued += 1
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        for _ in workers:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers)
+        return [results[index] for index in range(queued)]
+
     async def process_miljoeaktoer_for_company_file_path(self, max_concurrent=20):
-        sem = asyncio.Semaphore(max_concurrent)
-        async with aiohttp.ClientSession() as session:
-            async def bounded(item):
-                async with sem:
-                    return await self.process_miljoeaktoer(session, item['miljoeaktoerUrl'])
-            tasks = [bounded(item) for item in self.data]
-            company_details_data = await asyncio.gather(*tasks)
-        return company_details_data
+        """Scrape all companies in ``data``, with at most ``max_concurrent`` companies in progress."""
+        async def batches():
+            yield self.data
+
+        async with self.open_session() as session:
+            return await self.scrape_companies(session, batches(), max_concurrent)
+
+    async def scrape_listing(self, listing_scraper, total_pages=None, max_concurrent=20):
+        """
+        Fetch the listing pages and scrape each page's companies as soon as it arrives.
+        
+        Listing pages and company pages share one session and request limit.
+        When done, ``data`` holds the listing results in page order.
+        
+        Returns:
+            The company details, in the same order as ``data``.
+        """
+        listing = {}
 
+        async def batches():
+            async for page, page_results in listing_scraper.iter_pages(
+                session, self.request_limit, total_pages
+            ):
+                listing[page] = page_results
+                yield page_results
 
+        async with self.open_session() as session:
+            details = await self.scrape_companies(session, batches(), max_concurrent)
+        # Pages arrive in completion order; return everything in page order
+        page_details = {}
+        offset = 0
+        for page, page_results in listing.items():
+            page_details[page] = details[offset:offset + len(page_results)]
+            offset += len(page_results)
+        self.data = [item for page in sorted(listing) for item in listing[page]]
+        return [detail for page in sorted(listing) for detail in page_details[page]]
@@ -1,11 +1,11 @@
-from bronze.fetch_company_data import DMAScraper
+from bronze.fetch_company_data import DEFAULT_MAX_CONCURRENT_PAGES, DMAScraper
 import os
 from google.cloud import storage
 from  datetime import datetime
 import argparse
+import tempfile
 # inside backend/pipelines/dma_scraper/fetch_company_data.py
 import os, sys
-import time
 import nest_asyncio
 import asyncio
 import aiohttp
@@ -15,7 +15,10 @@ ROOT = os.path.abspath(os.path.join(__file__, "..", "..", ".."))
 sys.path.insert(0, ROOT)
 
 from common.storage_interface import LocalStorage, GCSStorage
+from common.fingerprint import RunManifest, fingerprint_records
+from common.http_cache import DEFAULT_TTL, HttpCache
 from bronze.fetch_company_detail import DMACompanyDetailScraper
+from bronze.parsers import DEFAULT_PARSER, PARSERS
 PREFIX_BRONZE_SAVE_PATH = os.environ.get("BRONZE_OUTPUT_DIR", "bronze/dma")
 PREFIX_SILVER_SAVE_PATH = os.environ.get("SILVER_OUTPUT_DIR", "silver/dma")
 nest_asyncio.apply()
@@ -24,10 +27,10 @@ nest_asyncio.apply()
 ENVIRONMENT = os.environ.get("ENVIRONMENT", "development")
 if ENVIRONMENT.lower() in ("production", "container"):
     storage_backend = GCSStorage(os.environ.get("GCS_BUCKET", "landbrugsdata-raw-data"))
+    manifest = RunManifest("dma", bucket_name=os.environ.get("GCS_BUCKET", "landbrugsdata-raw-data"))
 else:
     storage_backend = LocalStorage(os.environ.get("BRONZE_OUTPUT_DIR", "."))
-
-scraper = DMAScraper()
+    manifest = RunManifest("dma", local_dir=os.environ.get("BRONZE_OUTPUT_DIR", "."))
 
 def save_data(data, timestamp, PATH):
     timestamp_dir = os.path.join(PATH, timestamp)
@@ -35,11 +38,12 @@ def save_data(data, timestamp, PATH):
     storage_backend.save_json(data, blob_name)
     print(f"Saved {blob_name} to storage")
 
-def save_parquet(data, timestamp, PATH):
+def save_parquet_files(tables, timestamp, PATH):
     timestamp_dir = os.path.join(PATH, timestamp)
-    blob_name = f"{timestamp_dir}/data.parquet"
-    storage_backend.save_parquet(data, blob_name)
-    print(f"Saved {blob_name} to storage")
+    for name, table in tables.items():
+        blob_name = f"{timestamp_dir}/{name}.parquet"
+        storage_backend.save_file(table['path'], blob_name)
+        print(f"Saved {blob_name} ({table['rows']} rows) to storage")
 
 def parse_args():
     parser = argparse.ArgumentParser(description="DMA Scraper Pipeline")
@@ -49,6 +53,12 @@ def parse_args():
         default=None,
         help="Total number of pages to scrape",
     )
+    parser.add_argument(
+        "--max-concurrent-pages",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT_PAGES,
+        help="Maximum number of listing pages fetched concurrently",
+    )
     parser.add_argument(
         "--silver",
         action='store_true',
@@ -59,39 +69,68 @@ def parse_args():
         type=str,
         help="Timestamp directory for silver stage",
     )
+    parser.add_argument(
+        "--force",
+        action='store_true',
+        help="Save and transform the data even if it is unchanged since the last run",
+    )
+    parser.add_argument(
+        "--parser",
+        choices=sorted(PARSERS),
+        default=DEFAULT_PARSER,
+        help="HTML parser backend for company pages and their sub-pages",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=None,
+        help="Number of processes parsing pages (default: one per CPU, 0 parses in the main process)",
+    )
+    parser.add_argument(
+        "--http-cache-dir",
+        type=str,
+        default=os.environ.get("HTTP_CACHE_DIR"),
+        help="Directory of the HTTP cache for company pages and sub-pages (default: no cache)",
+    )
+    parser.add_argument(
+        "--http-cache-ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help="Seconds a cached page without ETag/Last-Modified is reused before it is downloaded again",
+    )
+    parser.add_argument(
+        "--skip-unchanged-rows",
+        action='store_true',
+        help="Reuse cached sub-pages of table rows that are unchanged since the last run",
+    )
     return parser.parse_args()
 
 def silver(data, timestamp: str):
-    df = transform_dma_json(data)
-    save_parquet(df, timestamp, PREFIX_SILVER_SAVE_PATH)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tables = transform_dma_json(data, tmp_dir)
+        save_parquet_files(tables, timestamp, PREFIX_SILVER_SAVE_PATH)
 
 def bronze(timestamp: str):
     args = parse_args()
-    page = 1
-    total_pages = args.total_pages
-    all_page_results = []
-    while total_pages is None or page <= total_pages:
-        print(f"Fetching page {page}...")
-        data = scraper.fetch_data(page)
-
-        if total_pages is None:
-            total_pages = data['pagination']['antalSider']
-            print(f"Total pages: {total_pages}")
-
-        page_results = scraper.extract_info(data)
-        time.sleep(1)  # Add a delay to avoid overwhelming the server
-        all_page_results.extend(page_results)
-        page += 1
-    detail_scraper = DMACompanyDetailScraper(all_page_results)
+    scraper = DMAScraper(max_concurrent_pages=args.max_concurrent_pages)
+    cache = HttpCache(args.http_cache_dir, ttl=args.http_cache_ttl) if args.http_cache_dir else None
+    detail_scraper = DMACompanyDetailScraper(
+        [], parser=args.parser, parse_workers=args.parse_workers,
+        cache=cache, skip_unchanged_rows=args.skip_unchanged_rows,
+    )
+    # Companies are scraped as soon as their listing page arrives
     loop = asyncio.get_event_loop()
-    detailed_data = loop.run_until_complete(detail_scraper.process_miljoeaktoer_for_company_file_path())
+    detailed_data = loop.run_until_complete(detail_scraper.scrape_listing(scraper, args.total_pages))
+    all_page_results = detail_scraper.data
+    print(f"Scraped {len(all_page_results)} companies")
+    if cache is not None:
+        print(f"HTTP cache: {cache.stats}")
     # Merge base and detail dicts by 'miljoeaktoerUrl'
     detail_lookup = {item.get('miljoeaktoerUrl'): item for item in detailed_data if item}
     merged_results = []
     for base in all_page_results:
         url = base.get('miljoeaktoerUrl')
         merged_results.append({**base, **detail_lookup.get(url, {})})
-    save_data(merged_results, timestamp, PREFIX_BRONZE_SAVE_PATH)
     return merged_results
 
 if __name__ == "__main__":
@@ -105,4 +144,11 @@ if __name__ == "__main__":
         silver(data, args.timestamp)
     else:
         data = bronze(timestamp)
-        silver(data, timestamp)
\ No newline at end of file
+        fingerprint = fingerprint_records(data)
+        if not args.force and manifest.is_unchanged(fingerprint):
+            print("Source unchanged since last successful run, skipping save and silver stage")
+            manifest.record_noop(fingerprint)
+            sys.exit(0)
+        save_data(data, timestamp, PREFIX_BRONZE_SAVE_PATH)
+        silver(data, timestamp)
+        manifest.record_success(fingerprint, bronze_timestamp=timestamp)
\ No newline at end of file
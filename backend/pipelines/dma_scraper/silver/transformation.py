@@ -1,47 +1,192 @@
+"""
+Build typed DMA silver tables from the bronze JSON with DuckDB.
+
+The bronze records are read once with an explicit schema: listing fields as
+scalars and the three table sections as lists of ``MAP(VARCHAR, VARCHAR)``,
+so no types are inferred from the heterogeneous row dicts. From that single
+load, a facility dimension and one fact table per section are written as
+Parquet with parsed dates, integer CVR/CHR numbers and PDF URLs as columns.
+"""
+
+import json
 import os
 import sys
-import json
-import pyarrow as pa
+import tempfile
+from typing import Any, Dict, List
+
 import duckdb
-import pandas as pd
 
-def transform_dma_json(data):
+PARQUET_COMPRESSION = 'zstd'
+
+# Output table name -> section key in the bronze records
+SECTION_TABLES = {
+    'inspections': 'Tilsyn',
+    'enforcements': 'Håndhævelser',
+    'decisions': 'Afgørelser',
+}
+FACILITY_TABLE = 'facilities'
+
+# Explicit schema of the bronze records; numbers and flags are cast after loading
+BRONZE_COLUMNS = {
+    'miljoeaktoerUrl': 'VARCHAR',
+    'myndighedUrl': 'VARCHAR',
+    'title': 'VARCHAR',
+    'navn': 'VARCHAR',
+    'cvr': 'VARCHAR',
+    'chr': 'VARCHAR',
+    'pnr': 'VARCHAR',
+    'mstNoegle': 'VARCHAR',
+    'fuldAdresse': 'VARCHAR',
+    'vejnavn': 'VARCHAR',
+    'husNummer': 'VARCHAR',
+    'postNummer': 'VARCHAR',
+    'bynavn': 'VARCHAR',
+    'hovedaktivitetKode': 'VARCHAR',
+    'hovedaktivitetTekst': 'VARCHAR',
+    'miljoeaktoerGruppeKode': 'VARCHAR',
+    'miljoeaktoerGruppeTekst': 'VARCHAR',
+    'godkendelsespligtig': 'VARCHAR',
+    'risikovirksomhed': 'VARCHAR',
+    'stedfaestelse': 'JSON',
+    'ansvarligMyndighed': 'VARCHAR',
+    'ansvarligMyndighedKnr': 'VARCHAR',
+    **{section: 'MAP(VARCHAR, VARCHAR)[]' for section in SECTION_TABLES.values()},
+}
+
+# Row keys with a typed column of their own, left out of ``attributes``
+ROW_KEYS = ('_url', 'cvr', 'chr', 'pdf_url')
+DATE_FORMATS = ('%d-%m-%Y', '%d.%m.%Y', '%Y-%m-%d')
+
+
+def _integer(expression: str) -> str:
+    """Cast an identifier such as a CVR or CHR number to BIGINT, ignoring spaces and separators."""
+    return f"TRY_CAST(NULLIF(regexp_replace({expression}, '[^0-9]', '', 'g'), '') AS BIGINT)"
+
+
+def _text(expression: str) -> str:
+    return f"NULLIF(trim({expression}), '')"
+
+
+FACILITY_COLUMNS = [
+    "miljoeaktoerUrl AS facility_id",
+    f"{_text('navn')} AS name",
+    f"{_text('title')} AS title",
+    f"{_integer('cvr')} AS cvr_number",
+    f"{_integer('chr')} AS chr_number",
+    f"{_integer('pnr')} AS p_number",
+    f"{_text('mstNoegle')} AS mst_key",
+    f"{_text('fuldAdresse')} AS address",
+    f"{_text('vejnavn')} AS street",
+    f"{_text('husNummer')} AS house_number",
+    "TRY_CAST(postNummer AS INTEGER) AS postal_code",
+    f"{_text('bynavn')} AS city",
+    f"{_text('hovedaktivitetKode')} AS main_activity_code",
+    f"{_text('hovedaktivitetTekst')} AS main_activity",
+    f"{_text('miljoeaktoerGruppeKode')} AS facility_group_code",
+    f"{_text('miljoeaktoerGruppeTekst')} AS facility_group",
+    "TRY_CAST(godkendelsespligtig AS BOOLEAN) AS requires_approval",
+    "TRY_CAST(risikovirksomhed AS BOOLEAN) AS risk_facility",
+    _text("stedfaestelse->>'$'") + " AS location",
+    f"{_text('ansvarligMyndighed')} AS authority",
+    "TRY_CAST(ansvarligMyndighedKnr AS INTEGER) AS authority_code",
+    f"{_text('myndighedUrl')} AS authority_url",
+]
+
+
+def _section_columns() -> List[str]:
+    """Typed columns of one section row ``r`` at position ``row_number``."""
+    # The first column whose header mentions a date ('Dato') holds the row's date
+    date_text = "list_filter(map_entries(r), x -> lower(x.key) LIKE '%dato%')[1].value"
+    dates = ', '.join(f"try_strptime(trim({date_text}), '{fmt}')" for fmt in DATE_FORMATS)
+    excluded = ', '.join(f"'{key}'" for key in ROW_KEYS)
+    return [
+        "facility_id",
+        "row_number",
+        _text("r['_url']") + " AS detail_url",
+        f"CAST(COALESCE({dates}) AS DATE) AS event_date",
+        _integer("r['cvr']") + " AS cvr_number",
+        _integer("r['chr']") + " AS chr_number",
+        _text("r['pdf_url']") + " AS pdf_url",
+        # Remaining table columns; headers differ per section and over time
+        f"map_from_entries(list_filter(map_entries(r), x -> trim(x.key) <> '' AND x.key NOT IN ({excluded}))) AS attributes",
+    ]
+
+
+def _sql_string(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def build_silver_tables(input_path: str, output_dir: str) -> Dict[str, Dict[str, Any]]:
     """
-    Load JSON, sanitize nested arrays to remove empty keys, flatten nested arrays, and return as a Pandas DataFrame.
+    Write the facility dimension and the three section tables as Parquet.
+
+    Args:
+        input_path: Bronze JSON file (a list of merged listing/detail records).
+        output_dir: Local directory the ``<table>.parquet`` files are written to.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Path and row count of every written table.
     """
-    for rec in data:
-        for sec in ['Tilsyn', 'Håndhævelser', 'Afgørelser']:
-            items = rec.get(sec) or []
-            rec[sec] = [{k: v for k, v in item.items() if k and k.strip()} for item in items]
-    # Create Arrow table and register in DuckDB
-    table = pa.Table.from_pylist(data)
+    os.makedirs(output_dir, exist_ok=True)
+    columns = ', '.join(f"{_sql_string(name)}: {_sql_string(dtype)}" for name, dtype in BRONZE_COLUMNS.items())
     con = duckdb.connect()
-    con.register('dma_raw', table)
-    con.execute("""
-        CREATE TABLE dma_flattened AS
-        SELECT d.miljoeaktoerUrl AS id,
-               'Tilsyn' AS section,
-               to_json(detail) AS detail_json
-        FROM dma_raw d, UNNEST(d.Tilsyn) AS t(detail)
-        UNION ALL
-        SELECT d.miljoeaktoerUrl AS id,
-               'Haandhaevelser' AS section,
-               to_json(detail) AS detail_json
-        FROM dma_raw d, UNNEST(d.Håndhævelser) AS h(detail)
-        UNION ALL
-        SELECT d.miljoeaktoerUrl AS id,
-               'Afgørelser' AS section,
-               to_json(detail) AS detail_json
-        FROM dma_raw d, UNNEST(d.Afgørelser) AS a(detail)
-    """)
-    # Fetch as Arrow table and convert to Pandas
-    arrow_table = con.execute("SELECT id, section, detail_json FROM dma_flattened").arrow()
-    con.close()
-    return arrow_table.to_pandas()
+    try:
+        con.execute(f"""
+            CREATE TEMP TABLE dma_raw AS
+            SELECT * FROM read_json(
+                {_sql_string(input_path)},
+                format = 'array',
+                columns = {{{columns}}}
+            )
+            WHERE miljoeaktoerUrl IS NOT NULL
+        """)
+        queries = {
+            FACILITY_TABLE: f"""
+                SELECT {', '.join(FACILITY_COLUMNS)}
+                FROM dma_raw
+                QUALIFY row_number() OVER (PARTITION BY miljoeaktoerUrl) = 1
+                ORDER BY facility_id
+            """
+        }
+        for table, section in SECTION_TABLES.items():
+            queries[table] = f"""
+                WITH section_rows AS (
+                    SELECT
+                        miljoeaktoerUrl AS facility_id,
+                        unnest("{section}") AS r,
+                        generate_subscripts("{section}", 1) AS row_number
+                    FROM dma_raw
+                )
+                SELECT {', '.join(_section_columns())}
+                FROM section_rows
+                ORDER BY facility_id, event_date, row_number
+            """
+
+        tables = {}
+        for table, query in queries.items():
+            path = os.path.join(output_dir, f"{table}.parquet")
+            rows = con.execute(
+                f"COPY ({query}) TO {_sql_string(path)} (FORMAT PARQUET, COMPRESSION {PARQUET_COMPRESSION})"
+            ).fetchone()[0]
+            tables[table] = {'path': path, 'rows': rows}
+        return tables
+    finally:
+        con.close()
+
+
+def transform_dma_json(data, output_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Build the silver tables from bronze records already loaded in memory."""
+    with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8', delete=False) as f:
+        json.dump(data, f, ensure_ascii=False)
+    try:
+        return build_silver_tables(f.name, output_dir)
+    finally:
+        os.remove(f.name)
+
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print('Usage: python transformation.py <input_json>')
+    if len(sys.argv) != 3:
+        print('Usage: python transformation.py <input_json> <output_dir>')
         sys.exit(1)
-    df = transform_dma_json(sys.argv[1])
-    print(df)
\ No newline at end of file
+    for name, table in build_silver_tables(sys.argv[1], sys.argv[2]).items():
+        print(f"{name}: {table['rows']} rows -> {table['path']}")
@@ -0,0 +1,34 @@
+"""
+Tests for scraping the sub-pages of a company's table rows.
+"""
+
+import asyncio
+
+import aiohttp
+import pytest
+
+from bronze import fetch_company_detail
+from bronze.fetch_company_detail import EMPTY_SUB_PAGE, DMACompanyDetailScraper
+
+SUB_PAGE = "<html><body><a id='ctl00_MainContent_lnkPdf' href='/doc.pdf'></a></body></html>"
+
+
+def test_failed_sub_page_keeps_row(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a row whose sub-page fails is kept with empty sub-page fields."""
+    async def fetch_with_retry(session, url, limit, **kwargs):
+        if url.endswith("/fails"):
+            raise aiohttp.ClientError("404 Not Found")
+        return SUB_PAGE
+
+    monkeypatch.setattr(fetch_company_detail, "fetch_with_retry", fetch_with_retry)
+    scraper = DMACompanyDetailScraper([], parse_workers=0)
+    rows = [
+        {"Dato": "01-01-2025", "_url": "https://dma.mst.dk/tilsyn/works"},
+        {"Dato": "02-01-2025", "_url": "https://dma.mst.dk/tilsyn/fails"},
+    ]
+
+    result = asyncio.run(scraper.scrape_table(None, rows, "https://dma.mst.dk/miljoeaktoer/1"))
+
+    assert [row["Dato"] for row in result] == ["01-01-2025", "02-01-2025"]
+    assert set(EMPTY_SUB_PAGE) <= set(result[0])
+    assert {key: result[1][key] for key in EMPTY_SUB_PAGE} == EMPTY_SUB_PAGE
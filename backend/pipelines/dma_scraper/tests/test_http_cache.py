@@ -0,0 +1,129 @@
+"""
+Tests for the persistent HTTP cache used for company pages and sub-pages.
+
+Each test runs a local aiohttp server that records the requests it gets, so
+the tests can tell which fetches were revalidated, reused or downloaded.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List
+
+import aiohttp
+from aiohttp import web
+
+from bronze.fetch_company_detail import DMACompanyDetailScraper
+from common.http_cache import HttpCache
+
+SUB_PAGE = "<html><body><p>Tilsyn</p></body></html>"
+
+
+@asynccontextmanager
+async def serve(respond: Callable[[web.Request], web.Response]) -> AsyncIterator[tuple]:
+    """Serve ``respond`` locally and yield the page URL and the list of received requests."""
+    requests: List[Dict[str, str]] = []
+
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(dict(request.headers))
+        return respond(request)
+
+    app = web.Application()
+    app.router.add_get("/page", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    try:
+        yield f"http://127.0.0.1:{port}/page", requests
+    finally:
+        await runner.cleanup()
+
+
+def test_etag_revalidation(tmp_path) -> None:
+    """Test that a cached page with an ETag is revalidated and a 304 returns the cached body."""
+    cache = HttpCache(str(tmp_path))
+
+    def respond(request: web.Request) -> web.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text="first", headers={"ETag": '"v1"'})
+
+    async def run():
+        async with serve(respond) as (url, requests), aiohttp.ClientSession() as session:
+            texts = [await cache.fetch(session, url), await cache.fetch(session, url)]
+            return texts, requests
+
+    texts, requests = asyncio.run(run())
+
+    assert texts == ["first", "first"]
+    assert "If-None-Match" not in requests[0]
+    assert requests[1]["If-None-Match"] == '"v1"'
+    assert cache.stats == {"fetched": 1, "not_modified": 1, "reused": 0, "changed": 0}
+
+
+def test_last_modified_revalidation(tmp_path) -> None:
+    """Test that a changed page with Last-Modified is downloaded again and counted as changed."""
+    cache = HttpCache(str(tmp_path))
+    versions = iter(["first", "second"])
+
+    def respond(request: web.Request) -> web.Response:
+        return web.Response(text=next(versions), headers={"Last-Modified": "Mon, 06 Jan 2025 10:00:00 GMT"})
+
+    async def run():
+        async with serve(respond) as (url, requests), aiohttp.ClientSession() as session:
+            texts = [await cache.fetch(session, url), await cache.fetch(session, url)]
+            return texts, requests
+
+    texts, requests = asyncio.run(run())
+
+    assert texts == ["first", "second"]
+    assert requests[1]["If-Modified-Since"] == "Mon, 06 Jan 2025 10:00:00 GMT"
+    assert cache.stats == {"fetched": 2, "not_modified": 0, "reused": 0, "changed": 1}
+
+
+def test_ttl_expiry(tmp_path) -> None:
+    """Test that a page without validators is reused within its TTL and downloaded again after it."""
+    cache = HttpCache(str(tmp_path), ttl=60)
+
+    def respond(request: web.Request) -> web.Response:
+        return web.Response(text="page")
+
+    async def run():
+        async with serve(respond) as (url, requests), aiohttp.ClientSession() as session:
+            await cache.fetch(session, url)
+            await cache.fetch(session, url)
+            fresh_requests = len(requests)
+            cache.ttl = 0
+            await cache.fetch(session, url)
+            return fresh_requests, len(requests)
+
+    fresh_requests, expired_requests = asyncio.run(run())
+
+    assert (fresh_requests, expired_requests) == (1, 2)
+    assert cache.stats == {"fetched": 2, "not_modified": 0, "reused": 1, "changed": 0}
+
+
+def test_skip_unchanged_rows(tmp_path) -> None:
+    """Test that sub-pages of unchanged table rows are reused and changed rows are fetched."""
+    def respond(request: web.Request) -> web.Response:
+        return web.Response(text=SUB_PAGE, headers={"ETag": '"v1"'})
+
+    async def run():
+        async with serve(respond) as (url, requests), aiohttp.ClientSession() as session:
+            counts = []
+            for skip_unchanged_rows, row in [
+                (True, {"Dato": "01-01-2025"}),
+                (True, {"Dato": "01-01-2025"}),
+                (True, {"Dato": "02-01-2025"}),
+                (False, {"Dato": "02-01-2025"}),
+            ]:
+                scraper = DMACompanyDetailScraper(
+                    [], parse_workers=0, cache=HttpCache(str(tmp_path)),
+                    skip_unchanged_rows=skip_unchanged_rows,
+                )
+                await scraper.scrape_table_url(session, url, row)
+                counts.append(len(requests))
+            return counts
+
+    assert asyncio.run(run()) == [1, 1, 2, 3]
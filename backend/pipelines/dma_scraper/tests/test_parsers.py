@@ -0,0 +1,104 @@
+"""
+Tests for the DMA HTML parser backends.
+
+Every backend must return exactly the same dicts as the BeautifulSoup
+reference backend for the saved page fixtures.
+"""
+
+import pickle
+from pathlib import Path
+
+import pytest
+
+from bronze.parsers import (
+    PARSERS,
+    get_parser,
+    parse_company_page,
+    parse_sub_page,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGES = sorted(path.name for path in FIXTURES.glob("*.html"))
+FAST_BACKENDS = sorted(name for name in PARSERS if name != "bs4")
+URL = "https://dma.mst.dk/miljoeaktoer/1"
+
+
+def read_fixture(name: str) -> str:
+    """Return the HTML of a page fixture."""
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+@pytest.mark.parametrize("page", PAGES)
+def test_company_page_matches_reference(backend: str, page: str) -> None:
+    """Test that company page details and tables match the bs4 backend."""
+    html = read_fixture(page)
+    assert parse_company_page(html, URL, backend) == parse_company_page(html, URL, "bs4")
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+@pytest.mark.parametrize("page", PAGES)
+def test_sub_page_matches_reference(backend: str, page: str) -> None:
+    """Test that sub-page fields match the bs4 backend."""
+    html = read_fixture(page)
+    assert parse_sub_page(html, URL, backend) == parse_sub_page(html, URL, "bs4")
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+@pytest.mark.parametrize(
+    "html",
+    [
+        "",
+        "<p>Ingen data</p>",
+        '<table id="tilsyn-tabel"><tr><th>Link</th></tr><tr><td><a>Se</a></td></tr></table>',
+        '<a id="hent-0">Hent</a>',
+    ],
+)
+def test_broken_pages_match_reference(backend: str, html: str) -> None:
+    """Test that empty and malformed pages fail the same way in every backend."""
+    assert parse_company_page(html, URL, backend) == parse_company_page(html, URL, "bs4")
+    assert parse_sub_page(html, URL, backend) == parse_sub_page(html, URL, "bs4")
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+def test_company_page(backend: str) -> None:
+    """Test the parsed details and tables of a company page."""
+    details, tables = parse_company_page(read_fixture("company_page.html"), URL, backend)
+
+    assert details == {
+        "title": "Svinefarm ApS",
+        "CVR-nummer": "12345678",
+        "P-nummer": "1000",
+        "CHR-nummer": "54321",
+    }
+    assert list(tables) == ["Tilsyn", "Håndhævelser", "Afgørelser"]
+    assert tables["Tilsyn"] == [
+        {"Dato": "01-02-2023", "Type": "Basis", "": "Se", "_url": "https://dma.mst.dk/tilsyn/1"},
+        {"Dato": "05-06-2022", "Type": "Prioriteret", "": "Se", "_url": "https://dma.mst.dk/tilsyn/2"},
+    ]
+    assert tables["Håndhævelser"] == []
+    assert tables["Afgørelser"][0]["Afgørelse"] == "Miljøgodkendelse"
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+def test_sub_page(backend: str) -> None:
+    """Test the PDF link, CVR and CHR number of a sub-page."""
+    result = parse_sub_page(read_fixture("sub_page.html"), URL, backend)
+
+    assert result == {
+        "pdf_url": "https://dma.mst.dk/pdf/abc.pdf",
+        "cvr": "12345678",
+        "chr": "54321",
+    }
+
+
+def test_results_can_cross_process_boundary() -> None:
+    """Test that parse results can be returned from a worker process."""
+    result = parse_company_page(read_fixture("company_page_edge_cases.html"), URL)
+    assert pickle.loads(pickle.dumps(result)) == result
+
+
+def test_unknown_backend() -> None:
+    """Test that an unknown backend name is rejected."""
+    with pytest.raises(ValueError, match="Unknown parser backend"):
+        get_parser("html5lib")
@@ -0,0 +1,115 @@
+"""
+Tests for the typed DMA silver tables.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List
+
+import duckdb
+import pytest
+
+from silver.transformation import FACILITY_TABLE, SECTION_TABLES, transform_dma_json
+
+
+@pytest.fixture
+def records() -> List[Dict[str, Any]]:
+    """Return merged bronze records as written by the bronze stage."""
+    return [
+        {
+            "miljoeaktoerUrl": "https://dma.mst.dk/miljoeaktoer/1",
+            "myndighedUrl": "https://dma.mst.dk/myndighed/607",
+            "navn": "Svinefarm ApS",
+            "cvr": 12345678,
+            "chr": "54321",
+            "pnr": "1000",
+            "postNummer": 7000,
+            "godkendelsespligtig": True,
+            "risikovirksomhed": False,
+            "stedfaestelse": "POINT(540000 6150000)",
+            "ansvarligMyndighed": "Fredericia Kommune",
+            "ansvarligMyndighedKnr": 607,
+            "title": "Svinefarm ApS",
+            "CVR-nummer": "12345678",
+            "Tilsyn": [
+                {
+                    "Dato": "01-02-2023",
+                    "Type": "Basis",
+                    "": "Se",
+                    "_url": "https://dma.mst.dk/tilsyn/1",
+                    "pdf_url": "https://dma.mst.dk/pdf/1.pdf",
+                    "cvr": " 12345678 ",
+                    "chr": "54321",
+                },
+                {
+                    "Dato": "5.6.2022",
+                    "Type": "Prioriteret",
+                    "_url": "https://dma.mst.dk/tilsyn/2",
+                    "pdf_url": None,
+                    "cvr": None,
+                    "chr": "",
+                },
+            ],
+            "Håndhævelser": [],
+            "Afgørelser": [
+                {"Afgørelsesdato": "2021-03-03", "Afgørelse": "Miljøgodkendelse", "_url": "https://dma.mst.dk/afg/9"}
+            ],
+        },
+        {"miljoeaktoerUrl": "https://dma.mst.dk/miljoeaktoer/2", "navn": "Kvægbrug I/S"},
+    ]
+
+
+def read_table(path: str) -> List[Dict[str, Any]]:
+    """Return the rows of a Parquet file as dicts."""
+    con = duckdb.connect()
+    try:
+        result = con.execute(f"SELECT * FROM '{path}'")
+        columns = [column[0] for column in result.description]
+        return [dict(zip(columns, row)) for row in result.fetchall()]
+    finally:
+        con.close()
+
+
+def test_writes_all_tables(records: List[Dict[str, Any]], tmp_path: Path) -> None:
+    """Test that the facility dimension and every section table are written with row counts."""
+    tables = transform_dma_json(records, str(tmp_path))
+
+    assert set(tables) == {FACILITY_TABLE, *SECTION_TABLES}
+    assert {name: table["rows"] for name, table in tables.items()} == {
+        "facilities": 2,
+        "inspections": 2,
+        "enforcements": 0,
+        "decisions": 1,
+    }
+    assert all(Path(table["path"]).exists() for table in tables.values())
+
+
+def test_facilities_are_typed(records: List[Dict[str, Any]], tmp_path: Path) -> None:
+    """Test that facility identifiers, flags and codes are cast to typed columns."""
+    tables = transform_dma_json(records, str(tmp_path))
+    facility, other = read_table(tables["facilities"]["path"])
+
+    assert facility["cvr_number"] == 12345678
+    assert facility["chr_number"] == 54321
+    assert facility["postal_code"] == 7000
+    assert facility["requires_approval"] is True
+    assert facility["authority_code"] == 607
+    assert facility["location"] == "POINT(540000 6150000)"
+    assert other["cvr_number"] is None
+
+
+def test_section_rows_are_typed(records: List[Dict[str, Any]], tmp_path: Path) -> None:
+    """Test parsed dates, integer identifiers, PDF URLs and leftover attributes of section rows."""
+    tables = transform_dma_json(records, str(tmp_path))
+    older, newer = read_table(tables["inspections"]["path"])
+
+    assert str(older["event_date"]) == "2022-06-05"
+    assert older["cvr_number"] is None and older["chr_number"] is None and older["pdf_url"] is None
+    assert str(newer["event_date"]) == "2023-02-01"
+    assert newer["row_number"] == 1
+    assert newer["cvr_number"] == 12345678
+    assert newer["pdf_url"] == "https://dma.mst.dk/pdf/1.pdf"
+    assert newer["detail_url"] == "https://dma.mst.dk/tilsyn/1"
+    assert newer["attributes"] == {"Dato": "01-02-2023", "Type": "Basis"}
+
+    (decision,) = read_table(tables["decisions"]["path"])
+    assert str(decision["event_date"]) == "2021-03-03"
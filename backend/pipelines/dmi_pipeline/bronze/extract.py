@@ -4,18 +4,31 @@ Handles API communication and data retrieval from the Danish Meteorological Inst
 Saves raw data without any transformations.
 """
 
+import asyncio
 import logging
 import os
 import json
-from datetime import datetime
-from typing import Dict, Any
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, Any, List, Optional
 import aiohttp
+import orjson
 from fastapi import HTTPException
 from pathlib import Path
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+GRID_ENDPOINT = "collections/10kmGridValue/items"
+PAGE_LIMIT = 10000  # Features per page
+DEFAULT_SHARD_DAYS = 7  # Length of the time windows fetched concurrently
+DEFAULT_MAX_CONCURRENT_FETCHES = 5
+REQUEST_TIMEOUT = 300  # seconds, large pages take a while
+KEEPALIVE_TIMEOUT = 60
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 300  # Upper bound for a server-requested wait, in seconds
+
 class DMIConfig:
     """Configuration for DMI API access"""
     def __init__(self):
@@ -27,37 +40,162 @@ class DMIConfig:
         self.max_retries = int(os.getenv('MAX_RETRIES', 3))
         self.retry_delay = int(os.getenv('RETRY_DELAY', 5))
 
+def format_time(value: datetime) -> str:
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def time_windows(start_time: datetime, end_time: datetime, shard_days: int) -> List[tuple[datetime, datetime]]:
+    """Split a time range into consecutive windows of at most ``shard_days`` days"""
+    windows = []
+    current = start_time
+    while current <= end_time:
+        window_end = min(current + timedelta(days=shard_days) - timedelta(seconds=1), end_time)
+        windows.append((current, window_end))
+        current = window_end + timedelta(seconds=1)
+    return windows
+
+def next_link(data: Dict) -> Optional[str]:
+    """The OGC API ``next`` link of a page, if any"""
+    for link in data.get("links") or []:
+        if link.get("rel") == "next" and link.get("href"):
+            return link["href"]
+    return None
+
+def retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header, in either of its formats"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+def feature_key(feature: Dict) -> tuple:
+    """Identity of a grid value: its cell and time"""
+    properties = feature.get("properties") or {}
+    cell = properties.get("cellId")
+    if cell is None:
+        cell = json.dumps(feature.get("geometry"), sort_keys=True)
+    return cell, properties.get("from")
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO 8601 time from a feature, or None if it is missing or invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def straddled_boundaries(feature: Dict, boundaries: List[datetime]) -> Optional[List[int]]:
+    """
+    Indexes of the window boundaries a feature's period covers.
+
+    Only such features can be returned by more than one window. Returns None
+    when the period cannot be read, so the caller can dedupe it regardless.
+    """
+    properties = feature.get("properties") or {}
+    period_start = parse_time(properties.get("from"))
+    period_end = parse_time(properties.get("to")) or period_start
+    if period_start is None or period_start.tzinfo is None or period_end.tzinfo is None:
+        return None
+    return [i for i, boundary in enumerate(boundaries) if period_start <= boundary <= period_end]
+
 class DMIApiClient:
-    """Client for interacting with DMI's climate data API"""
-    def __init__(self, config: DMIConfig):
+    """
+    Client for interacting with DMI's climate data API
+
+    One pooled, keep-alive session is shared by all requests of a run, and
+    ``max_concurrent_fetches`` bounds the requests in flight across all
+    parameters and shards. Use the client as an async context manager, or
+    call ``close`` when done.
+    """
+    def __init__(self, config: DMIConfig, max_concurrent_fetches: int = DEFAULT_MAX_CONCURRENT_FETCHES,
+                 shard_days: int = DEFAULT_SHARD_DAYS, page_limit: int = PAGE_LIMIT):
         self.config = config
         self.headers = {
             "Accept": "application/geo+json",
             "X-Gravitee-Api-Key": self.config.api_key
         }
+        self.shard_days = shard_days
+        self.page_limit = page_limit
+        self.max_concurrent_fetches = max_concurrent_fetches
+        # Shared by all shards and parameters, so the API sees at most this many requests at once
+        self.fetch_limit = asyncio.Semaphore(max_concurrent_fetches)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrent_fetches, keepalive_timeout=KEEPALIVE_TIMEOUT)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the pooled session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "DMIApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
 
-    async def _make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Dict:
-        """Make an authenticated request to the DMI API with error handling"""
+    async def _make_request(self, endpoint: str, params: Dict[str, Any] = None, url: str = None) -> Dict:
+        """
+        Make an authenticated request to the DMI API with error handling
+
+        Rate limits (429) and server errors are retried up to ``max_retries``
+        times, waiting as long as Retry-After asks or backing off
+        exponentially from ``retry_delay``. The request slot is released
+        while waiting.
+        """
         if params is None:
             params = {}
 
-        url = f"{self.config.base_url}/{endpoint}"
-        async with aiohttp.ClientSession() as session:
+        if url is None:
+            url = f"{self.config.base_url}/{endpoint}"
+        session = self._get_session()
+        for attempt in range(self.config.max_retries + 1):
+            delay = None
             try:
-                async with session.get(url, headers=self.headers, params=params) as response:
-                    if response.status == 429:
-                        logger.warning("Rate limit exceeded")
-                        raise HTTPException(status_code=429, detail="Rate limit exceeded")
-
-                    text = await response.text()
-                    if not text:
-                        raise HTTPException(status_code=500, detail="Empty response from DMI API")
-
-                    return await response.json()
+                async with self.fetch_limit:
+                    async with session.get(url, params=params) as response:
+                        if response.status in RETRY_STATUS_CODES and attempt < self.config.max_retries:
+                            delay = retry_after(response)
+                            logger.warning(f"DMI API returned {response.status}, retrying")
+                        elif response.status == 429:
+                            logger.warning("Rate limit exceeded")
+                            raise HTTPException(status_code=429, detail="Rate limit exceeded")
+                        else:
+                            response.raise_for_status()
+                            # Read the body once and decode it directly
+                            body = await response.read()
+                            if not body:
+                                raise HTTPException(status_code=500, detail="Empty response from DMI API")
+                            return orjson.loads(body)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.config.max_retries:
+                    logger.error(f"Error making request to DMI API: {str(e)}")
+                    raise
+                logger.warning(f"Error making request to DMI API, retrying: {str(e)}")
             except Exception as e:
                 logger.error(f"Error making request to DMI API: {str(e)}")
                 raise
 
+            if delay is None:
+                delay = self.config.retry_delay * 2 ** attempt * (0.5 + random.random())
+            await asyncio.sleep(delay)
+
     def save_raw_data(self, data: Dict, output_dir: Path, filename: str) -> bool:
         """Save raw JSON data to the bronze layer"""
         try:
@@ -75,28 +213,124 @@ class DMIApiClient:
             logger.error(f"Error saving raw data to {output_dir}: {str(e)}")
             return False
 
-    async def fetch_grid_data(self, parameter_id: str, start_time: datetime, end_time: datetime, output_dir: Path = None) -> Dict:
-        """Fetch raw climate grid data and return as JSON"""
-        params = {
-            "parameterId": parameter_id,
-            "limit": 1000,
-            "datetime": f"{start_time.strftime('%Y-%m-%dT%H:%M:%SZ')}/{end_time.strftime('%Y-%m-%dT%H:%M:%SZ')}"
-        }
+    async def iter_pages(self, endpoint: str, params: Dict[str, Any]) -> AsyncIterator[Dict]:
+        """
+        Yield every page of an OGC API Features query.
+
+        Follows ``links[rel=next]`` when the server sends it, and otherwise
+        pages with ``offset`` until a page comes back short.
+        """
+        limit = params.get("limit", self.page_limit)
+        offset = 0
+        url = None
+        seen_urls = set()
+        while True:
+            if url is None:
+                data = await self._make_request(endpoint, {**params, "limit": limit, "offset": offset})
+            else:
+                data = await self._make_request(endpoint, url=url)
+            features = data.get("features") or []
+            yield data
+
+            next_url = next_link(data)
+            if next_url:
+                if next_url in seen_urls:
+                    logger.warning(f"Stopping at repeated next link {next_url}")
+                    return
+                seen_urls.add(next_url)
+                url = next_url
+            elif len(features) >= limit:
+                offset += len(features)
+            else:
+                return
+
+    async def iter_grid_features(self, parameter_id: str, start_time: datetime,
+                                 end_time: datetime) -> AsyncIterator[List[Dict]]:
+        """
+        Yield pages of grid features for a parameter, deduplicated on cell and time.
 
+        The time range is split into ``shard_days`` windows that are paged
+        concurrently under the shared fetch limit; pages are yielded as they
+        arrive, so the caller never holds more than a page at a time.
+
+        Only a value whose period covers the boundary between two windows can
+        be returned twice, so only those are remembered, per boundary, and a
+        boundary's keys are dropped once both windows next to it are done.
+        """
+        windows = time_windows(start_time, end_time, self.shard_days)
+        boundaries = [window_start for window_start, _ in windows[1:]]
+        queue: asyncio.Queue = asyncio.Queue(maxsize=len(windows) * 2)
+
+        async def fetch_window(index: int, window_start: datetime, window_end: datetime) -> None:
+            params = {
+                "parameterId": parameter_id,
+                "limit": self.page_limit,
+                "datetime": f"{format_time(window_start)}/{format_time(window_end)}"
+            }
+            try:
+                async for page in self.iter_pages(GRID_ENDPOINT, params):
+                    await queue.put(page.get("features") or [])
+                await queue.put(index)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(fetch_window(i, *window)) for i, window in enumerate(windows)]
+        # Boundary i lies between windows i and i + 1; None holds features without a readable period
+        seen: Dict[Optional[int], set] = {}
+        finished = set()
         try:
-            data = await self._make_request("collections/10kmGridValue/items", params)
-            if not data or "features" not in data or not data["features"]:
-                logger.warning(f"No data returned for parameter {parameter_id}")
-                return {"features": []}
+            while len(finished) < len(tasks):
+                item = await queue.get()
+                if isinstance(item, int):
+                    finished.add(item)
+                    for boundary in (item - 1, item):
+                        if {boundary, boundary + 1} <= finished:
+                            seen.pop(boundary, None)
+                    continue
+                if isinstance(item, BaseException):
+                    raise item
+                page = []
+                for feature in item:
+                    straddled = straddled_boundaries(feature, boundaries)
+                    if straddled == []:
+                        page.append(feature)
+                        continue
+                    key = feature_key(feature)
+                    key_sets = [seen.setdefault(boundary, set()) for boundary in straddled or [None]]
+                    if not any(key in keys for keys in key_sets):
+                        for keys in key_sets:
+                            keys.add(key)
+                        page.append(feature)
+                if page:
+                    yield page
+        finally:
+            for task in tasks:
+                task.cancel()
 
-            logger.info(f"Successfully fetched {len(data['features'])} records for {parameter_id}")
+    async def fetch_grid_data(self, parameter_id: str, start_time: datetime, end_time: datetime,
+                              output_dir: Path) -> Optional[Path]:
+        """
+        Fetch all climate grid values for a parameter and stream them to the bronze layer.
 
-            # Save raw data if output directory is provided
-            if output_dir:
-                self.save_raw_data(data, output_dir, f"{parameter_id}_raw")
+        Features are written as newline-delimited GeoJSON to
+        ``<output_dir>/<parameter_id>_raw.jsonl`` page by page.
 
-            return data
+        Returns:
+            The bronze file, or None if the API returned no data.
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = output_dir / f"{parameter_id}_raw.jsonl"
+        count = 0
+        with open(output_path, 'wb') as f:
+            async for page in self.iter_grid_features(parameter_id, start_time, end_time):
+                f.write(b"".join(orjson.dumps(feature) + b"\n" for feature in page))
+                count += len(page)
+                logger.debug(f"Fetched {count} records for {parameter_id}")
 
-        except Exception as e:
-            logger.error(f"Error fetching grid data for {parameter_id}: {str(e)}")
-            return {"features": []}
\ No newline at end of file
+        if not count:
+            logger.warning(f"No data returned for parameter {parameter_id}")
+            output_path.unlink()
+            return None
+
+        logger.info(f"Successfully saved {count} records for {parameter_id} to {output_path}")
+        return output_path
@@ -8,12 +8,15 @@ import argparse
 import logging
 from datetime import datetime, timedelta, UTC, date
 from pathlib import Path
+from typing import Optional
 import asyncio
+import calendar
+import duckdb
 import os
 import sys
 from tqdm.contrib.logging import logging_redirect_tqdm
 
-from bronze.extract import DMIConfig, DMIApiClient
+from bronze.extract import DMIConfig, DMIApiClient, DEFAULT_MAX_CONCURRENT_FETCHES, DEFAULT_SHARD_DAYS
 from silver.transform import DataTransformer
 from silver.load import DataLoader
 
@@ -22,7 +25,20 @@ logger = logging.getLogger(__name__)
 
 # Constants for resource management
 DEFAULT_DAYS = 30
-DEFAULT_MAX_CONCURRENT_FETCHES = 5
+DEFAULT_MAX_CONCURRENT_PARTITIONS = 4
+
+# Partitioned layout used by backfill runs: <root>/parameter=<id>/year=<yyyy>/month=<mm>/
+BACKFILL_BRONZE_DIR = Path("data/bronze/dmi")
+BACKFILL_SILVER_DIR = Path("data/silver/dmi")
+PARTITION_FILE = "data.parquet"
+# Marks a finished month for which the API returned no data
+EMPTY_MARKER = "_EMPTY"
+
+# DMI parameter IDs processed by default, with display names
+PARAMETERS = {
+    "pot_evaporation_makkink": "Potential Evaporation",
+    "acc_precip": "Precipitation"
+}
 
 def setup_logging(log_level: str):
     """Configure logging with the specified level."""
@@ -66,6 +82,9 @@ def parse_args():
     start_date_def, end_date_def = get_default_dates()
 
     parser = argparse.ArgumentParser(description="Run the DMI Climate Data Pipeline.")
+    parser.add_argument('command', nargs='?', choices=['run', 'backfill'], default='run',
+                      help='run: one timestamped run over the date range; '
+                           'backfill: fill missing monthly partitions over the date range')
     parser.add_argument('--start-date', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
                       default=start_date_def, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--end-date', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
@@ -81,6 +100,17 @@ def parse_args():
     parser.add_argument('--max-concurrent-fetches', type=int,
                       default=DEFAULT_MAX_CONCURRENT_FETCHES,
                       help='Maximum number of concurrent API calls')
+    parser.add_argument('--parameters', nargs='+', default=list(PARAMETERS),
+                      help='DMI parameter IDs to process concurrently')
+    parser.add_argument('--shard-days', type=int, default=DEFAULT_SHARD_DAYS,
+                      help='Days per time window fetched concurrently')
+    parser.add_argument('--max-concurrent-partitions', type=int,
+                      default=DEFAULT_MAX_CONCURRENT_PARTITIONS,
+                      help='Backfill: maximum number of monthly partitions processed at once')
+    parser.add_argument('--bronze-dir', type=Path, default=BACKFILL_BRONZE_DIR,
+                      help='Backfill: root of the partitioned bronze layout')
+    parser.add_argument('--silver-dir', type=Path, default=BACKFILL_SILVER_DIR,
+                      help='Root of the grid-cell dimension, and for backfill of the partitioned silver layout')
 
     args = parser.parse_args()
 
@@ -96,18 +126,28 @@ async def process_parameter(extractor: DMIApiClient, transformer: DataTransforme
     """Process a single parameter and return the count of processed records"""
     logger.info(f"Fetching {parameter_id} data from {start_time} to {end_time}")
 
-    # Fetch and save raw data in bronze layer
-    data = await extractor.fetch_grid_data(parameter_id, start_time, end_time, bronze_dir / "raw")
+    # Fetch raw data and stream it to the bronze layer
+    raw_path = await extractor.fetch_grid_data(parameter_id, start_time, end_time, bronze_dir / "raw")
 
-    if data and data["features"]:
+    if raw_path:
+        # Transform and save in a worker thread so other parameters keep fetching
+        return await asyncio.to_thread(transform_and_load, transformer, loader, parameter_id, raw_path, silver_dir)
+    else:
+        logger.warning(f"No data returned from DMI API for {parameter_id}")
+        return 0
+
+def transform_and_load(transformer: DataTransformer, loader: DataLoader, parameter_id: str,
+                       raw_path: Path, silver_dir: Path) -> int:
+    """Transform a parameter's bronze file and save it in the silver layer, returning the record count"""
+    # Transformer and loader share one connection; each worker thread uses its own cursor
+    with transformer.con.cursor() as con:
         # Transform raw grid data into structured format using DuckDB
-        processed_result = transformer.transform_data(data)
+        processed_result = transformer.transform_from_file(raw_path, con)
 
         if processed_result:
-            # Save processed data in silver layer
-            if loader.save_data(processed_result, silver_dir / "processed", f"{parameter_id}_processed"):
-                # Get count of processed records
-                count = processed_result.execute("SELECT COUNT(*) as count").fetchone()[0]
+            # Save processed data in silver layer; the write reports the record count
+            count = loader.save_data(processed_result, silver_dir / "processed", f"{parameter_id}_processed", con)
+            if count is not None:
                 logger.info(f"Successfully processed {count} records for {parameter_id}")
                 return count
             else:
@@ -116,9 +156,121 @@ async def process_parameter(extractor: DMIApiClient, transformer: DataTransforme
         else:
             logger.error(f"Failed to transform data for {parameter_id}")
             return 0
-    else:
-        logger.warning(f"No data returned from DMI API for {parameter_id}")
+
+def month_partitions(start_date: date, end_date: date) -> list[tuple[date, date]]:
+    """Split a date range into calendar months, as (first day, last day) pairs clipped to ``end_date``"""
+    partitions = []
+    month_start = start_date.replace(day=1)
+    while month_start <= end_date:
+        last_day = calendar.monthrange(month_start.year, month_start.month)[1]
+        month_end = month_start.replace(day=last_day)
+        partitions.append((month_start, min(month_end, end_date)))
+        month_start = month_end + timedelta(days=1)
+    return partitions
+
+def partition_dir(root: Path, parameter_id: str, month_start: date) -> Path:
+    """Directory of a parameter's monthly partition"""
+    return root / f"parameter={parameter_id}" / f"year={month_start.year}" / f"month={month_start.month:02d}"
+
+def is_complete_month(month_start: date, month_end: date, today: Optional[date] = None) -> bool:
+    """Whether a partition covers its whole calendar month and that month is over"""
+    today = today or datetime.now(UTC).date()
+    last_day = calendar.monthrange(month_start.year, month_start.month)[1]
+    return month_end.day == last_day and month_end < today
+
+def grid_cells_path(root: Path) -> Path:
+    """Grid-cell dimension of a silver root, kept with its facts so they ship together"""
+    return root / "dimensions" / "grid_cells.parquet"
+
+def staging_dir(root: Path) -> Path:
+    """Directory next to a partition root for files being written, so they never show up in the partition tree"""
+    return root.with_name(f"{root.name}_staging")
+
+async def backfill_partition(extractor: DMIApiClient, transformer: DataTransformer, loader: DataLoader,
+                             parameter_id: str, month_start: date, month_end: date,
+                             bronze_root: Path, silver_root: Path) -> int:
+    """
+    Fetch, transform and save one monthly partition, returning the count of processed records
+
+    A finished month without any data gets an empty marker instead of a
+    partition file, so it is not fetched again.
+    """
+    start_time = datetime.combine(month_start, datetime.min.time(), tzinfo=UTC)
+    end_time = datetime.combine(month_end, datetime.max.time(), tzinfo=UTC)
+    raw_path = await extractor.fetch_grid_data(parameter_id, start_time, end_time,
+                                               partition_dir(bronze_root, parameter_id, month_start))
+    output_dir = partition_dir(silver_root, parameter_id, month_start)
+    if not raw_path:
+        logger.warning(f"No data returned from DMI API for {parameter_id} {month_start:%Y-%m}")
+        if is_complete_month(month_start, month_end):
+            output_dir.mkdir(parents=True, exist_ok=True)
+            (output_dir / EMPTY_MARKER).touch()
         return 0
+    tmp_name = f"{parameter_id}_{month_start:%Y_%m}"
+    return await asyncio.to_thread(save_partition, transformer, loader, raw_path,
+                                   output_dir, staging_dir(silver_root), tmp_name)
+
+def save_partition(transformer: DataTransformer, loader: DataLoader, raw_path: Path, output_dir: Path,
+                   tmp_dir: Path, tmp_name: str) -> int:
+    """Transform a partition's bronze file into ``output_dir``, returning the record count"""
+    # Write to ``tmp_dir`` and rename, so an interrupted run never leaves a partition that looks done
+    tmp_path = tmp_dir / f"{tmp_name}.parquet"
+    try:
+        with transformer.con.cursor() as con:
+            processed_result = transformer.transform_from_file(raw_path, con)
+            if not processed_result:
+                logger.error(f"Failed to transform data in {raw_path}")
+                return 0
+            count = loader.save_data(processed_result, tmp_dir, tmp_name, con)
+        if count is None:
+            logger.error(f"Failed to save processed data to {output_dir}")
+            return 0
+        output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path.replace(output_dir / PARTITION_FILE)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    logger.info(f"Successfully processed {count} records into {output_dir}")
+    return count
+
+async def run_backfill(args, extractor: DMIApiClient, transformer: DataTransformer, loader: DataLoader) -> int:
+    """
+    Fill the monthly partitions of the date range that are missing from the silver layout
+
+    Partitions that already exist are skipped, so an interrupted backfill
+    resumes where it stopped. Months cut short by ``--end-date`` are not
+    considered done and are fetched again on the next run, and neither is
+    the current month. Up to
+    ``--max-concurrent-partitions`` partitions run at once; the client's
+    fetch limit still bounds the API requests across all of them.
+    """
+    pending = []
+    skipped = 0
+    for parameter_id in args.parameters:
+        for month_start, month_end in month_partitions(args.start_date, args.end_date):
+            output_dir = partition_dir(args.silver_dir, parameter_id, month_start)
+            done = (output_dir / PARTITION_FILE).exists() or (output_dir / EMPTY_MARKER).exists()
+            if done and is_complete_month(month_start, month_end):
+                skipped += 1
+            else:
+                pending.append((parameter_id, month_start, month_end))
+    logger.warning(f"Backfilling {len(pending)} partitions, skipping {skipped} already present")
+
+    partition_limit = asyncio.Semaphore(args.max_concurrent_partitions)
+
+    async def run_partition(parameter_id: str, month_start: date, month_end: date) -> int:
+        async with partition_limit:
+            try:
+                return await backfill_partition(
+                    extractor, transformer, loader,
+                    parameter_id, month_start, month_end,
+                    args.bronze_dir, args.silver_dir
+                )
+            except Exception as e:
+                logger.error(f"Failed to backfill {parameter_id} {month_start:%Y-%m}: {e}")
+                return 0
+
+    counts = await asyncio.gather(*(run_partition(*partition) for partition in pending))
+    return sum(counts)
 
 async def main():
     """Main pipeline execution."""
@@ -133,14 +285,27 @@ async def main():
     try:
         # Initialize ETL pipeline components
         config = DMIConfig()
-        extractor = DMIApiClient(config)
-        transformer = DataTransformer()
-        loader = DataLoader()
+        extractor = DMIApiClient(config, max_concurrent_fetches=args.max_concurrent_fetches,
+                                 shard_days=args.shard_days)
+        con = duckdb.connect(':memory:')
+        # Timestamped runs keep the dimension under --silver-dir too, so it is cached across runs
+        transformer = DataTransformer(grid_cells_path(args.silver_dir), con=con)
+        loader = DataLoader(con)
 
         # Convert dates to datetime with UTC timezone
         start_time = datetime.combine(args.start_date, datetime.min.time(), tzinfo=UTC)
         end_time = datetime.combine(args.end_date, datetime.max.time(), tzinfo=UTC)
 
+        if args.command == 'backfill':
+            with logging_redirect_tqdm():
+                async with extractor:
+                    total_records = await run_backfill(args, extractor, transformer, loader)
+            logger.warning(f"Backfill completed")
+            if args.progress:
+                logger.warning(f"Total records processed: {total_records}")
+                logger.warning(f"Data exported to: {args.bronze_dir} and {args.silver_dir}")
+            return
+
         # Create timestamped output directories for data storage
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         bronze_dir = Path(f"data/bronze/{timestamp}")
@@ -148,25 +313,22 @@ async def main():
         bronze_dir.mkdir(parents=True, exist_ok=True)
         silver_dir.mkdir(parents=True, exist_ok=True)
 
-        # Process both parameters
-        parameters = {
-            "pot_evaporation_makkink": "Potential Evaporation",
-            "acc_precip": "Precipitation"
-        }
+        async def run_parameter(param_id: str) -> int:
+            try:
+                return await process_parameter(
+                    extractor, transformer, loader,
+                    param_id, start_time, end_time,
+                    bronze_dir, silver_dir
+                )
+            except Exception as e:
+                logger.error(f"Failed to process {PARAMETERS.get(param_id, param_id)}: {e}")
+                return 0
 
-        total_records = 0
+        # Process all parameters concurrently; the client's fetch limit is shared
         with logging_redirect_tqdm():
-            for param_id, param_name in parameters.items():
-                try:
-                    count = await process_parameter(
-                        extractor, transformer, loader,
-                        param_id, start_time, end_time,
-                        bronze_dir, silver_dir
-                    )
-                    total_records += count
-                except Exception as e:
-                    logger.error(f"Failed to process {param_name}: {e}")
-                    continue
+            async with extractor:
+                counts = await asyncio.gather(*(run_parameter(param_id) for param_id in args.parameters))
+        total_records = sum(counts)
 
         logger.warning(f"Pipeline completed successfully")
         if args.progress:
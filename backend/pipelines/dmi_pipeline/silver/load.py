@@ -8,44 +8,52 @@ import logging
 import duckdb
 from pathlib import Path
 from typing import Optional, Dict, Any
-import pandas as pd
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 class DataLoader:
-    """Manages storage of processed climate data in Parquet format"""
-    def __init__(self):
-        pass
-
-    def save_data(self, result: Optional[duckdb.DuckDBPyRelation], output_dir: Path, filename: str) -> bool:
-        """Persists processed data to disk in Parquet format"""
+    """
+    Manages storage of processed climate data in Parquet format
+
+    Share ``con`` with the ``DataTransformer`` so relations are written
+    straight from the connection they were built on.
+    """
+    def __init__(self, con: Optional[duckdb.DuckDBPyConnection] = None):
+        self.con = con if con is not None else duckdb.connect(':memory:')
+
+    def save_data(self, result: Optional[duckdb.DuckDBPyRelation], output_dir: Path, filename: str,
+                  con: Optional[duckdb.DuckDBPyConnection] = None) -> Optional[int]:
+        """
+        Persists processed data to disk in Parquet format
+
+        The relation's query is copied to ``<output_dir>/<filename>.parquet``
+        on ``con`` (defaults to the loader's), which must be the connection
+        or cursor ``result`` was built on.
+
+        Returns:
+            The number of rows written, or None if nothing was saved.
+        """
         if result is None:
             logger.warning("Empty result, skipping save")
-            return False
+            return None
 
         try:
             # Create output directory if it doesn't exist
             output_dir.mkdir(parents=True, exist_ok=True)
 
-            # Convert result to DataFrame
-            df = result.df()
-
-            # Create a temporary view for the result
-            con = duckdb.connect(':memory:')
-            con.execute("INSTALL spatial;")
-            con.execute("LOAD spatial;")
-            con.register("result_view", df)
-
-            # Save as parquet using DuckDB's native parquet export
+            if con is None:
+                con = self.con
             output_path = output_dir / f"{filename}.parquet"
-            con.execute(f"COPY result_view TO '{output_path}' (FORMAT PARQUET)")
-            logger.info(f"Successfully saved data to {output_path}")
-            return True
+            rows = con.execute(
+                f"COPY ({result.sql_query()}) TO '{output_path}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+            ).fetchone()[0]
+            logger.info(f"Successfully saved {rows} rows to {output_path}")
+            return rows
 
         except Exception as e:
             logger.error(f"Error saving data to {output_dir}: {str(e)}")
-            return False
+            return None
 
     def load_data(self, input_path: Path) -> Optional[duckdb.DuckDBPyRelation]:
         """Load data from a Parquet file"""
@@ -54,13 +62,8 @@ class DataLoader:
                 logger.warning(f"Input file does not exist: {input_path}")
                 return None
 
-            # Create DuckDB connection and enable spatial extension
-            con = duckdb.connect(':memory:')
-            con.execute("INSTALL spatial;")
-            con.execute("LOAD spatial;")
-
             # Load data from parquet file
-            result = con.execute(f"SELECT * FROM read_parquet('{input_path}')")
+            result = self.con.execute(f"SELECT * FROM read_parquet('{input_path}')")
             logger.info(f"Successfully loaded data from {input_path}")
             return result
 
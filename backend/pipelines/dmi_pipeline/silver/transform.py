@@ -1,118 +1,159 @@
 """
 DMI Climate Data Transformation Layer
-Processes raw geospatial climate data into aggregated statistics using DuckDB.
-Handles CRS transformation and calculates key metrics like averages, min/max values, and counts per time period.
+Turns raw geospatial climate data into a compact fact table using DuckDB.
+Grid cell geometries are kept in a separate dimension, reprojected once per cell and cached across runs.
 """
 
 import logging
+import tempfile
+import threading
 import duckdb
 import json
 from typing import Dict, Optional
 from pathlib import Path
-import pandas as pd
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+DEFAULT_GRID_CELLS_PATH = Path("data/silver/dmi/dimensions/grid_cells.parquet")
+PARQUET_COMPRESSION = "zstd"
+
 class DataTransformer:
-    """Transforms raw climate data into processed statistics"""
-    def __init__(self):
+    """
+    Transforms raw climate data into a grid-cell dimension and a value fact table
+
+    The fact table holds ``(cell_id, parameter, valid_time, value)`` rows.
+    ``cell_id`` is DMI's ``cellId``, or a hash of the cell geometry when a
+    feature has none. Geometries live in the grid-cell dimension at
+    ``grid_cells_path``; only cells not seen in an earlier run are
+    reprojected and appended to it.
+
+    Relations are built on ``con``, which the ``DataLoader`` writing them
+    can share. Concurrent transforms should each pass a cursor of it.
+    """
+    def __init__(self, grid_cells_path: Path = DEFAULT_GRID_CELLS_PATH,
+                 con: Optional[duckdb.DuckDBPyConnection] = None):
         self.TARGET_CRS = "EPSG:4326"  # Required target CRS
         self.SOURCE_CRS = "EPSG:25832"  # DMI's native CRS
+        self.grid_cells_path = Path(grid_cells_path)
+        # Parameters may be transformed concurrently, but share one dimension file
+        self._grid_cells_lock = threading.Lock()
+        self.con = con if con is not None else duckdb.connect(':memory:')
 
-    def load_raw_data(self, input_path: Path) -> Optional[Dict]:
-        """Load raw JSON data from the bronze layer"""
-        try:
-            with open(input_path, 'r') as f:
-                data = json.load(f)
-            logger.info(f"Successfully loaded raw data from {input_path}")
-            return data
-        except Exception as e:
-            logger.error(f"Error loading raw data from {input_path}: {str(e)}")
-            return None
+    def _load_features(self, con: duckdb.DuckDBPyConnection, input_path: Path) -> int:
+        """Read a bronze file of GeoJSON features into the temporary ``grid_values`` table"""
+        if input_path.suffix == ".jsonl":
+            source = f"read_json('{input_path}', format = 'newline_delimited', columns = {{'geometry': 'JSON', 'properties': 'JSON'}})"
+        else:
+            source = f"""(
+                SELECT unnest(features) ->> 'geometry' AS geometry, unnest(features) -> 'properties' AS properties
+                FROM read_json('{input_path}', columns = {{'features': 'JSON[]'}}, maximum_object_size = 1073741824)
+            )"""
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE grid_values AS
+            SELECT
+                COALESCE(properties ->> 'cellId', md5(CAST(geometry AS VARCHAR))) AS cell_id,
+                properties ->> 'parameterId' AS parameter,
+                CAST(properties ->> 'from' AS TIMESTAMPTZ) AS valid_time,
+                TRY_CAST(properties ->> 'value' AS DOUBLE) AS value,
+                CAST(geometry AS VARCHAR) AS geometry
+            FROM {source}
+            WHERE TRY_CAST(properties ->> 'value' AS DOUBLE) IS NOT NULL
+        """)
+        return con.execute("SELECT count(*) FROM grid_values").fetchone()[0]
 
-    def transform_data(self, raw_data: Dict) -> Optional[duckdb.DuckDBPyRelation]:
-        """Transforms raw climate data into processed statistics using DuckDB"""
-        if not raw_data or "features" not in raw_data or not raw_data["features"]:
-            logger.warning("No features found in raw data")
-            return None
+    def update_grid_cells(self, con: duckdb.DuckDBPyConnection) -> int:
+        """
+        Add the cells in ``grid_values`` that are missing from the grid-cell dimension
 
-        try:
-            # Create DuckDB connection and enable spatial extension
-            con = duckdb.connect(':memory:')
-            con.execute("INSTALL spatial;")
-            con.execute("LOAD spatial;")
-
-            # Create a list of dictionaries with extracted properties
-            features = []
-            for feature in raw_data["features"]:
-                properties = feature.get("properties", {})
-                geometry = feature.get("geometry", {})
-                features.append({
-                    "value": properties.get("value"),
-                    "parameter_id": properties.get("parameterId"),
-                    "valid_time": properties.get("from"),
-                    "created": properties.get("created"),
-                    "geometry": json.dumps(geometry) if geometry else None
-                })
-
-            # Convert features to a format DuckDB can understand
-            df = pd.DataFrame(features)
-
-            # Register the DataFrame as a table
-            con.register("features", df)
-
-            # Create a table from the extracted features
-            con.execute("""
-                CREATE TABLE extracted_data AS
-                SELECT
-                    CAST(value AS DOUBLE) as value,
-                    parameter_id,
-                    valid_time,
-                    created,
-                    ST_GeomFromGeoJSON(geometry) as geometry
-                FROM features
-                WHERE value IS NOT NULL
+        Each new cell's geometry is reprojected once, regardless of how many
+        timesteps it has. Returns the number of cells added.
+        """
+        with self._grid_cells_lock:
+            known = "SELECT NULL::VARCHAR AS cell_id WHERE false"
+            if self.grid_cells_path.exists():
+                known = f"SELECT cell_id FROM read_parquet('{self.grid_cells_path}')"
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE new_cells AS
+                SELECT cell_id, any_value(geometry) AS geometry
+                FROM grid_values
+                WHERE geometry IS NOT NULL AND cell_id NOT IN ({known})
+                GROUP BY cell_id
             """)
+            added = con.execute("SELECT count(*) FROM new_cells").fetchone()[0]
+            if not added:
+                return 0
 
+            con.execute("INSTALL spatial;")
+            con.execute("LOAD spatial;")
             # Transform CRS using DuckDB's spatial functions
             con.execute(f"""
-                CREATE TABLE transformed_data AS
+                CREATE OR REPLACE TEMP TABLE grid_cells AS
                 SELECT
-                    value,
-                    parameter_id,
-                    valid_time,
-                    created,
-                    ST_Transform(geometry, '{self.SOURCE_CRS}', '{self.TARGET_CRS}') as geometry
-                FROM extracted_data
+                    cell_id,
+                    ST_AsGeoJSON(ST_Transform(ST_GeomFromGeoJSON(geometry), '{self.SOURCE_CRS}', '{self.TARGET_CRS}')) AS geometry
+                FROM new_cells
             """)
+            if self.grid_cells_path.exists():
+                con.execute(f"INSERT INTO grid_cells SELECT cell_id, geometry FROM read_parquet('{self.grid_cells_path}')")
 
-            # Process data using DuckDB
-            result = con.execute("""
-                SELECT
-                    parameter_id,
-                    valid_time,
-                    created,
-                    AVG(value) as avg_value,
-                    MIN(value) as min_value,
-                    MAX(value) as max_value,
-                    COUNT(*) as count,
-                    ST_AsGeoJSON(geometry) as geometry
-                FROM transformed_data
-                GROUP BY parameter_id, valid_time, created, geometry
-                ORDER BY valid_time DESC
+            # Write next to the old file and swap, so a failed write keeps the cache intact
+            self.grid_cells_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.grid_cells_path.with_suffix(".tmp.parquet")
+            con.execute(f"""
+                COPY (SELECT * FROM grid_cells ORDER BY cell_id)
+                TO '{tmp_path}' (FORMAT PARQUET, COMPRESSION {PARQUET_COMPRESSION})
             """)
+            tmp_path.replace(self.grid_cells_path)
+            logger.info(f"Added {added} grid cells to {self.grid_cells_path}")
+            return added
+
+    def transform_from_file(self, input_path: Path,
+                            con: Optional[duckdb.DuckDBPyConnection] = None) -> Optional[duckdb.DuckDBPyRelation]:
+        """
+        Transform a bronze file into the value fact table
+
+        Args:
+            input_path: Bronze ``.jsonl`` or ``.json`` file
+            con: Connection to build the relation on, defaults to the transformer's
+
+        Returns:
+            A relation of ``(cell_id, parameter, valid_time, value)`` sorted by
+            parameter, time and cell, or None if the file holds no values.
+        """
+        try:
+            if con is None:
+                con = self.con
+            count = self._load_features(con, input_path)
+            if not count:
+                logger.warning("No features found in raw data")
+                return None
+
+            self.update_grid_cells(con)
 
-            logger.info(f"Successfully transformed {len(raw_data['features'])} records")
+            result = con.sql("""
+                SELECT cell_id, parameter, valid_time, value
+                FROM grid_values
+                ORDER BY parameter, valid_time, cell_id
+            """)
+            logger.info(f"Successfully transformed {count} records")
             return result
 
         except Exception as e:
             logger.error(f"Error transforming data: {str(e)}")
             return None
 
-    def transform_from_file(self, input_path: Path) -> Optional[duckdb.DuckDBPyRelation]:
-        """Transform data from a JSON file in the bronze layer"""
-        raw_data = self.load_raw_data(input_path)
-        if raw_data:
-            return self.transform_data(raw_data)
-        return None
\ No newline at end of file
+    def transform_data(self, raw_data: Dict,
+                       con: Optional[duckdb.DuckDBPyConnection] = None) -> Optional[duckdb.DuckDBPyRelation]:
+        """Transform raw climate data already loaded in memory into the value fact table"""
+        if not raw_data or "features" not in raw_data or not raw_data["features"]:
+            logger.warning("No features found in raw data")
+            return None
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = Path(tmp_dir) / "features.jsonl"
+            with open(input_path, 'w') as f:
+                for feature in raw_data["features"]:
+                    f.write(json.dumps(feature) + "\n")
+            # The features are loaded into a table, so the file is not needed afterwards
+            return self.transform_from_file(input_path, con)
@@ -0,0 +1,212 @@
+"""Module for flattening pig movement responses into partitioned Parquet."""
+
+import logging
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Rows buffered per partition before a row group is written
+ROW_GROUP_ROWS = 100_000
+PARQUET_COMPRESSION = 'zstd'
+
+def _party_fields(prefix: str) -> List[pa.Field]:
+    """Fields describing the sender or receiver of a movement."""
+    return [
+        pa.field(f'{prefix}_country_code', pa.string()),
+        pa.field(f'{prefix}_chr_number', pa.int64()),
+        pa.field(f'{prefix}_herd_number', pa.int64()),
+        pa.field(f'{prefix}_address', pa.string()),
+        pa.field(f'{prefix}_postal_code', pa.int32()),
+        pa.field(f'{prefix}_postal_district', pa.string()),
+        pa.field(f'{prefix}_municipality_code', pa.int32()),
+        pa.field(f'{prefix}_municipality_name', pa.string()),
+    ]
+
+MOVEMENT_SCHEMA = pa.schema(
+    [
+        pa.field('movement_date', pa.date32()),
+        pa.field('movement_time', pa.int32()),
+    ]
+    + _party_fields('sender')
+    + _party_fields('receiver')
+    + [
+        pa.field('animal_count', pa.int64()),
+        pa.field('front_vehicle_country_code', pa.string()),
+        pa.field('front_vehicle_registration', pa.string()),
+        pa.field('trailer_country_code', pa.string()),
+        pa.field('trailer_registration', pa.string()),
+        pa.field('reporter_logon', pa.string()),
+        pa.field('reported_at', pa.timestamp('s')),
+        pa.field('window_start', pa.date32()),
+        pa.field('window_end', pa.date32()),
+    ]
+)
+
+def _as_list(value: Any) -> List[Any]:
+    """Normalize zeep's single-item/list/None values to a list."""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+def _get(obj: Any, *path: str) -> Any:
+    """Walk nested dicts (or zeep objects), taking the first item of any list."""
+    for key in path:
+        if isinstance(obj, list):
+            obj = obj[0] if obj else None
+        if obj is None:
+            return None
+        obj = obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+    return obj
+
+def _to_int(value: Any) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_str(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def _to_date(value: Any) -> Optional[date]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+def _to_timestamp(value: Any) -> Optional[datetime]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    try:
+        return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def iter_movements(response: Any) -> Iterator[Any]:
+    """Yield the individual Svineflytning elements of a serialized response."""
+    for body in _as_list(_get(response, 'Response')):
+        for movement_list in _as_list(_get(body, 'SvineflytningListe')):
+            yield from _as_list(_get(movement_list, 'Svineflytning'))
+
+def flatten_response(chunk: Dict[str, Any]) -> pa.RecordBatch:
+    """
+    Flatten one fetched chunk into a typed record batch.
+
+    Args:
+        chunk: The dict returned by fetch_movements (metadata plus serialized response).
+
+    Returns:
+        pa.RecordBatch: One row per movement, following MOVEMENT_SCHEMA.
+    """
+    columns: Dict[str, List[Any]] = {name: [] for name in MOVEMENT_SCHEMA.names}
+    window_start = _to_date(chunk.get('start_date'))
+    window_end = _to_date(chunk.get('end_date'))
+
+    for movement in iter_movements(chunk.get('response')):
+        columns['movement_date'].append(_to_date(_get(movement, 'FlytteTidspunkt', 'SvineflytDato')))
+        columns['movement_time'].append(_to_int(_get(movement, 'FlytteTidspunkt', 'SvineflytTidspunkt')))
+
+        for prefix, element in (('sender', 'Afsender'), ('receiver', 'Modtager')):
+            party = _get(movement, element)
+            columns[f'{prefix}_country_code'].append(_to_str(_get(party, 'Landekode')))
+            columns[f'{prefix}_chr_number'].append(_to_int(_get(party, 'ChrNummer')))
+            columns[f'{prefix}_herd_number'].append(_to_int(_get(party, 'BesaetningsNummer')))
+            columns[f'{prefix}_address'].append(_to_str(_get(party, 'Ejendom', 'Adresse')))
+            columns[f'{prefix}_postal_code'].append(_to_int(_get(party, 'Ejendom', 'PostNummer')))
+            columns[f'{prefix}_postal_district'].append(_to_str(_get(party, 'Ejendom', 'PostDistrikt')))
+            columns[f'{prefix}_municipality_code'].append(_to_int(_get(party, 'Ejendom', 'KommuneNummer')))
+            columns[f'{prefix}_municipality_name'].append(_to_str(_get(party, 'Ejendom', 'KommuneNavn')))
+
+        columns['animal_count'].append(_to_int(_get(movement, 'AntalDyr', 'AntalDyrIAlt')))
+        columns['front_vehicle_country_code'].append(_to_str(_get(movement, 'Koeretoej', 'Forvogn', 'Landekode')))
+        columns['front_vehicle_registration'].append(_to_str(_get(movement, 'Koeretoej', 'Forvogn', 'RegNr')))
+        columns['trailer_country_code'].append(_to_str(_get(movement, 'Koeretoej', 'Haenger', 'Landekode')))
+        columns['trailer_registration'].append(_to_str(_get(movement, 'Koeretoej', 'Haenger', 'RegNr')))
+        columns['reporter_logon'].append(_to_str(_get(movement, 'IndberetterLogon')))
+        columns['reported_at'].append(_to_timestamp(_get(movement, 'IndberetningForetaget')))
+        columns['window_start'].append(window_start)
+        columns['window_end'].append(window_end)
+
+    return pa.RecordBatch.from_pydict(columns, schema=MOVEMENT_SCHEMA)
+
+class PartitionedParquetWriter:
+    """
+    Write movement batches to one Parquet file per movement month.
+
+    Each partition keeps its own ParquetWriter open and buffers rows until a
+    full row group is available, so memory stays bounded by
+    ``ROW_GROUP_ROWS`` rows per open partition.
+
+    Args:
+        output_dir: Local directory the partition files are written under.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self._writers: Dict[str, pq.ParquetWriter] = {}
+        self._pending: Dict[str, List[pa.RecordBatch]] = {}
+        self._pending_rows: Dict[str, int] = {}
+        self._paths: Dict[str, Path] = {}
+        self.rows_written = 0
+
+    def write_batch(self, batch: pa.RecordBatch) -> None:
+        """Split a batch by movement month and buffer it for its partitions."""
+        if batch.num_rows == 0:
+            return
+        months = pc.strftime(batch.column('movement_date').cast(pa.timestamp('s')), format='%Y-%m')
+        months = pc.fill_null(months, 'unknown')
+        for month in pc.unique(months).to_pylist():
+            part = batch.filter(pc.equal(months, month))
+            self._pending.setdefault(month, []).append(part)
+            self._pending_rows[month] = self._pending_rows.get(month, 0) + part.num_rows
+            if self._pending_rows[month] >= ROW_GROUP_ROWS:
+                self._flush(month)
+
+    def _flush(self, month: str) -> None:
+        batches = self._pending.pop(month, [])
+        self._pending_rows.pop(month, None)
+        if not batches:
+            return
+        if month not in self._writers:
+            path = self.output_dir / f'movement_month={month}' / 'part-0.parquet'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._writers[month] = pq.ParquetWriter(path, MOVEMENT_SCHEMA, compression=PARQUET_COMPRESSION)
+            self._paths[month] = path
+        table = pa.Table.from_batches(batches, schema=MOVEMENT_SCHEMA)
+        self._writers[month].write_table(table)
+        self.rows_written += table.num_rows
+
+    def close(self) -> Dict[str, Path]:
+        """
+        Flush all buffered rows and close every partition file.
+
+        Returns:
+            Dict[str, Path]: Partition directory name (movement_month=YYYY-MM) to file path.
+        """
+        for month in list(self._pending):
+            self._flush(month)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        logger.debug(f"Wrote {self.rows_written} movements to {len(self._paths)} partitions")
+        return {path.parent.name: path for path in self._paths.values()}
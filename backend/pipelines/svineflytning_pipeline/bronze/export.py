@@ -4,10 +4,11 @@ import logging
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Iterator
+from typing import Any, Dict, List, Iterator, Optional
 from datetime import datetime, date
 from io import BytesIO
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 import ijson  # Add this import for streaming JSON parsing
 
 from dotenv import load_dotenv
@@ -53,6 +54,81 @@ if USE_GCS:
 if not USE_GCS:
     logger.warning("Using local storage in /data/raw/svineflytning/")
 
+LOCAL_ROOT = Path("/data/raw/svineflytning")
+# Run state shared between runs, relative to bronze/svineflytning/
+WATERMARK_PATH = "_state/watermark.json"
+WINDOW_STATS_PATH = "_state/window_stats.json"
+
+def _load_state(state_path: str) -> Optional[Dict[str, Any]]:
+    """Load a JSON state file from GCS or local storage, or None if it does not exist."""
+    try:
+        if USE_GCS:
+            blob = gcs_client.bucket(GCS_BUCKET).blob(f"bronze/svineflytning/{state_path}")
+            if not blob.exists():
+                return None
+            return json.loads(blob.download_as_text())
+        state_file = LOCAL_ROOT / state_path
+        if not state_file.exists():
+            return None
+        return json.loads(state_file.read_text(encoding='utf-8'))
+    except (GoogleAPICallError, OSError, ValueError) as e:
+        logger.error(f"Failed to load state {state_path}: {e}")
+        raise
+
+def _save_state(state_path: str, state: Dict[str, Any]) -> None:
+    """Write a JSON state file to GCS or local storage."""
+    content = json.dumps(state, indent=2)
+    if USE_GCS:
+        blob = gcs_client.bucket(GCS_BUCKET).blob(f"bronze/svineflytning/{state_path}")
+        blob.upload_from_string(content, content_type='application/json')
+    else:
+        state_file = LOCAL_ROOT / state_path
+        state_file.parent.mkdir(parents=True, exist_ok=True)
+        state_file.write_text(content, encoding='utf-8')
+
+def load_watermark() -> Optional[date]:
+    """
+    Load the last date that was fully fetched by a previous run.
+    
+    Returns:
+        Optional[date]: The watermark date, or None if no run has recorded one.
+    """
+    state = _load_state(WATERMARK_PATH)
+    if state is None:
+        return None
+    return date.fromisoformat(state['watermark'])
+
+def save_watermark(watermark: date, destination: str) -> None:
+    """
+    Persist the last fully fetched date after a successful export.
+    
+    Args:
+        watermark: The last date whose movements are completely exported.
+        destination: Where the export covering this date was written.
+    """
+    _save_state(WATERMARK_PATH, {
+        'watermark': watermark.isoformat(),
+        'updated_at': datetime.utcnow().isoformat(),
+        'destination': destination
+    })
+    logger.debug(f"Saved watermark {watermark.isoformat()}")
+
+def load_window_stats() -> Optional[Dict[str, Any]]:
+    """Load the per-month response density learned by previous runs."""
+    try:
+        return _load_state(WINDOW_STATS_PATH)
+    except Exception:
+        # Stats only tune window sizes, so a missing or corrupt file is not fatal
+        logger.warning("Could not load window stats, using default window sizes")
+        return None
+
+def save_window_stats(stats: Dict[str, Any]) -> None:
+    """Persist the per-month response density for the next run."""
+    try:
+        _save_state(WINDOW_STATS_PATH, stats)
+    except Exception as e:
+        logger.warning(f"Could not save window stats: {e}")
+
 def _save_to_gcs(blob_path: str, data_iterator: Iterator[Dict]) -> str:
     """
     Helper function to stream content to GCS.
@@ -164,7 +240,8 @@ def export_movements(data_iterator: Iterator[Dict], export_timestamp: str, filen
 def export_movements_optimized(
     temp_files: List[Path],
     export_timestamp: str,
-    total_chunks: int
+    total_chunks: int,
+    output_prefix: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Export pig movement data using streaming to minimize memory usage.
@@ -173,10 +250,13 @@ def export_movements_optimized(
         temp_files: List of temporary files containing the movement data
         export_timestamp: Timestamp string for the export
         total_chunks: Total number of chunks processed
+        output_prefix: Optional partition directory under bronze/svineflytning/
+            that the timestamped export is written into
         
     Returns:
         Dict containing export metadata
     """
+    output_dir = f"{output_prefix}/{export_timestamp}" if output_prefix else export_timestamp
     def stream_temp_file(temp_file: Path):
         """Stream contents of a temp file one item at a time."""
         with open(temp_file, 'rb') as f:
@@ -190,7 +270,7 @@ def export_movements_optimized(
             
             storage_client = storage.Client()
             bucket = storage_client.bucket(GCS_BUCKET)
-            blob = bucket.blob(f"bronze/svineflytning/{export_timestamp}/svineflytning.json")
+            blob = bucket.blob(f"bronze/svineflytning/{output_dir}/svineflytning.json")
             
             # Stream directly to GCS
             with blob.open('w') as f:
@@ -207,7 +287,7 @@ def export_movements_optimized(
                 
                 f.write('\n]')
             
-            destination = f"gs://{GCS_BUCKET}/bronze/svineflytning/{export_timestamp}/svineflytning.json"
+            destination = f"gs://{GCS_BUCKET}/bronze/svineflytning/{output_dir}/svineflytning.json"
             logger.debug(f"Successfully exported to GCS: {destination}")
             
         except Exception as e:
@@ -215,7 +295,7 @@ def export_movements_optimized(
             logger.warning("Falling back to local storage")
             
             # Fallback to local storage
-            local_dir = Path("/data/raw/svineflytning") / export_timestamp
+            local_dir = LOCAL_ROOT / output_dir
             local_dir.mkdir(parents=True, exist_ok=True)
             output_file = local_dir / "svineflytning.json"
             
@@ -238,7 +318,7 @@ def export_movements_optimized(
             logger.debug(f"Successfully saved locally: {destination}")
     else:
         # Direct local storage
-        local_dir = Path("/data/raw/svineflytning") / export_timestamp
+        local_dir = LOCAL_ROOT / output_dir
         local_dir.mkdir(parents=True, exist_ok=True)
         output_file = local_dir / "svineflytning.json"
         
@@ -265,3 +345,61 @@ def export_movements_optimized(
         "storage_type": "gcs" if USE_GCS else "local",
         "destination": destination
     }
+
+def export_partitions(
+    partition_files: Dict[str, Path],
+    export_timestamp: str,
+    output_prefix: Optional[str] = None,
+    max_concurrent_uploads: int = 4
+) -> Dict[str, Any]:
+    """
+    Export partitioned Parquet files to either GCS or local storage.
+    
+    Args:
+        partition_files: Partition directory name to local Parquet file
+        export_timestamp: Timestamp string for the export
+        output_prefix: Optional partition directory under bronze/svineflytning/
+            that the timestamped export is written into
+        max_concurrent_uploads: Number of partitions uploaded in parallel
+        
+    Returns:
+        Dict containing export metadata
+    """
+    output_dir = f"{output_prefix}/{export_timestamp}" if output_prefix else export_timestamp
+    
+    def copy_locally(partition: str, local_file: Path) -> str:
+        target = LOCAL_ROOT / output_dir / partition / local_file.name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(local_file, target)
+        return str(target.absolute())
+    
+    def upload(partition: str, local_file: Path) -> str:
+        blob_path = f"bronze/svineflytning/{output_dir}/{partition}/{local_file.name}"
+        blob = gcs_client.bucket(GCS_BUCKET).blob(blob_path)
+        blob.upload_from_filename(str(local_file), content_type='application/octet-stream')
+        return f"gs://{GCS_BUCKET}/{blob_path}"
+    
+    storage_type = "gcs" if USE_GCS else "local"
+    if USE_GCS:
+        try:
+            logger.debug(f"Uploading {len(partition_files)} partitions to GCS bucket '{GCS_BUCKET}'")
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrent_uploads)) as executor:
+                list(executor.map(upload, partition_files.keys(), partition_files.values()))
+            destination = f"gs://{GCS_BUCKET}/bronze/svineflytning/{output_dir}"
+        except Exception as e:
+            logger.error(f"Error writing to GCS: {e}")
+            logger.warning("Falling back to local storage")
+            storage_type = "local"
+    
+    if storage_type == "local":
+        for partition, local_file in partition_files.items():
+            copy_locally(partition, local_file)
+        destination = str((LOCAL_ROOT / output_dir).absolute())
+    
+    logger.debug(f"Successfully exported partitions to: {destination}")
+    return {
+        "export_timestamp": export_timestamp,
+        "storage_type": storage_type,
+        "destination": destination,
+        "partitions": sorted(partition_files)
+    }
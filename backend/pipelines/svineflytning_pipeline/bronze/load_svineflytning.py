@@ -3,7 +3,7 @@
 import logging
 import certifi
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Any, Iterator, Tuple
+from typing import Dict, List, Any, Iterator, Tuple, Optional
 from zeep import Client, exceptions as zeep_exceptions, Settings
 from zeep.transports import Transport
 from zeep.wsse.username import UsernameToken
@@ -16,10 +16,19 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from tqdm.auto import tqdm
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import threading
 import tempfile
 import shutil
-from .export import export_movements_optimized, DateTimeEncoder
+from .export import (
+    export_movements_optimized,
+    export_partitions,
+    load_window_stats,
+    save_window_stats,
+    DateTimeEncoder
+)
+from .columnar import flatten_response, iter_movements, PartitionedParquetWriter
+from .window_planner import WindowPlanner, DEFAULT_MOVEMENT_BUDGET, DEFAULT_LATENCY_BUDGET
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +40,40 @@ ENDPOINTS = {
 
 DEFAULT_CLIENT_ID = os.getenv('FVM_CLIENT_ID', 'LandbrugsData')
 MAX_DATE_RANGE_DAYS = 3  # API limit: maximum 3 days per request
+EXPORT_FORMATS = ('json', 'parquet')
 VERIFY_SSL = os.getenv('FVM_VERIFY_SSL', 'true').lower() == 'true'
+DEFAULT_REQUESTS_PER_SECOND = 10.0  # Sustained request rate against SvineflytningWS
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting how often requests are sent.
+    
+    Args:
+        rate: Sustained number of requests per second.
+        burst: Maximum number of requests that may be sent back-to-back.
+    """
+    
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
 
 def get_fvm_credentials() -> tuple[str, str]:
     """
@@ -109,7 +151,12 @@ def validate_date_range(start_date: date, end_date: date) -> None:
     after=before_log(logger, logging.DEBUG),
     retry=retry_if_exception_type((zeep_exceptions.Fault, zeep_exceptions.TransportError)),
 )
-def fetch_movements(client: Client, start_date: date, end_date: date) -> Dict[str, Any]:
+def fetch_movements(
+    client: Client,
+    start_date: date,
+    end_date: date,
+    rate_limiter: Optional[RateLimiter] = None
+) -> Dict[str, Any]:
     """
     Fetch movements for a given date range and stream directly to storage.
     
@@ -117,11 +164,14 @@ def fetch_movements(client: Client, start_date: date, end_date: date) -> Dict[st
         client: The SOAP client to use.
         start_date: The start date of the range.
         end_date: The end date of the range.
+        rate_limiter: Optional limiter consulted before every attempt, including retries.
         
     Returns:
         Dict[str, Any]: A dictionary containing metadata about the export.
     """
     try:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
         logger.debug(f"Fetching movements for period {start_date} to {end_date}")
         
         # Create the request object with the correct structure
@@ -168,11 +218,29 @@ def fetch_all_movements(
     max_concurrent_fetches: int = 5,
     buffer_size: int = 50,
     show_progress: bool = False,
-    test_mode: bool = False
+    test_mode: bool = False,
+    requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+    output_prefix: Optional[str] = None,
+    export_format: str = 'json',
+    max_concurrent_uploads: int = 4,
+    movement_budget: int = DEFAULT_MOVEMENT_BUDGET,
+    latency_budget: float = DEFAULT_LATENCY_BUDGET
 ) -> Dict[str, Any]:
     """
     Fetch all movements for the given date range with parallel processing.
     
+    Request windows are planned from the per-month density learned in previous
+    runs: busy periods get shorter windows so responses stay within
+    ``movement_budget`` and ``latency_budget``. A window that fails, or whose
+    response holds more than ``movement_budget`` movements, is split in half and
+    its halves are fetched instead.
+    
+    Responses are handled in completion order and reassembled in chunk order
+    before being buffered, so a slow window never blocks flushing of the
+    windows after it. At most ``2 * max_concurrent_fetches`` responses are
+    in flight or waiting for reassembly at any time; new chunks are only
+    submitted once earlier ones have been written out.
+    
     Args:
         client: The SOAP client to use.
         start_date: The start date of the range.
@@ -182,29 +250,48 @@ def fetch_all_movements(
         buffer_size: Number of responses to accumulate before writing to disk.
         show_progress: Whether to show progress bars.
         test_mode: Whether to run in test mode (limited data).
+        requests_per_second: Maximum sustained request rate against the API.
+        output_prefix: Optional partition directory under bronze/svineflytning/
+            that the timestamped export is written into.
+        export_format: 'json' for the raw JSON array, or 'parquet' to flatten each
+            response into typed rows as it arrives and write Parquet partitioned
+            by movement month.
+        max_concurrent_uploads: Number of Parquet partitions uploaded in parallel.
+        movement_budget: Target maximum number of movements per response.
+        latency_budget: Target maximum seconds per request.
         
     Returns:
         Dict[str, Any]: A dictionary containing metadata about the export.
     """
     logger.debug(f"Starting to fetch all movements from {start_date} to {end_date}")
     
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    
     if test_mode:
         end_date = start_date
         logger.warning("Running in test mode - limiting to single day")
     
-    # Generate all date chunks
-    date_chunks = []
-    current_date = start_date
-    while current_date <= end_date:
-        chunk_end = min(current_date + timedelta(days=MAX_DATE_RANGE_DAYS - 1), end_date)
-        date_chunks.append((current_date, chunk_end))
-        current_date = chunk_end + timedelta(days=1)
+    # Plan date chunks from the density observed in previous runs
+    planner = WindowPlanner(
+        MAX_DATE_RANGE_DAYS,
+        stats=load_window_stats(),
+        movement_budget=movement_budget,
+        latency_budget=latency_budget
+    )
+    date_chunks = planner.plan(start_date, end_date)
+    logger.debug(f"Planned {len(date_chunks)} request windows")
+
+    rate_limiter = RateLimiter(requests_per_second, burst=max_concurrent_fetches)
+    # Bound on responses held in memory (in flight + waiting for reassembly)
+    max_pending = 2 * max_concurrent_fetches
 
     # Create temporary directory for buffers
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_files = []
         current_buffer = []
         buffer_count = 0
+        parquet_writer = PartitionedParquetWriter(Path(temp_dir) / 'parquet') if export_format == 'parquet' else None
         
         def flush_buffer() -> str:
             nonlocal current_buffer, buffer_count
@@ -220,12 +307,39 @@ def fetch_all_movements(
             current_buffer = []
             return str(temp_path)
 
-        def fetch_chunk(dates: Tuple[date, date]) -> Dict:
+        def fetch_window(dates: Tuple[date, date]) -> List[Dict]:
             chunk_start, chunk_end = dates
+            started = time.monotonic()
+            try:
+                response = fetch_movements(client, chunk_start, chunk_end, rate_limiter)
+            except Exception as e:
+                halves = planner.split(dates)
+                if halves is None:
+                    raise
+                logger.warning(f"Fetching {chunk_start} to {chunk_end} failed ({e}), splitting window")
+                return [part for half in halves for part in fetch_window(half)]
+            
+            elapsed = time.monotonic() - started
+            movements = sum(1 for _ in iter_movements(response['response']))
+            planner.record(dates, movements, elapsed)
+            if movements > planner.movement_budget:
+                # The stats are recorded, so later windows in this month are planned smaller
+                halves = planner.split(dates)
+                if halves is not None:
+                    logger.warning(f"Window {chunk_start} to {chunk_end} over budget ({movements} movements), splitting window")
+                    del response
+                    return [part for half in halves for part in fetch_window(half)]
+            if planner.over_budget(movements, elapsed):
+                logger.debug(f"Window {chunk_start} to {chunk_end} over budget ({movements} movements, {elapsed:.1f}s)")
+            return [response]
+
+        def fetch_chunk(dates: Tuple[date, date]) -> List[Any]:
             try:
-                response = fetch_movements(client, chunk_start, chunk_end)
-                time.sleep(0.1)  # Small delay to avoid overwhelming the server
-                return response
+                responses = fetch_window(dates)
+                if parquet_writer is not None:
+                    # Flatten in the worker so only compact record batches are held
+                    return [flatten_response(response) for response in responses]
+                return responses
             except Exception as e:
                 logger.error(f"Error fetching chunk {dates}: {e}")
                 raise
@@ -239,39 +353,77 @@ def fetch_all_movements(
         )
         
         # Fetch data in parallel
-        with ThreadPoolExecutor(max_workers=max_concurrent_fetches) as executor:
-            futures = [executor.submit(fetch_chunk, chunk) for chunk in date_chunks]
-            
-            for future in futures:
-                try:
-                    response = future.result()
-                    current_buffer.append(response)
+        in_flight = {}  # future -> chunk index
+        completed = {}  # chunk index -> response, waiting for earlier chunks
+        next_to_submit = 0
+        next_to_write = 0
+        
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrent_fetches) as executor:
+                while next_to_write < len(date_chunks):
+                    # Backpressure: only submit while the reassembly window has room
+                    while (next_to_submit < len(date_chunks)
+                           and len(in_flight) + len(completed) < max_pending):
+                        future = executor.submit(fetch_chunk, date_chunks[next_to_submit])
+                        in_flight[future] = next_to_submit
+                        next_to_submit += 1
                     
-                    # If buffer reaches size limit, flush to temp file
-                    if len(current_buffer) >= buffer_size:
-                        flush_buffer()
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = in_flight.pop(future)
+                        try:
+                            completed[index] = future.result()
+                        except Exception as e:
+                            logger.error(f"Error in parallel fetch: {e}")
+                            for pending in in_flight:
+                                pending.cancel()
+                            raise
+                        pbar.update(1)
                     
-                    pbar.update(1)
-                except Exception as e:
-                    logger.error(f"Error in parallel fetch: {e}")
-                    pbar.close()
-                    raise
+                    # Move every contiguous completed chunk into the write buffer
+                    while next_to_write in completed:
+                        chunk_results = completed.pop(next_to_write)
+                        next_to_write += 1
+                        
+                        for chunk_result in chunk_results:
+                            if parquet_writer is not None:
+                                parquet_writer.write_batch(chunk_result)
+                                continue
+                            
+                            current_buffer.append(chunk_result)
+                            # If buffer reaches size limit, flush to temp file
+                            if len(current_buffer) >= buffer_size:
+                                flush_buffer()
+        finally:
+            pbar.close()
 
         # Flush any remaining data
         if current_buffer:
             flush_buffer()
 
-        pbar.close()
-
         # Get timestamp for this export run
         export_timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
         
-        # Export the data using the optimized export function
-        export_result = export_movements_optimized(
-            temp_files,
-            export_timestamp,
-            len(date_chunks)
-        )
+        if parquet_writer is not None:
+            partition_files = parquet_writer.close()
+            logger.debug(f"Flattened {parquet_writer.rows_written} movements into {len(partition_files)} partitions")
+            export_result = export_partitions(
+                partition_files,
+                export_timestamp,
+                output_prefix=output_prefix,
+                max_concurrent_uploads=max_concurrent_uploads
+            )
+        else:
+            # Export the data using the optimized export function
+            export_result = export_movements_optimized(
+                temp_files,
+                export_timestamp,
+                len(date_chunks),
+                output_prefix=output_prefix
+            )
+        
+        if not test_mode:
+            save_window_stats(planner.to_stats())
         
         result = {
             "export_timestamp": export_timestamp,
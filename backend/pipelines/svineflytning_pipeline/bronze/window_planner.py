@@ -0,0 +1,115 @@
+"""Module for sizing SvineflytningWS request windows from observed density."""
+
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MOVEMENT_BUDGET = 10_000  # Movements per response before a window is considered too large
+DEFAULT_LATENCY_BUDGET = 60.0  # Seconds per request before a window is considered too slow
+# Days of history kept per calendar month, older observations are scaled down
+MAX_STATS_DAYS = 365
+
+Window = Tuple[date, date]
+
+class WindowPlanner:
+    """
+    Plan request windows so each response stays within a size and latency budget.
+
+    Density (movements and seconds per day) is tracked per calendar month, so
+    busy seasons learned in previous runs get shorter windows up front. Windows
+    never exceed ``max_days``, which is the API limit.
+
+    Args:
+        max_days: Longest window the API accepts.
+        stats: Per-month stats from a previous run (see ``to_stats``).
+        movement_budget: Maximum expected movements per response.
+        latency_budget: Maximum expected seconds per request.
+    """
+
+    def __init__(
+        self,
+        max_days: int,
+        stats: Optional[Dict[str, Any]] = None,
+        movement_budget: int = DEFAULT_MOVEMENT_BUDGET,
+        latency_budget: float = DEFAULT_LATENCY_BUDGET
+    ):
+        self.max_days = max_days
+        self.movement_budget = movement_budget
+        self.latency_budget = latency_budget
+        self._months: Dict[str, Dict[str, float]] = {
+            month: dict(values) for month, values in (stats or {}).get('months', {}).items()
+        }
+        self._lock = threading.Lock()
+
+    def _daily_estimate(self, day: date) -> Tuple[float, float]:
+        """Expected (movements, seconds) for a single day."""
+        month = self._months.get(f"{day.month:02d}")
+        if not month or not month.get('days'):
+            return 0.0, 0.0
+        return month['movements'] / month['days'], month['seconds'] / month['days']
+
+    def _fits(self, start: date, days: int) -> bool:
+        movements = seconds = 0.0
+        for offset in range(days):
+            day_movements, day_seconds = self._daily_estimate(start + timedelta(days=offset))
+            movements += day_movements
+            seconds += day_seconds
+        return movements <= self.movement_budget and seconds <= self.latency_budget
+
+    def plan(self, start_date: date, end_date: date) -> List[Window]:
+        """
+        Split a date range into request windows.
+
+        Each window is as long as possible (up to ``max_days``) while its
+        estimated size stays within budget; without stats this gives the
+        same fixed-size windows as before.
+        """
+        windows = []
+        current = start_date
+        while current <= end_date:
+            days = min(self.max_days, (end_date - current).days + 1)
+            while days > 1 and not self._fits(current, days):
+                days -= 1
+            window_end = current + timedelta(days=days - 1)
+            windows.append((current, window_end))
+            current = window_end + timedelta(days=1)
+        return windows
+
+    @staticmethod
+    def split(window: Window) -> Optional[Tuple[Window, Window]]:
+        """Split a window in half, or return None for a single-day window."""
+        start, end = window
+        days = (end - start).days + 1
+        if days <= 1:
+            return None
+        first_end = start + timedelta(days=days // 2 - 1)
+        return (start, first_end), (first_end + timedelta(days=1), end)
+
+    def over_budget(self, movements: int, seconds: float) -> bool:
+        """Whether a response exceeded the size or latency budget."""
+        return movements > self.movement_budget or seconds > self.latency_budget
+
+    def record(self, window: Window, movements: int, seconds: float) -> None:
+        """Record an observed response, spreading it evenly over the window's days."""
+        start, end = window
+        days = (end - start).days + 1
+        with self._lock:
+            for offset in range(days):
+                key = f"{(start + timedelta(days=offset)).month:02d}"
+                month = self._months.setdefault(key, {'days': 0.0, 'movements': 0.0, 'seconds': 0.0})
+                month['days'] += 1
+                month['movements'] += movements / days
+                month['seconds'] += seconds / days
+
+    def to_stats(self) -> Dict[str, Any]:
+        """Return the stats to persist for the next run."""
+        with self._lock:
+            months = {}
+            for key, month in sorted(self._months.items()):
+                # Keep a bounded history so recent seasons dominate
+                scale = min(1.0, MAX_STATS_DAYS / month['days']) if month['days'] else 1.0
+                months[key] = {name: round(value * scale, 3) for name, value in month.items()}
+        return {'months': months}
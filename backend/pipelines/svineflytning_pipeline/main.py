@@ -7,14 +7,21 @@ from typing import Dict, Any
 from pathlib import Path
 import os
 import sys
+import tempfile
 from tqdm.contrib.logging import logging_redirect_tqdm
 
 from bronze.load_svineflytning import (
     get_fvm_credentials,
     create_client,
     fetch_all_movements,
-    ENDPOINTS
+    ENDPOINTS,
+    DEFAULT_REQUESTS_PER_SECOND,
+    EXPORT_FORMATS
 )
+from bronze.window_planner import DEFAULT_MOVEMENT_BUDGET, DEFAULT_LATENCY_BUDGET
+from bronze.export import load_watermark, save_watermark, USE_GCS
+from silver.transform import MovementTransformer
+from silver.export import fetch_bronze_exports, export_silver
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +29,8 @@ logger = logging.getLogger(__name__)
 DEFAULT_MAX_CONCURRENT_FETCHES = 5  # Number of parallel API calls
 DEFAULT_BUFFER_SIZE = 50  # Number of responses to accumulate before writing to disk
 # Assuming avg response size of 10MB, this means ~500MB peak memory/disk usage
+DEFAULT_MAX_CONCURRENT_UPLOADS = 4  # Parquet partitions uploaded in parallel
+DEFAULT_LOOKBACK_DAYS = 14  # Days before the watermark re-fetched to pick up late corrections
 
 def setup_logging(log_level: str):
     """Configure logging with the specified level."""
@@ -45,6 +54,8 @@ def setup_logging(log_level: str):
     # Configure bronze module loggers
     bronze_logger = logging.getLogger('svineflytning_pipeline.bronze')
     bronze_logger.setLevel(numeric_level if numeric_level <= logging.INFO else logging.WARNING)
+    silver_logger = logging.getLogger('svineflytning_pipeline.silver')
+    silver_logger.setLevel(numeric_level if numeric_level <= logging.INFO else logging.WARNING)
     
     # Set third-party loggers to WARNING or higher
     for logger_name in ['zeep', 'urllib3', 'google', 'requests']:
@@ -60,6 +71,17 @@ def get_default_dates() -> tuple[date, date]:
     start_date = today.replace(year=today.year - 5)  # 5 years ago from today
     return start_date, end_date
 
+def get_incremental_dates(end_date: date, lookback_days: int) -> tuple[date, date]:
+    """Get the date range for an incremental run from the stored watermark."""
+    watermark = load_watermark()
+    if watermark is None:
+        start_date, _ = get_default_dates()
+        logger.warning(f"No watermark found, running full backfill from {start_date}")
+    else:
+        start_date = watermark + timedelta(days=1) - timedelta(days=lookback_days)
+        logger.warning(f"Watermark is {watermark}, fetching from {start_date} ({lookback_days} days look-back)")
+    return start_date, end_date
+
 def parse_args() -> Dict[str, Any]:
     """Parse command line arguments."""
     start_date_def, end_date_def = get_default_dates()
@@ -69,6 +91,8 @@ def parse_args() -> Dict[str, Any]:
                       default=start_date_def, help='Start date (YYYY-MM-DD)')
     parser.add_argument('--end-date', type=lambda s: datetime.strptime(s, '%Y-%m-%d').date(),
                       default=end_date_def, help='End date (YYYY-MM-DD)')
+    parser.add_argument('--stage', choices=['bronze', 'silver', 'all'],
+                      default='bronze', help='Pipeline stage to run')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                       default='WARNING', help='Logging level')
     parser.add_argument('--progress', action='store_true',
@@ -83,11 +107,32 @@ def parse_args() -> Dict[str, Any]:
     parser.add_argument('--buffer-size', type=int,
                       default=DEFAULT_BUFFER_SIZE,
                       help='Number of responses to accumulate before writing to disk')
+    parser.add_argument('--export-format', choices=EXPORT_FORMATS,
+                      default='json',
+                      help='json: raw JSON array; parquet: typed rows partitioned by movement month')
+    parser.add_argument('--max-concurrent-uploads', type=int,
+                      default=DEFAULT_MAX_CONCURRENT_UPLOADS,
+                      help='Number of Parquet partitions uploaded in parallel')
+    parser.add_argument('--movement-budget', type=int,
+                      default=DEFAULT_MOVEMENT_BUDGET,
+                      help='Target maximum movements per response; denser periods get shorter request windows')
+    parser.add_argument('--latency-budget', type=float,
+                      default=DEFAULT_LATENCY_BUDGET,
+                      help='Target maximum seconds per request; slower periods get shorter request windows')
+    parser.add_argument('--incremental', action='store_true',
+                      help='Start from the stored watermark instead of --start-date and advance it after a successful run')
+    parser.add_argument('--lookback-days', type=int,
+                      default=DEFAULT_LOOKBACK_DAYS,
+                      help='Days before the watermark to re-fetch in incremental mode')
+    parser.add_argument('--requests-per-second', type=float,
+                      default=DEFAULT_REQUESTS_PER_SECOND,
+                      help='Maximum sustained request rate against SvineflytningWS')
     
     args = parser.parse_args()
     
     # Validate resource usage parameters
-    total_memory_estimate = args.buffer_size * 10  # Rough estimate: 10MB per response
+    # Buffered responses plus the bounded in-flight/reassembly window
+    total_memory_estimate = (args.buffer_size + 2 * args.max_concurrent_fetches) * 10  # Rough estimate: 10MB per response
     if total_memory_estimate > 1000:  # Warning if estimated usage > 1GB
         logger.warning(
             f"Warning: Current settings might use up to {total_memory_estimate}MB of memory. "
@@ -96,43 +141,103 @@ def parse_args() -> Dict[str, Any]:
     
     return vars(args)
 
-def main():
-    """Main pipeline execution."""
-    args = parse_args()
-    setup_logging(args['log_level'])
+def run_silver_stage(max_concurrent_uploads: int) -> Dict[str, Any]:
+    """Rebuild the silver fact table from the current bronze exports."""
+    export_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        input_files = fetch_bronze_exports(work_dir, max_concurrent_uploads)
+        if not input_files:
+            raise RuntimeError("No bronze svineflytning exports found for the silver stage")
+        
+        output_dir = work_dir / 'silver'
+        stats = MovementTransformer(input_files, output_dir, work_dir).transform()
+        result = export_silver(output_dir, export_timestamp, max_concurrent_uploads)
+    
+    logger.warning(
+        f"Silver stage wrote {stats['rows']} movements in {stats['partitions']} monthly partitions "
+        f"({stats['duplicates_removed']} overlapping duplicates removed) to {result['destination']}"
+    )
+    return result
+
+def run_bronze_stage(args: Dict[str, Any]) -> bool:
+    """Fetch movements into the bronze layer, returning False if there was nothing to fetch."""
+    output_prefix = None
+    if args['incremental']:
+        args['start_date'], args['end_date'] = get_incremental_dates(args['end_date'], args['lookback_days'])
+        if args['start_date'] > args['end_date']:
+            logger.warning("Watermark is already past the end date, nothing to fetch")
+            return False
+        # Each incremental run is its own window partition; overlapping windows
+        # are resolved by the silver stage
+        output_prefix = f"incremental/window={args['start_date']}_{args['end_date']}"
     
-    logger.warning("Starting Svineflytning pipeline")
     if args['progress']:
         logger.warning(f"Processing date range: {args['start_date']} to {args['end_date']}")
         logger.warning(f"Using {args['max_concurrent_fetches']} concurrent fetches")
         logger.warning(f"Buffer size: {args['buffer_size']} responses")
     
-    try:
-        # Get credentials and create client
-        username, password = get_fvm_credentials()
-        client = create_client(
-            ENDPOINTS[args['environment']],
-            username,
-            password
+    # Get credentials and create client
+    username, password = get_fvm_credentials()
+    client = create_client(
+        ENDPOINTS[args['environment']],
+        username,
+        password
+    )
+    
+    # Fetch and stream all movements
+    with logging_redirect_tqdm():
+        result = fetch_all_movements(
+            client=client,
+            start_date=args['start_date'],
+            end_date=args['end_date'],
+            output_dir='/data/raw/svineflytning',
+            max_concurrent_fetches=args['max_concurrent_fetches'],
+            buffer_size=args['buffer_size'],
+            show_progress=args['progress'],
+            test_mode=args['test'],
+            requests_per_second=args['requests_per_second'],
+            output_prefix=output_prefix,
+            export_format=args['export_format'],
+            max_concurrent_uploads=args['max_concurrent_uploads'],
+            movement_budget=args['movement_budget'],
+            latency_budget=args['latency_budget']
         )
+    
+    if args['incremental'] and not args['test']:
+        if USE_GCS and not result['storage_path'].startswith('gs://'):
+            logger.error("Export fell back to local storage, not advancing the watermark")
+        else:
+            # Today's registrations are still coming in, so it is never complete
+            watermark = min(args['end_date'], date.today() - timedelta(days=1))
+            previous = load_watermark()
+            if previous is not None and watermark <= previous:
+                logger.warning(f"Keeping watermark at {previous}, run ended at {watermark}")
+            else:
+                save_watermark(watermark, result['storage_path'])
+                logger.warning(f"Advanced watermark to {watermark}")
+    
+    # Print information about the export
+    logger.warning(f"Bronze stage completed successfully")
+    if args['progress']:
+        logger.warning(f"Data exported to: {result['storage_path']}")
+    return True
+
+def main():
+    """Main pipeline execution."""
+    args = parse_args()
+    setup_logging(args['log_level'])
+    
+    logger.warning(f"Starting Svineflytning pipeline (stage: {args['stage']})")
+    
+    try:
+        if args['stage'] in ('bronze', 'all'):
+            run_bronze_stage(args)
         
-        # Fetch and stream all movements
-        with logging_redirect_tqdm():
-            result = fetch_all_movements(
-                client=client,
-                start_date=args['start_date'],
-                end_date=args['end_date'],
-                output_dir='/data/raw/svineflytning',
-                max_concurrent_fetches=args['max_concurrent_fetches'],
-                buffer_size=args['buffer_size'],
-                show_progress=args['progress'],
-                test_mode=args['test']
-            )
+        if args['stage'] in ('silver', 'all'):
+            run_silver_stage(args['max_concurrent_uploads'])
         
-        # Print information about the export
         logger.warning(f"Pipeline completed successfully")
-        if args['progress']:
-            logger.warning(f"Data exported to: {result['storage_path']}")
         
     except Exception as e:
         logger.error(f"Pipeline failed: {str(e)}", exc_info=True)
@@ -0,0 +1,153 @@
+"""Module for moving svineflytning silver data in and out of storage."""
+
+import logging
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bronze.export import USE_GCS, GCS_BUCKET, LOCAL_ROOT, gcs_client
+from silver.transform import PARTITION_PREFIX
+
+logger = logging.getLogger(__name__)
+
+BRONZE_PREFIX = "bronze/svineflytning"
+SILVER_PREFIX = "silver/svineflytning"
+BRONZE_FILENAME = "svineflytning.json"
+LOCAL_SILVER_ROOT = Path("/data/silver/svineflytning")
+
+INCREMENTAL_PREFIX = "incremental/"
+
+def select_current_exports(names: List[str]) -> List[str]:
+    """
+    Keep the exports that make up the current state of the bronze layer.
+
+    A full export (``<timestamp>/...``) holds the whole history, so only the
+    latest one is needed, together with the incremental exports
+    (``incremental/window=<start>_<end>/<timestamp>/...``) written after it.
+    Without a full export every incremental export is kept. JSON and Parquet
+    exports are treated alike; a Parquet export is the set of
+    ``movement_month=YYYY-MM/part-0.parquet`` files under its timestamp.
+
+    Args:
+        names: Export file paths relative to ``bronze/svineflytning/``.
+
+    Returns:
+        List[str]: The selected paths, in the order given.
+    """
+    def export_dir(name: str) -> List[str]:
+        parts = name.split('/')[:-1]
+        if parts and parts[-1].startswith(PARTITION_PREFIX):
+            parts = parts[:-1]
+        return parts
+
+    def export_timestamp(name: str) -> str:
+        return export_dir(name)[-1]
+
+    full_exports = [
+        name for name in names
+        if not name.startswith(INCREMENTAL_PREFIX) and len(export_dir(name)) == 1
+    ]
+    if not full_exports:
+        return [name for name in names if name.startswith(INCREMENTAL_PREFIX)]
+
+    latest_full = max(export_timestamp(name) for name in full_exports)
+    return [
+        name for name in names
+        if (name in full_exports and export_timestamp(name) == latest_full)
+        or (name.startswith(INCREMENTAL_PREFIX) and export_timestamp(name) > latest_full)
+    ]
+
+def _is_bronze_export(name: str) -> bool:
+    """Whether a path below bronze/svineflytning/ is a JSON export or a Parquet partition."""
+    parts = name.split('/')
+    return parts[-1] == BRONZE_FILENAME or (
+        parts[-1].endswith('.parquet') and len(parts) > 1 and parts[-2].startswith(PARTITION_PREFIX)
+    )
+
+def fetch_bronze_exports(work_dir: Path, max_concurrent_downloads: int = 4) -> List[Path]:
+    """
+    Collect the JSON exports and Parquet partitions that make up the current bronze layer.
+
+    The latest full export and the incremental exports written after it are
+    returned (see ``select_current_exports``), so windows that overlap can be
+    deduplicated in one pass without re-reading superseded exports. From GCS
+    the files are downloaded into ``work_dir``; locally they are read in place.
+
+    Args:
+        work_dir: Scratch directory for downloaded exports.
+        max_concurrent_downloads: Number of exports downloaded in parallel.
+
+    Returns:
+        List[Path]: Local paths of the bronze JSON exports and Parquet partitions.
+    """
+    if not USE_GCS:
+        names = [
+            name for name in (path.relative_to(LOCAL_ROOT).as_posix() for path in LOCAL_ROOT.rglob('*'))
+            if _is_bronze_export(name)
+        ]
+        files = sorted(LOCAL_ROOT / name for name in select_current_exports(names))
+        logger.debug(f"Using {len(files)} of {len(names)} local bronze exports under {LOCAL_ROOT}")
+        return files
+
+    blobs = {
+        blob.name[len(BRONZE_PREFIX) + 1:]: blob
+        for blob in gcs_client.list_blobs(GCS_BUCKET, prefix=f"{BRONZE_PREFIX}/")
+        if _is_bronze_export(blob.name[len(BRONZE_PREFIX) + 1:])
+    }
+    selected = select_current_exports(list(blobs))
+
+    def download(name: str) -> Path:
+        target = work_dir / 'bronze' / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        blobs[name].download_to_filename(str(target))
+        return target
+
+    logger.debug(f"Downloading {len(selected)} of {len(blobs)} bronze exports from GCS bucket '{GCS_BUCKET}'")
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent_downloads)) as executor:
+        return sorted(executor.map(download, selected))
+
+def export_silver(local_dir: Path, export_timestamp: str, max_concurrent_uploads: int = 4) -> Dict[str, Any]:
+    """
+    Export the partitioned silver fact table to either GCS or local storage.
+
+    Args:
+        local_dir: Directory holding the ``year=YYYY/month=M`` partitions.
+        export_timestamp: Timestamp string for the export.
+        max_concurrent_uploads: Number of partition files uploaded in parallel.
+
+    Returns:
+        Dict containing export metadata
+    """
+    files = sorted(path for path in local_dir.rglob('*.parquet'))
+
+    def upload(local_file: Path) -> str:
+        blob_path = f"{SILVER_PREFIX}/{export_timestamp}/{local_file.relative_to(local_dir).as_posix()}"
+        blob = gcs_client.bucket(GCS_BUCKET).blob(blob_path)
+        blob.upload_from_filename(str(local_file), content_type='application/octet-stream')
+        return f"gs://{GCS_BUCKET}/{blob_path}"
+
+    storage_type = "gcs" if USE_GCS else "local"
+    if USE_GCS:
+        try:
+            logger.debug(f"Uploading {len(files)} silver files to GCS bucket '{GCS_BUCKET}'")
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrent_uploads)) as executor:
+                list(executor.map(upload, files))
+            destination = f"gs://{GCS_BUCKET}/{SILVER_PREFIX}/{export_timestamp}"
+        except Exception as e:
+            logger.error(f"Error writing to GCS: {e}")
+            logger.warning("Falling back to local storage")
+            storage_type = "local"
+
+    if storage_type == "local":
+        target = LOCAL_SILVER_ROOT / export_timestamp
+        shutil.copytree(local_dir, target, dirs_exist_ok=True)
+        destination = str(target.absolute())
+
+    logger.debug(f"Successfully exported silver data to: {destination}")
+    return {
+        "export_timestamp": export_timestamp,
+        "storage_type": storage_type,
+        "destination": destination,
+        "files": len(files)
+    }
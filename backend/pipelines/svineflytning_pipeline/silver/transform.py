@@ -0,0 +1,252 @@
+"""Module for building the pig movement fact table from bronze exports with DuckDB."""
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+PARQUET_COMPRESSION = 'zstd'
+# Upper bound for a single serialized response (one request window) in a bronze export
+MAX_OBJECT_SIZE = 512 * 1024 * 1024
+
+# Natural key of a movement. When overlapping windows return the same movement,
+# the copy from the most recently fetched window wins.
+MOVEMENT_KEY = (
+    'movement_date',
+    'movement_time',
+    'sender_chr_number',
+    'sender_herd_number',
+    'receiver_chr_number',
+    'receiver_herd_number',
+)
+# Directory of one movement month in a bronze Parquet export
+PARTITION_PREFIX = 'movement_month='
+SORT_ORDER = ('movement_date', 'sender_chr_number', 'receiver_chr_number', 'movement_time')
+
+def _party_columns(prefix: str, element: str) -> List[str]:
+    """Select expressions for the sender or receiver of a movement."""
+    return [
+        f"NULLIF(trim(m->>'$.{element}.Landekode'), '') AS {prefix}_country_code",
+        f"TRY_CAST(m->>'$.{element}.ChrNummer' AS BIGINT) AS {prefix}_chr_number",
+        f"TRY_CAST(m->>'$.{element}.BesaetningsNummer' AS BIGINT) AS {prefix}_herd_number",
+        f"NULLIF(trim(m->>'$.{element}.Ejendom.Adresse'), '') AS {prefix}_address",
+        f"TRY_CAST(m->>'$.{element}.Ejendom.PostNummer' AS INTEGER) AS {prefix}_postal_code",
+        f"NULLIF(trim(m->>'$.{element}.Ejendom.PostDistrikt'), '') AS {prefix}_postal_district",
+        f"TRY_CAST(m->>'$.{element}.Ejendom.KommuneNummer' AS INTEGER) AS {prefix}_municipality_code",
+        f"NULLIF(trim(m->>'$.{element}.Ejendom.KommuneNavn'), '') AS {prefix}_municipality_name",
+    ]
+
+# Same columns as the bronze Parquet export (bronze.columnar.MOVEMENT_SCHEMA)
+MOVEMENT_COLUMNS = (
+    [
+        "TRY_CAST(left(m->>'$.FlytteTidspunkt.SvineflytDato', 10) AS DATE) AS movement_date",
+        "TRY_CAST(m->>'$.FlytteTidspunkt.SvineflytTidspunkt' AS INTEGER) AS movement_time",
+    ]
+    + _party_columns('sender', 'Afsender')
+    + _party_columns('receiver', 'Modtager')
+    + [
+        "TRY_CAST(m->>'$.AntalDyr.AntalDyrIAlt' AS BIGINT) AS animal_count",
+        "NULLIF(trim(m->>'$.Koeretoej.Forvogn.Landekode'), '') AS front_vehicle_country_code",
+        "NULLIF(trim(m->>'$.Koeretoej.Forvogn.RegNr'), '') AS front_vehicle_registration",
+        "NULLIF(trim(m->>'$.Koeretoej.Haenger.Landekode'), '') AS trailer_country_code",
+        "NULLIF(trim(m->>'$.Koeretoej.Haenger.RegNr'), '') AS trailer_registration",
+        "NULLIF(trim(m->>'$.IndberetterLogon'), '') AS reporter_logon",
+        # Local wall-clock time, matching the bronze Parquet export
+        "TRY_CAST(left(m->>'$.IndberetningForetaget', 19) AS TIMESTAMP) AS reported_at",
+        "window_start",
+        "window_end",
+        "fetched_at",
+    ]
+)
+
+def _sql_list(paths: Sequence[Path]) -> str:
+    """Render file paths as a DuckDB list literal."""
+    quoted = ("'" + str(path).replace("'", "''") + "'" for path in paths)
+    return f"[{', '.join(quoted)}]"
+
+class MovementTransformer:
+    """
+    Build the silver pig movement fact table from bronze exports.
+
+    DuckDB streams the JSON exports with ``read_json``: each response is kept
+    as JSON, its movements are unnested and cast to typed columns. Parquet
+    exports already hold these columns and are read as they are. The result
+    is deduplicated across overlapping request windows before being written
+    as Parquet partitioned by ``year``/``month`` of the movement date and
+    sorted by date and CHR number.
+
+    Args:
+        input_files: Bronze ``svineflytning.json`` exports and
+            ``movement_month=YYYY-MM/*.parquet`` partitions to read.
+        output_dir: Local directory the partitioned Parquet is written under.
+        work_dir: Scratch directory DuckDB may spill to.
+    """
+
+    def __init__(self, input_files: Sequence[Path], output_dir: Path, work_dir: Path):
+        self.input_files = list(input_files)
+        self.json_files = [path for path in self.input_files if Path(path).suffix == '.json']
+        self.parquet_files = [path for path in self.input_files if Path(path).suffix == '.parquet']
+        self.output_dir = Path(output_dir)
+        self.conn = duckdb.connect(database=':memory:')
+        self.conn.execute(f"SET temp_directory = '{work_dir}'")
+        self.stats: Dict[str, Any] = {'source_files': len(self.input_files)}
+
+    def _json_movements(self) -> str:
+        """
+        Select typed movement rows from the bronze JSON exports.
+
+        Every element on the way from a response to its movements may be an
+        object or a list, so each level is normalized to a list before it is
+        unnested, like ``bronze.columnar.iter_movements`` does.
+        """
+        self.conn.execute("""
+            CREATE OR REPLACE TEMP MACRO json_list(j) AS CASE
+                WHEN coalesce(json_type(j), 'NULL') = 'NULL' THEN []::JSON[]
+                WHEN json_type(j) = 'ARRAY' THEN json_extract(j, '$[*]')
+                ELSE [j]
+            END
+        """)
+        return f"""
+            WITH chunks AS (
+                SELECT
+                    filename AS source_file,
+                    TRY_CAST("timestamp" AS TIMESTAMP) AS fetched_at,
+                    TRY_CAST(start_date AS DATE) AS window_start,
+                    TRY_CAST(end_date AS DATE) AS window_end,
+                    response
+                FROM read_json(
+                    {_sql_list(self.json_files)},
+                    format = 'array',
+                    columns = {{
+                        'timestamp': 'VARCHAR',
+                        'start_date': 'VARCHAR',
+                        'end_date': 'VARCHAR',
+                        'response': 'JSON'
+                    }},
+                    filename = true,
+                    maximum_object_size = {MAX_OBJECT_SIZE}
+                )
+            ),
+            bodies AS (
+                SELECT * EXCLUDE (response), unnest(json_list(response->'$.Response')) AS body
+                FROM chunks
+            ),
+            movement_lists AS (
+                SELECT * EXCLUDE (body), unnest(json_list(body->'$.SvineflytningListe')) AS movement_list
+                FROM bodies
+            ),
+            unnested AS (
+                SELECT * EXCLUDE (movement_list), unnest(json_list(movement_list->'$.Svineflytning')) AS m
+                FROM movement_lists
+            )
+            SELECT source_file, {', '.join(MOVEMENT_COLUMNS)}
+            FROM unnested
+        """
+
+    def _parquet_movements(self) -> str:
+        """
+        Select movement rows from the bronze Parquet exports.
+
+        These already follow ``bronze.columnar.MOVEMENT_SCHEMA``; the fetch
+        time is taken from the export timestamp in the path.
+        """
+        return f"""
+            SELECT
+                filename AS source_file,
+                TRY_STRPTIME(
+                    regexp_extract(filename, '(\\d{{8}}_\\d{{6}})/{PARTITION_PREFIX}', 1),
+                    '%Y%m%d_%H%M%S'
+                ) AS fetched_at,
+                * EXCLUDE (filename) REPLACE (CAST(reported_at AS TIMESTAMP) AS reported_at)
+            FROM read_parquet({_sql_list(self.parquet_files)}, filename = true)
+        """
+
+    def load_movements(self) -> str:
+        """Read all bronze exports into typed movement rows."""
+        selects = []
+        if self.json_files:
+            selects.append(self._json_movements())
+        if self.parquet_files:
+            selects.append(self._parquet_movements())
+        union = ' UNION ALL BY NAME '.join(f'({select})' for select in selects)
+        self.conn.execute(f"CREATE OR REPLACE TEMP TABLE raw_movements AS {union}")
+        self.stats['raw_rows'] = self.conn.execute("SELECT count(*) FROM raw_movements").fetchone()[0]
+        logger.debug(f"Read {self.stats['raw_rows']} movements from {len(self.input_files)} exports")
+        return 'raw_movements'
+
+    def deduplicate(self, table_name: str) -> str:
+        """
+        Keep each movement from the latest window that returned it.
+
+        Rows are ranked per natural key by the window they came from, so a
+        movement re-fetched in a later overlapping window replaces the older
+        copy, while repeated rows within a single response are kept as is.
+        """
+        key = ', '.join(MOVEMENT_KEY)
+        self.conn.execute(f"""
+            CREATE OR REPLACE TEMP TABLE movements AS
+            SELECT * EXCLUDE (source_file, fetched_at)
+            FROM {table_name}
+            WHERE movement_date IS NOT NULL
+            QUALIFY dense_rank() OVER (
+                PARTITION BY {key}
+                ORDER BY fetched_at DESC NULLS LAST, source_file DESC, window_start DESC
+            ) = 1
+        """)
+        self.stats['rows'] = self.conn.execute("SELECT count(*) FROM movements").fetchone()[0]
+        undated = self.conn.execute(
+            f"SELECT count(*) FROM {table_name} WHERE movement_date IS NULL"
+        ).fetchone()[0]
+        if undated:
+            logger.warning(f"Dropped {undated} movements without a movement date")
+        duplicates = self.stats['raw_rows'] - undated - self.stats['rows']
+        if duplicates:
+            logger.debug(f"Removed {duplicates} movements repeated across overlapping windows")
+        self.stats['duplicates_removed'] = duplicates
+        self.stats['undated_dropped'] = undated
+        return 'movements'
+
+    def save_parquet(self, table_name: str) -> Path:
+        """
+        Write one sorted Parquet file per movement month.
+
+        Months are written one at a time so the sort order within each file
+        is guaranteed rather than depending on how DuckDB parallelizes a
+        partitioned write.
+        """
+        months = self.conn.execute(f"""
+            SELECT DISTINCT year(movement_date), month(movement_date)
+            FROM {table_name}
+            ORDER BY 1, 2
+        """).fetchall()
+        for year, month in months:
+            path = self.output_dir / f'year={year}' / f'month={month}' / 'part-0.parquet'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn.execute(f"""
+                COPY (
+                    SELECT * FROM {table_name}
+                    WHERE year(movement_date) = {year} AND month(movement_date) = {month}
+                    ORDER BY {', '.join(SORT_ORDER)}
+                ) TO '{path}' (FORMAT PARQUET, COMPRESSION {PARQUET_COMPRESSION})
+            """)
+        self.stats['partitions'] = len(months)
+        logger.debug(f"Wrote {self.stats['rows']} movements to {len(months)} monthly partitions")
+        return self.output_dir
+
+    def transform(self) -> Dict[str, Any]:
+        """
+        Run the full transformation.
+
+        Returns:
+            Dict[str, Any]: Row counts and partition statistics.
+        """
+        try:
+            table_name = self.load_movements()
+            table_name = self.deduplicate(table_name)
+            self.save_parquet(table_name)
+            return self.stats
+        finally:
+            self.conn.close()
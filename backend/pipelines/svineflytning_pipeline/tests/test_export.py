@@ -0,0 +1,45 @@
+"""
+Tests for selecting the bronze exports the silver stage reads.
+"""
+
+from silver.export import select_current_exports
+
+
+def test_latest_full_export_and_later_incrementals() -> None:
+    """Test that superseded full and incremental exports are skipped."""
+    names = [
+        '20250101_020000/svineflytning.json',
+        'incremental/window=2024-12-20_2025-01-05/20250106_020000/svineflytning.json',
+        '20250201_020000/svineflytning.json',
+        'incremental/window=2025-01-20_2025-02-05/20250206_020000/svineflytning.json',
+        'incremental/window=2025-01-27_2025-02-12/20250213_020000/svineflytning.json',
+    ]
+
+    assert select_current_exports(names) == [
+        '20250201_020000/svineflytning.json',
+        'incremental/window=2025-01-20_2025-02-05/20250206_020000/svineflytning.json',
+        'incremental/window=2025-01-27_2025-02-12/20250213_020000/svineflytning.json',
+    ]
+
+
+def test_incrementals_without_full_export() -> None:
+    """Test that every incremental export is kept when no full export exists."""
+    names = [
+        'incremental/window=2024-12-20_2025-01-05/20250106_020000/svineflytning.json',
+        'incremental/window=2025-01-20_2025-02-05/20250206_020000/svineflytning.json',
+    ]
+
+    assert select_current_exports(names) == names
+
+
+def test_parquet_exports() -> None:
+    """Test that Parquet partitions are grouped by the export they belong to."""
+    names = [
+        '20250101_020000/movement_month=2024-12/part-0.parquet',
+        '20250201_020000/movement_month=2024-12/part-0.parquet',
+        '20250201_020000/movement_month=2025-01/part-0.parquet',
+        'incremental/window=2025-01-20_2025-02-05/20250206_020000/movement_month=2025-01/part-0.parquet',
+        'incremental/window=2025-01-20_2025-02-05/20250206_020000/svineflytning.json',
+    ]
+
+    assert select_current_exports(names) == names[1:]
@@ -0,0 +1,87 @@
+"""
+Tests for building the silver movement fact table from bronze JSON exports.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import duckdb
+
+from bronze.columnar import PartitionedParquetWriter, flatten_response
+from silver.transform import MovementTransformer
+
+
+def movement(day: str, sender: int, receiver: int, animals: int) -> Dict[str, Any]:
+    """Return a serialized Svineflytning element."""
+    return {
+        'FlytteTidspunkt': {'SvineflytDato': f'{day}T00:00:00', 'SvineflytTidspunkt': 800},
+        'Afsender': {'ChrNummer': str(sender), 'BesaetningsNummer': '1'},
+        'Modtager': {'ChrNummer': str(receiver), 'BesaetningsNummer': '2'},
+        'AntalDyr': {'AntalDyrIAlt': str(animals)},
+    }
+
+
+def fetched_window(response: Any, timestamp: str = '2025-01-10T12:00:00') -> Dict[str, Any]:
+    """Return a fetched window as returned by fetch_movements."""
+    return {'timestamp': timestamp, 'start_date': '2025-01-01', 'end_date': '2025-01-03', 'response': response}
+
+
+def write_export(path: Path, responses: List[Any]) -> Path:
+    """Write a bronze JSON export holding one fetched window per response."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps([fetched_window(response) for response in responses]), encoding='utf-8')
+    return path
+
+
+def test_object_and_list_shaped_responses(tmp_path: Path) -> None:
+    """Test that movements are read whether zeep serialized each level as an object or a list."""
+    export = write_export(tmp_path / 'bronze' / 'svineflytning.json', [
+        {'Response': {'SvineflytningListe': {'Svineflytning': [movement('2025-01-01', 10, 20, 5)]}}},
+        {'Response': [{'SvineflytningListe': [{'Svineflytning': movement('2025-01-02', 11, 21, 6)}]}]},
+        {'Response': [
+            {'SvineflytningListe': [
+                {'Svineflytning': [movement('2025-01-03', 12, 22, 7), movement('2025-01-03', 13, 23, 8)]},
+            ]},
+        ]},
+        {'Response': None},
+    ])
+    output_dir = tmp_path / 'silver'
+
+    stats = MovementTransformer([export], output_dir, tmp_path / 'work').transform()
+
+    assert stats['raw_rows'] == 4
+    assert stats['rows'] == 4
+    rows = duckdb.sql(f"""
+        SELECT sender_chr_number, receiver_chr_number, animal_count
+        FROM read_parquet('{output_dir}/**/*.parquet')
+        ORDER BY sender_chr_number
+    """).fetchall()
+    assert rows == [(10, 20, 5), (11, 21, 6), (12, 22, 7), (13, 23, 8)]
+
+
+def test_json_and_parquet_exports(tmp_path: Path) -> None:
+    """Test that Parquet exports are read alongside JSON and the later export wins on overlap."""
+    json_export = write_export(tmp_path / 'bronze' / '20250110_120000' / 'svineflytning.json', [
+        {'Response': {'SvineflytningListe': {'Svineflytning': [
+            movement('2025-01-01', 10, 20, 5),
+            movement('2025-01-02', 11, 21, 6),
+        ]}}},
+    ])
+    writer = PartitionedParquetWriter(tmp_path / 'bronze' / 'incremental' / 'window=2025-01-01_2025-01-03' / '20250111_120000')
+    writer.write_batch(flatten_response(fetched_window(
+        {'Response': [{'SvineflytningListe': [{'Svineflytning': [movement('2025-01-02', 11, 21, 9)]}]}]}
+    )))
+    parquet_exports = list(writer.close().values())
+    output_dir = tmp_path / 'silver'
+
+    stats = MovementTransformer([json_export] + parquet_exports, output_dir, tmp_path / 'work').transform()
+
+    assert stats['raw_rows'] == 3
+    assert stats['duplicates_removed'] == 1
+    rows = duckdb.sql(f"""
+        SELECT sender_chr_number, animal_count
+        FROM read_parquet('{output_dir}/**/*.parquet')
+        ORDER BY sender_chr_number
+    """).fetchall()
+    assert rows == [(10, 5), (11, 9)]